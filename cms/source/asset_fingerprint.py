@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Empreinte des Ressources - Copie les fichiers sous un nom contenant le hash de leur contenu
+Les pages pointent vers ces noms, qui peuvent être mis en cache indéfiniment par les navigateurs
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from html_rewriter import collect_start_tags, local_path, set_attribute, splice, walk_files
+
+
+# Nom déjà empreint: general.3f9a1c2b.css
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8}\.[A-Za-z0-9]+$")
+CSS_URL_RE = re.compile(r'(url\(\s*(["\']?))(.*?)(\2\s*\))|(@import\s+(["\']))(.*?)(\6)', re.DOTALL)
+REFERENCE_ATTRIBUTES = ("href", "src", "poster", "data")
+
+
+class AssetFingerprinter:
+    """Publie les ressources du site sous des noms empreints et réécrit les références des pages"""
+
+    ASSET_DIRS = ("style", "script", "images", "icon", "files")
+    HASH_LENGTH = 8
+    MANIFEST_NAME = "asset-manifest.json"
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def fingerprinted_name(self, relative_path, digest):
+        """style/general.css -> style/general.3f9a1c2b.css"""
+        path = posixpath.splitext(relative_path)
+        return f"{path[0]}.{digest[:self.HASH_LENGTH]}{path[1]}"
+
+    def load_manifest(self, output_dir):
+        """Manifeste de la construction précédente (chemin -> mtime, taille, hash, nom empreint)"""
+        manifest_path = Path(output_dir) / self.MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("assets", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, output_dir, assets):
+        """Écrire le manifeste (relu par la construction suivante)"""
+        manifest_path = Path(output_dir) / self.MANIFEST_NAME
+        temp_path = manifest_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"assets": assets}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+
+    def scan_assets(self, repo_path):
+        """Ressources des dossiers publiés: chemin relatif -> os.stat_result"""
+        assets = {}
+        for folder in self.ASSET_DIRS:
+            for relative, entry in walk_files(Path(repo_path) / folder, folder + "/"):
+                # Documentation et fichiers déjà empreints ignorés
+                if entry.name == "README.md" or FINGERPRINT_RE.search(entry.name):
+                    continue
+                try:
+                    assets[relative] = entry.stat()
+                except OSError:
+                    continue
+        return assets
+
+    def fingerprint(self, repo_path, output_dir):
+        """Copier les ressources modifiées sous leur nom empreint (les autres viennent du manifeste)"""
+        repo_path = Path(repo_path).resolve()
+        output_dir = Path(output_dir)
+        previous = self.load_manifest(output_dir)
+        assets = {}
+        copied = reused = 0
+        stats = self.scan_assets(repo_path)
+        css_files = []
+        for relative, stat in stats.items():
+            if relative.endswith(".css"):
+                # Les feuilles référencent d'autres ressources: traitées après elles
+                css_files.append(relative)
+                continue
+            entry = previous.get(relative)
+            if (entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+                    and (output_dir / entry["fingerprinted"]).exists()):
+                assets[relative] = entry
+                reused += 1
+                continue
+            with open(repo_path / relative, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            fingerprinted = self.fingerprinted_name(relative, digest)
+            target = output_dir / fingerprinted
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(repo_path / relative, target)
+            self._remove_stale(output_dir, entry, fingerprinted)
+            assets[relative] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest,
+                                "fingerprinted": fingerprinted}
+            copied += 1
+
+        # Feuilles de style: url() et @import réécrits, donc le hash porte sur le contenu réécrit
+        mapping = {relative: entry["fingerprinted"] for relative, entry in assets.items()}
+        rewritten_css = {}
+        for relative in css_files:
+            self._fingerprint_css(repo_path, relative, stats, mapping, rewritten_css)
+        for relative in css_files:
+            css, digest = rewritten_css[relative]
+            fingerprinted = mapping[relative]
+            target = output_dir / fingerprinted
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(css)
+                copied += 1
+            else:
+                reused += 1
+            self._remove_stale(output_dir, previous.get(relative), fingerprinted)
+            assets[relative] = {"mtime": stats[relative].st_mtime_ns, "size": stats[relative].st_size,
+                                "hash": digest, "fingerprinted": fingerprinted}
+
+        for relative, entry in previous.items():
+            if relative not in assets:
+                self._remove_stale(output_dir, entry, None)
+        self.save_manifest(output_dir, assets)
+        return {"assets": assets, "copied": copied, "reused": reused}
+
+    def _fingerprint_css(self, repo_path, relative, stats, mapping, done, visiting=()):
+        """Réécrire une feuille (après les feuilles qu'elle importe) et calculer son nom empreint"""
+        if relative in done or relative in visiting:
+            return
+        with open(repo_path / relative, 'r', encoding='utf-8') as f:
+            css = f.read()
+        folder = posixpath.dirname(relative)
+        for target in self._css_references(css):
+            imported = posixpath.normpath(posixpath.join(folder, target))
+            if imported in stats and imported.endswith(".css"):
+                self._fingerprint_css(repo_path, imported, stats, mapping, done,
+                                      visiting + (relative,))
+        css = self.rewrite_css(css, folder, mapping).encode("utf-8")
+        digest = hashlib.sha1(css).hexdigest()
+        mapping[relative] = self.fingerprinted_name(relative, digest)
+        done[relative] = (css, digest)
+
+    def _css_references(self, css):
+        """Chemins locaux référencés par une feuille (url() et @import)"""
+        for match in CSS_URL_RE.finditer(css):
+            target = match.group(3) if match.group(1) else match.group(7)
+            path = local_path(target or "")
+            if path and not target.startswith(("data:", "/")):
+                yield path
+
+    def rewrite_css(self, css, folder, mapping):
+        """Remplacer dans une feuille les url() et @import par les noms empreints"""
+        def replace(match):
+            if match.group(1):
+                prefix, target, suffix = match.group(1), match.group(3), match.group(4)
+            else:
+                prefix, target, suffix = match.group(5), match.group(7), match.group(8)
+            if target.strip().startswith(("data:", "#")):
+                return match.group(0)
+            new_target = self._rewrite_url(target.strip(), folder, mapping)
+            return prefix + new_target + suffix if new_target else match.group(0)
+        return CSS_URL_RE.sub(replace, css)
+
+    def _rewrite_url(self, url, folder, mapping):
+        """URL empreinte équivalente à `url` (relative au dossier `folder`), None si non publiée"""
+        path = local_path(url)
+        if path is None:
+            return None
+        if path.startswith("/"):
+            relative = posixpath.normpath(path.lstrip("/"))
+        else:
+            relative = posixpath.normpath(posixpath.join(folder, path))
+        fingerprinted = mapping.get(relative)
+        if fingerprinted is None:
+            return None
+        parts = urlsplit(url)
+        if path.startswith("/"):
+            new_path = "/" + fingerprinted
+        else:
+            new_path = posixpath.relpath(fingerprinted, folder or ".")
+        new_url = quote(new_path)
+        if parts.query:
+            new_url += "?" + parts.query
+        if parts.fragment:
+            new_url += "#" + parts.fragment
+        return new_url
+
+    def _remove_stale(self, output_dir, entry, current):
+        """Supprimer l'ancienne version empreinte d'une ressource modifiée ou supprimée"""
+        if entry and entry["fingerprinted"] != current:
+            try:
+                (Path(output_dir) / entry["fingerprinted"]).unlink()
+            except OSError:
+                pass
+
+    def rewrite_page(self, content, page_relative, mapping):
+        """Remplacer les href/src/srcset d'une page par les noms empreints"""
+        folder = posixpath.dirname(page_relative)
+        replacements = []
+        for tag in collect_start_tags(content):
+            text = tag["text"]
+            for name, value in tag["attrs"].items():
+                if name in REFERENCE_ATTRIBUTES:
+                    new_value = self._rewrite_url(value, folder, mapping)
+                elif name == "srcset":
+                    new_value = self._rewrite_srcset(value, folder, mapping)
+                else:
+                    continue
+                if new_value and new_value != value:
+                    text = set_attribute(text, name, new_value)
+            if text != tag["text"]:
+                replacements.append((tag["start"], tag["end"], text))
+        return splice(content, replacements), len(replacements)
+
+    def _rewrite_srcset(self, srcset, folder, mapping):
+        """Réécrire chaque candidat d'un srcset (« url largeur »)"""
+        candidates = []
+        for candidate in srcset.split(","):
+            parts = candidate.strip().split(None, 1)
+            if not parts:
+                continue
+            new_url = self._rewrite_url(parts[0], folder, mapping) or parts[0]
+            candidates.append(" ".join([new_url] + parts[1:]))
+        return ", ".join(candidates)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des backends de parsing - Temps d'extraction des éléments éditables par page
+Usage: python benchmark_parsers.py [chemin_du_repository] [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from html_manager import HTMLManager
+
+
+class _SilentLogger:
+    """Logger minimal pour le benchmark (les messages sont ignorés)"""
+
+    def log(self, message, level="INFO"):
+        pass
+
+
+def benchmark_page(html_manager, raw_content, backend, repeat):
+    """Mesurer le meilleur temps d'extraction (en ms) d'une page pour un backend"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = html_manager.extract_editable_elements(raw_content, backend=backend)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    # Comparaison hors de la mesure
+    return best, html_manager.comparable_elements(result["elements"])
+
+
+def run_benchmark(repo_path, repeat=5):
+    """Afficher les temps de parsing de chaque page de page/ pour chaque backend"""
+    html_manager = HTMLManager(_SilentLogger())
+    backends = html_manager.available_backends()
+    page_files = sorted((Path(repo_path) / "page").glob("*.html"))
+    if not page_files:
+        print(f"❌ Aucune page trouvée dans {Path(repo_path) / 'page'}")
+        return False
+
+    print(f"\n⏱️  Extraction des éléments éditables (meilleur de {repeat}, en ms)\n")
+    header = f"{'Page':<28}" + "".join(f"{backend:>14}" for backend in backends)
+    print(header)
+    print("-" * len(header))
+
+    totals = {backend: 0.0 for backend in backends}
+    mismatches = {backend: [] for backend in backends}
+    samples = []
+    for page_file in page_files:
+        with open(page_file, 'r', encoding='utf-8', newline='') as f:
+            raw_content = f.read()
+        samples.append(raw_content)
+        reference = None
+        row = f"{page_file.name:<28}"
+        for backend in backends:
+            elapsed, elements = benchmark_page(
+                html_manager, raw_content, backend, repeat)
+            if reference is None:
+                reference = elements
+            elif elements != reference:
+                mismatches[backend].append(page_file.name)
+            totals[backend] += elapsed
+            flag = " " if elements == reference else "≠"
+            row += f"{elapsed:>13.2f}{flag}"
+        print(row)
+
+    print("-" * len(header))
+    print(f"{'Total':<28}" + "".join(f"{totals[backend]:>13.2f} " for backend in backends))
+
+    print()
+    for backend in backends[1:]:
+        if mismatches[backend]:
+            print(f"⚠️  {backend}: résultat différent pour {', '.join(mismatches[backend])}")
+        else:
+            print(f"✅ {backend}: résultat identique à html.parser sur toutes les pages")
+
+    selection = html_manager.select_backend(samples)
+    print(f"\n🏁 Backend retenu en mode auto: {selection['backend']}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark des backends de parsing HTML")
+    parser.add_argument("repo_path", nargs="?",
+                        default=str(Path(__file__).resolve().parent.parent.parent))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    success = run_benchmark(args.repo_path, args.repeat)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de charge du serveur de prévisualisation - Débit, latence et mémoire par type de ressource
+Le serveur tourne dans un processus séparé, sur une copie temporaire du site ou un site généré.
+L'ancienne boucle handle_request (TCPServer + SimpleHTTPRequestHandler) sert de référence.
+Usage: python benchmark_server.py [chemin_du_repository] [--site copy|synthetic] [--requests N]
+                                  [--concurrency C] [--workers 1 8] [--slow-clients S] [--json FICHIER]
+                                  [--no-legacy]
+"""
+
+import argparse
+import http.client
+import http.server
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from server_manager import ServerManager
+
+
+# Seuil à partir duquel une image compte comme "grande image"
+LARGE_IMAGE_BYTES = 256 * 1024
+CATEGORIES = ("mixed", "html", "css", "js", "image", "pdf")
+
+
+class _SilentLogger:
+    """Logger minimal pour le benchmark (les messages sont ignorés)"""
+
+    def log(self, message, level="INFO"):
+        pass
+
+
+# ======= Préparation du site =======
+
+def copy_site(repo_path, target_dir):
+    """Copier le site (sans .git ni le CMS) dans un dossier temporaire"""
+    shutil.copytree(repo_path, target_dir,
+                    ignore=shutil.ignore_patterns(".git", "cms", "__pycache__", "*.docx"))
+    return target_dir
+
+
+def generate_site(target_dir, pages=200, stylesheets=10, scripts=5, images=20,
+                  image_bytes=2 * 1024 * 1024, pdfs=5, pdf_bytes=4 * 1024 * 1024):
+    """Générer un gros site synthétique: pages liées à des feuilles de style, scripts, images et PDF"""
+    target_dir = Path(target_dir)
+    for folder in ("page", "style", "script", "images", "files"):
+        (target_dir / folder).mkdir(parents=True, exist_ok=True)
+
+    rule = ".bloc-{0} {{ margin: {0}px; padding: 4px 8px; color: #2a{0:02x}5f; }}\n"
+    for index in range(stylesheets):
+        css = "".join(rule.format((index * 400 + line) % 256) for line in range(400))
+        (target_dir / "style" / f"style-{index}.css").write_text(css, encoding="utf-8")
+    for index in range(scripts):
+        js = "".join(f"function f{index}_{line}(x) {{ return x * {line} + {index}; }}\n"
+                     for line in range(500))
+        (target_dir / "script" / f"script-{index}.js").write_text(js, encoding="utf-8")
+    for index in range(images):
+        (target_dir / "images" / f"image-{index}.png").write_bytes(os.urandom(image_bytes))
+    for index in range(pdfs):
+        (target_dir / "files" / f"document-{index}.pdf").write_bytes(os.urandom(pdf_bytes))
+
+    paragraph = "<p class=\"editable\">Texte de démonstration pour la page {0}, paragraphe {1}.</p>\n"
+    for index in range(pages):
+        links = "".join(f'<link rel="stylesheet" href="../style/style-{(index + offset) % stylesheets}.css">\n'
+                        for offset in range(3))
+        body = "".join(paragraph.format(index, line) for line in range(100))
+        image = f'<img src="../images/image-{index % images}.png" alt="">\n'
+        html = (f"<!DOCTYPE html>\n<html lang=\"fr\">\n<head>\n<meta charset=\"UTF-8\">\n"
+                f"<title>Page {index}</title>\n{links}</head>\n<body>\n{image}{body}"
+                f"<script src=\"../script/script-{index % scripts}.js\"></script>\n</body>\n</html>\n")
+        (target_dir / "page" / f"page-{index}.html").write_text(html, encoding="utf-8")
+    shutil.copyfile(target_dir / "page" / "page-0.html", target_dir / "index.html")
+    return target_dir
+
+
+def categorize_urls(site_dir):
+    """URLs du site regroupées par type de ressource"""
+    site_dir = Path(site_dir)
+    categories = {category: [] for category in CATEGORIES}
+    for file_path in sorted(site_dir.rglob("*")):
+        if not file_path.is_file():
+            continue
+        url = "/" + quote(file_path.relative_to(site_dir).as_posix())
+        suffix = file_path.suffix.lower()
+        if suffix == ".html":
+            category = "html"
+        elif suffix == ".css":
+            category = "css"
+        elif suffix == ".js":
+            category = "js"
+        elif suffix == ".pdf":
+            category = "pdf"
+        elif suffix in (".png", ".jpg", ".jpeg", ".webp", ".gif") and \
+                file_path.stat().st_size >= LARGE_IMAGE_BYTES:
+            category = "image"
+        else:
+            continue
+        categories[category].append(url)
+    # Visite type: pages, styles et scripts avec quelques grandes images
+    categories["mixed"] = (categories["html"] + categories["css"] + categories["js"]
+                           + categories["image"][:5])
+    return {category: urls for category, urls in categories.items() if urls}
+
+
+def largest_download(site_dir):
+    """Plus gros fichier de files/ (ou images/), utilisé par les clients lents"""
+    site_dir = Path(site_dir)
+    candidates = [path for folder in ("files", "images")
+                  for path in (site_dir / folder).rglob("*") if path.is_file()]
+    if not candidates:
+        return None
+    largest = max(candidates, key=lambda path: path.stat().st_size)
+    return "/" + quote(largest.relative_to(site_dir).as_posix())
+
+
+# ======= Serveur (processus séparé) =======
+
+def serve_in_child(site_dir, port, workers, ready_queue, stop_event):
+    """Processus serveur: le client de charge ne partage ni le GIL ni la mémoire du serveur"""
+    server_manager = ServerManager(_SilentLogger(), max_workers=workers)
+    result = server_manager.start_server(site_dir, port)
+    ready_queue.put({"port": result.get("port"), "error": result.get("error")})
+    if result["success"]:
+        stop_event.wait()
+        server_manager.stop_all(deadline=1.0)
+
+
+class LegacyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Handler de l'ancien serveur de prévisualisation (sans le journal des requêtes)"""
+
+    def do_GET(self):
+        path = unquote(self.path)
+        if path == '/' or path == '':
+            path = '/index.html'
+        self.path = path
+        return super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        self.send_header(
+            'Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
+        self.send_header('Pragma', 'no-cache')
+        self.send_header('Expires', '0')
+        super().end_headers()
+
+
+def serve_legacy_in_child(site_dir, port, ready_queue, stop_event):
+    """Processus serveur de référence: l'ancienne boucle handle_request, une requête à la fois"""
+    def create_handler(*args, **kwargs):
+        return LegacyHTTPRequestHandler(*args, directory=site_dir, **kwargs)
+    try:
+        socketserver.TCPServer.allow_reuse_address = True
+        server = socketserver.TCPServer(("localhost", port), create_handler)
+    except OSError as e:
+        ready_queue.put({"port": None, "error": str(e)})
+        return
+    # Timeout court pour permettre l'arrêt, comme l'ancien ServerManager.start
+    server.timeout = 0.5
+    ready_queue.put({"port": port, "error": None})
+    try:
+        while not stop_event.is_set():
+            server.handle_request()
+    finally:
+        server.server_close()
+
+
+def process_rss(pid):
+    """Mémoire résidente (octets) d'un processus: psutil si installé, sinon /proc (Linux)"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """Relève périodiquement la mémoire du serveur pour en garder le pic"""
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            rss = process_rss(self.pid)
+            if rss is not None:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+            self._stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+
+# ======= Client de charge =======
+
+def slow_download(port, url, stop_event, chunk_size=4 * 1024, delay=0.01):
+    """Télécharger en boucle un gros fichier lentement (connexion mobile, lecteur PDF)"""
+    while not stop_event.is_set():
+        # Petit tampon de réception: le serveur reste bloqué en écriture comme avec un vrai client lent
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, chunk_size)
+        sock.settimeout(30)
+        try:
+            sock.connect(("localhost", port))
+            sock.sendall(f"GET {url} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode("ascii"))
+            while not stop_event.is_set() and sock.recv(chunk_size):
+                time.sleep(delay)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+
+def fetch(port, url):
+    """Télécharger une URL et retourner (latence en ms, statut, octets reçus)"""
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection("localhost", port, timeout=30)
+    try:
+        connection.request("GET", url)
+        response = connection.getresponse()
+        size = len(response.read())
+        status = response.status
+    except OSError:
+        size, status = 0, 599
+    finally:
+        connection.close()
+    return (time.perf_counter() - start) * 1000, status, size
+
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_load(port, pid, urls, total_requests, concurrency, slow_url=None, slow_clients=0):
+    """Envoyer `total_requests` requêtes sur `urls` avec `concurrency` clients simultanés"""
+    stop_event = threading.Event()
+    slow_threads = [threading.Thread(target=slow_download, args=(port, slow_url, stop_event), daemon=True)
+                    for _ in range(slow_clients if slow_url else 0)]
+    targets = [urls[i % len(urls)] for i in range(total_requests)]
+    try:
+        for slow_thread in slow_threads:
+            slow_thread.start()
+        with RssSampler(pid) as sampler:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(lambda url: fetch(port, url), targets))
+            elapsed = time.perf_counter() - start
+    finally:
+        stop_event.set()
+        for slow_thread in slow_threads:
+            slow_thread.join(5)
+
+    latencies = [latency for latency, _status, _size in results]
+    received = sum(size for _latency, _status, size in results)
+    return {
+        "requests": len(results),
+        "requests_per_second": len(results) / elapsed,
+        "megabytes_per_second": received / elapsed / (1024 * 1024),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "peak_rss_mb": sampler.peak / (1024 * 1024) if sampler.peak else None,
+        "errors": sum(1 for _latency, status, _size in results if status >= 400),
+    }
+
+
+# ======= Suite de benchmark =======
+
+def run_benchmark(repo_path, site="copy", total_requests=500, concurrency=16, workers_list=(1, 8),
+                  port=8765, slow_clients=1, categories=CATEGORIES, json_path=None, legacy=True):
+    """Mesurer chaque type de ressource pour l'ancienne boucle et chaque nombre de workers, et écrire le JSON
+    (l'ancienne boucle, très lente avec des clients lents, n'est mesurée que sur la visite type "mixed")"""
+    with tempfile.TemporaryDirectory(prefix="rout_art_bench_") as temp_dir:
+        site_dir = Path(temp_dir) / "site"
+        if site == "synthetic":
+            generate_site(site_dir)
+        else:
+            copy_site(repo_path, site_dir)
+        urls_by_category = categorize_urls(site_dir)
+        slow_url = largest_download(site_dir) if slow_clients else None
+        site_files = [path for path in site_dir.rglob("*") if path.is_file()]
+
+        print(f"\n🚦 Site {site}: {len(site_files)} fichiers, "
+              f"{sum(path.stat().st_size for path in site_files) / (1024 * 1024):.1f} Mo")
+        print(f"   {total_requests} requêtes par mesure, {concurrency} clients simultanés")
+        if slow_url:
+            print(f"🐢 {slow_clients} client(s) lent(s) téléchargeant {slow_url}")
+        print()
+        header = (f"{'Serveur':>8} {'Type':<7}{'Req/s':>10}{'Mo/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                  f"{'p99 ms':>9}{'RSS Mo':>9}{'Erreurs':>9}")
+        print(header)
+        print("-" * len(header))
+
+        # None: ancienne boucle handle_request (référence)
+        runs = ([None] if legacy and "mixed" in categories else []) + list(workers_list)
+        results = []
+        for workers in runs:
+            ready_queue = multiprocessing.Queue()
+            stop_event = multiprocessing.Event()
+            if workers is None:
+                server = multiprocessing.Process(
+                    target=serve_legacy_in_child, args=(str(site_dir), port, ready_queue, stop_event),
+                    daemon=True)
+            else:
+                server = multiprocessing.Process(
+                    target=serve_in_child, args=(str(site_dir), port, workers, ready_queue, stop_event),
+                    daemon=True)
+            server.start()
+            try:
+                ready = ready_queue.get(timeout=10)
+                if ready["error"]:
+                    raise RuntimeError(ready["error"])
+                for category in (("mixed",) if workers is None else categories):
+                    urls = urls_by_category.get(category)
+                    if not urls:
+                        continue
+                    result = run_load(ready["port"], server.pid, urls, total_requests, concurrency,
+                                      slow_url, slow_clients)
+                    result.update(server="handle_request" if workers is None else "ThreadPoolHTTPServer",
+                                  workers=workers, category=category, urls=len(urls))
+                    results.append(result)
+                    rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] else "-"
+                    label = "ancien" if workers is None else str(workers)
+                    print(f"{label:>8} {category:<7}{result['requests_per_second']:>10.1f}"
+                          f"{result['megabytes_per_second']:>9.1f}{result['p50_ms']:>9.2f}"
+                          f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}{rss:>9}{result['errors']:>9}")
+            finally:
+                stop_event.set()
+                server.join(5)
+                if server.is_alive():
+                    server.terminate()
+
+    # Visite type: ancienne boucle handle_request contre le pool le plus grand mesuré
+    comparison = None
+    mixed = [result for result in results if result["category"] == "mixed"]
+    if len(mixed) > 1 and mixed[0]["workers"] is None:
+        baseline, best = mixed[0], mixed[-1]
+        comparison = {
+            "baseline": "TCPServer.handle_request (timeout 0.5 s)",
+            "candidate": f"ThreadPoolHTTPServer workers={best['workers']}",
+            "throughput_ratio": best["requests_per_second"] / baseline["requests_per_second"],
+            "p95_ms": [baseline["p95_ms"], best["p95_ms"]]
+        }
+        print(f"\n🏁 Pool de {best['workers']} workers vs ancienne boucle handle_request: "
+              f"débit x{comparison['throughput_ratio']:.1f}, "
+              f"p95 {baseline['p95_ms']:.1f} ms -> {best['p95_ms']:.1f} ms")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site": site,
+        "total_requests": total_requests,
+        "concurrency": concurrency,
+        "slow_clients": slow_clients if slow_url else 0,
+        "comparison": comparison,
+        "results": results
+    }
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Résultats écrits dans {json_path}")
+    return report
+
+
+if __name__ == "__main__":
+    # Nécessaire pour le processus serveur sous Windows
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(
+        description="Test de charge du serveur de prévisualisation")
+    parser.add_argument("repo_path", nargs="?",
+                        default=str(Path(__file__).resolve().parent.parent.parent))
+    parser.add_argument("--site", choices=("copy", "synthetic"), default="copy",
+                        help="copie temporaire du repository ou site généré")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, ServerManager.DEFAULT_WORKERS])
+    parser.add_argument("--categories", nargs="+", choices=CATEGORIES, default=list(CATEGORIES))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--slow-clients", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="fichier de résultats JSON")
+    parser.add_argument("--no-legacy", dest="legacy", action="store_false",
+                        help="ne pas mesurer l'ancienne boucle handle_request")
+    args = parser.parse_args()
+    if args.site == "copy" and not (Path(args.repo_path) / "index.html").exists():
+        print(f"❌ index.html introuvable dans {args.repo_path}")
+        sys.exit(1)
+    run_benchmark(args.repo_path, args.site, args.requests, args.concurrency, args.workers,
+                  args.port, args.slow_clients, args.categories, args.json_path, args.legacy)
+    sys.exit(0)
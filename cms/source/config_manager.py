@@ -19,6 +19,7 @@ class ConfigManager:
         "auto_pull": {"type": bool, "required": True},
         "auto_refresh": {"type": bool, "required": True},
         "default_port": {"type": int, "required": True, "min": 1, "max": 65535},
+        "server_workers": {"type": int, "required": True, "min": 1, "max": 64},
         "theme": {"type": str, "required": True, "allowed": ["dark", "light"]},
         "window_width": {"type": int, "required": True, "min": 400},
         "window_height": {"type": int, "required": True, "min": 300},
@@ -32,6 +33,7 @@ class ConfigManager:
             "auto_pull": False,
             "auto_refresh": True,
             "default_port": 8000,
+            "server_workers": 8,
             "theme": "dark",
             "window_width": 1400,
             "window_height": 800
@@ -191,6 +193,14 @@ class ConfigManager:
         """Définir le port par défaut"""
         self._set_with_cache("default_port", int(port))
 
+    def get_server_workers(self) -> int:
+        """Récupérer le nombre de threads du serveur de prévisualisation"""
+        return self._get_from_cache("server_workers", self.default_config["server_workers"])
+
+    def set_server_workers(self, workers: int):
+        """Définir le nombre de threads du serveur de prévisualisation"""
+        self._set_with_cache("server_workers", int(workers))
+
     def get_theme(self) -> str:
         """Récupérer le thème"""
         return self._get_from_cache("theme", self.default_config["theme"])
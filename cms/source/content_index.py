@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index de Contenu - Index persistant (SQLite) des éléments éditables du site
+Rafraîchi de manière incrémentale: seuls les fichiers modifiés sont re-parsés
+"""
+
+import bisect
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+
+# Élisions françaises retirées avant découpage (l'école -> école, qu'il -> il)
+ELISION_RE = re.compile(r"\b(?:qu|jusqu|lorsqu|puisqu|[cdjlmnst])'")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text):
+    """Minuscules sans accents ni ligatures (Lunéville -> luneville, œuvre -> oeuvre)"""
+    text = text.lower().replace('œ', 'oe').replace('æ', 'ae').replace('’', "'")
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Découper un texte français en termes de recherche"""
+    return TOKEN_RE.findall(ELISION_RE.sub(' ', normalize_text(text or '')))
+
+
+class ContentIndex:
+    """Gère l'index SQLite des éléments éditables de toutes les pages"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            mtime INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS elements (
+            file TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+            idx INTEGER NOT NULL,
+            elem_id TEXT,
+            tag TEXT NOT NULL,
+            class TEXT,
+            text TEXT,
+            src TEXT,
+            PRIMARY KEY (file, idx)
+        );
+    """
+
+    # Paramètres du classement BM25
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, logger, html_manager, db_path=None):
+        self.logger = logger
+        self.html_manager = html_manager
+        self.db_path = Path(db_path) if db_path else Path.home() / ".rout_art_cms" / "content_index.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(self.SCHEMA)
+
+        # Index inversé en mémoire: terme -> {(fichier, index): fréquence}
+        self._search_lock = threading.Lock()
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._file_documents = defaultdict(list)
+        self._sorted_terms = None
+        self._load_search_index()
+
+    def _file_key(self, file_path):
+        """Clé d'un fichier dans l'index (chemin absolu)"""
+        return str(Path(file_path).resolve())
+
+    def refresh(self, repo_path, file_paths):
+        """Mettre à jour l'index pour les fichiers donnés et retirer ceux qui ont disparu"""
+        try:
+            updated = 0
+            unchanged = 0
+            keys = set()
+            for file_path in file_paths:
+                keys.add(self._file_key(file_path))
+                if self.refresh_file(file_path)["updated"]:
+                    updated += 1
+                else:
+                    unchanged += 1
+
+            # Retirer les fichiers qui n'existent plus, et ceux d'un repository configuré auparavant
+            # (ils reviendraient sinon dans les résultats de recherche)
+            with self._lock, self._connection:
+                indexed = [row[0] for row in self._connection.execute("SELECT path FROM files")]
+                removed = [path for path in indexed if path not in keys]
+            for path in removed:
+                self.remove_file(path)
+
+            if updated or removed:
+                self.logger.log(
+                    f"Index du contenu: {updated} fichier(s) mis à jour, {len(removed)} retiré(s)")
+            return {"success": True, "updated": updated, "unchanged": unchanged, "removed": len(removed)}
+        except Exception as e:
+            error_msg = f"Erreur lors de la mise à jour de l'index: {str(e)}"
+            self.logger.log(error_msg)
+            return {"success": False, "error": error_msg}
+
+    def refresh_file(self, file_path):
+        """Ré-indexer un fichier si son mtime ou son contenu a changé"""
+        key = self._file_key(file_path)
+        stat = Path(key).stat()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT mtime, size, hash FROM files WHERE path = ?", (key,)).fetchone()
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return {"success": True, "updated": False, "hash": row[2]}
+
+        with open(key, 'rb') as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()
+        if row and row[2] == content_hash:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                    (stat.st_mtime_ns, stat.st_size, key))
+            return {"success": True, "updated": False, "hash": content_hash}
+
+        result = self.html_manager.load_document(key)
+        if not result["success"]:
+            raise Exception(result["error"])
+        document = result["document"]
+        rows = [
+            (key, element["index"], element["id"], element["tag"], element["class"],
+             None if element["is_iframe"] else element["editable_value"],
+             element["editable_value"] if element["is_iframe"] else None)
+            for element in document["elements"]
+        ]
+        # SQLite et index inversé mis à jour ensemble: la sauvegarde et la surveillance des
+        # fichiers peuvent ré-indexer le même fichier en même temps
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM files WHERE path = ?", (key,))
+                self._connection.execute(
+                    "INSERT INTO files (path, mtime, size, hash) VALUES (?, ?, ?, ?)",
+                    (key, document["mtime"], document["size"], document["hash"]))
+                self._connection.executemany(
+                    "INSERT INTO elements (file, idx, elem_id, tag, class, text, src) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+            self._unindex_file(key)
+            for row in rows:
+                self._index_row(row)
+        return {"success": True, "updated": True, "hash": document["hash"]}
+
+    def remove_file(self, file_path):
+        """Retirer un fichier de l'index (fichier supprimé)"""
+        key = self._file_key(file_path)
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM files WHERE path = ?", (key,))
+            self._unindex_file(key)
+
+    def get_editable_elements(self, file_path):
+        """Lire les éléments éditables d'un fichier depuis l'index (ré-indexé s'il a changé)"""
+        try:
+            key = self._file_key(file_path)
+            file_hash = self.refresh_file(key)["hash"]
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT idx, elem_id, tag, class, text, src FROM elements WHERE file = ? ORDER BY idx",
+                    (key,)).fetchall()
+            elements = [self._row_to_element(row) for row in rows]
+            if not elements:
+                return {"success": False, "error": "Aucun élément éditable trouvé (class='editable')",
+                        "elements": [], "hash": file_hash}
+            return {"success": True, "count": len(elements), "elements": elements, "hash": file_hash}
+        except Exception as e:
+            error_msg = f"Erreur lors de la lecture de l'index: {str(e)}"
+            self.logger.log(error_msg)
+            return {"success": False, "error": error_msg, "elements": []}
+
+    def _row_to_element(self, row):
+        """Convertir une ligne de l'index au format de HTMLManager"""
+        idx, elem_id, tag, elem_class, text, src = row
+        is_iframe = tag == 'iframe'
+        return {
+            "index": idx,
+            "id": elem_id,
+            "tag": tag,
+            "class": elem_class,
+            "is_iframe": is_iframe,
+            "editable_value": src if is_iframe else text
+        }
+
+    def find(self, text, limit=100):
+        """Trouver les éléments dont le texte ou le src contient la chaîne donnée"""
+        try:
+            pattern = f"%{text}%"
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT file, idx, elem_id, tag, class, text, src FROM elements "
+                    "WHERE text LIKE ? OR src LIKE ? ORDER BY file, idx LIMIT ?",
+                    (pattern, pattern, limit)).fetchall()
+            matches = []
+            for row in rows:
+                element = self._row_to_element(row[1:])
+                element["file"] = row[0]
+                matches.append(element)
+            return {"success": True, "count": len(matches), "matches": matches}
+        except Exception as e:
+            return {"success": False, "error": str(e), "matches": []}
+
+    def clear(self):
+        """Vider l'index"""
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM files")
+            with self._search_lock:
+                self._postings.clear()
+                self._documents.clear()
+                self._file_documents.clear()
+                self._sorted_terms = None
+
+    # ======= Recherche plein texte =======
+
+    def _load_search_index(self):
+        """Construire l'index inversé à partir des lignes déjà présentes dans SQLite"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT file, idx, elem_id, tag, class, text, src FROM elements").fetchall()
+            for row in rows:
+                self._index_row(row)
+
+    def _index_row(self, row):
+        """Ajouter un élément à l'index inversé"""
+        file_key, idx, elem_id, tag, _elem_class, text, src = row
+        terms = tokenize(text) + tokenize(elem_id) + tokenize(src)
+        doc_key = (file_key, idx)
+        with self._search_lock:
+            self._documents[doc_key] = {
+                "file": file_key, "index": idx, "id": elem_id, "tag": tag,
+                "text": text if text is not None else src or '', "length": len(terms)
+            }
+            self._file_documents[file_key].append(doc_key)
+            for term in terms:
+                postings = self._postings[term]
+                postings[doc_key] = postings.get(doc_key, 0) + 1
+            self._sorted_terms = None
+
+    def _unindex_file(self, file_key):
+        """Retirer tous les éléments d'un fichier de l'index inversé"""
+        with self._search_lock:
+            for doc_key in self._file_documents.pop(file_key, []):
+                self._documents.pop(doc_key, None)
+            if not self._documents:
+                self._postings.clear()
+            else:
+                for term in list(self._postings):
+                    postings = self._postings[term]
+                    for doc_key in [key for key in postings if key[0] == file_key]:
+                        del postings[doc_key]
+                    if not postings:
+                        del self._postings[term]
+            self._sorted_terms = None
+
+    def _expand_term(self, term, prefix):
+        """Termes de l'index correspondant à un terme de la requête (préfixe pour le dernier)"""
+        if not prefix:
+            return [term] if term in self._postings else []
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        start = bisect.bisect_left(self._sorted_terms, term)
+        matches = []
+        for candidate in self._sorted_terms[start:]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query, limit=50, repo_path=None):
+        """Rechercher des éléments (tous les termes requis, classement BM25, sans accents)
+        (repo_path: seuls les fichiers de ce repository sont retournés)"""
+        terms = tokenize(query)
+        repo_prefix = str(Path(repo_path).resolve()) + os.sep if repo_path else None
+        if not terms:
+            return {"success": True, "count": 0, "matches": []}
+        with self._search_lock:
+            total = len(self._documents)
+            if not total:
+                return {"success": True, "count": 0, "matches": []}
+            average_length = sum(doc["length"] for doc in self._documents.values()) / total
+            scores = None
+            for position, term in enumerate(terms):
+                # Le dernier terme est complété comme préfixe (recherche pendant la frappe)
+                expanded = self._expand_term(term, prefix=position == len(terms) - 1)
+                term_scores = defaultdict(float)
+                for candidate in expanded:
+                    postings = self._postings[candidate]
+                    idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_key, frequency in postings.items():
+                        length = self._documents[doc_key]["length"] or 1
+                        norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * length / average_length)
+                        term_scores[doc_key] += idf * frequency * (self.BM25_K1 + 1) / (frequency + norm)
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {doc_key: score + term_scores[doc_key]
+                              for doc_key, score in scores.items() if doc_key in term_scores}
+                if not scores:
+                    break
+            if repo_prefix and scores:
+                scores = {doc_key: score for doc_key, score in scores.items()
+                          if doc_key[0].startswith(repo_prefix)}
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            matches = [dict(self._documents[doc_key], score=round(score, 3))
+                       for doc_key, score in ranked]
+        for match in matches:
+            del match["length"]
+        return {"success": True, "count": len(matches), "matches": matches}
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regroupement CSS - Une feuille minifiée par page (plus une feuille commune) au lieu de N requêtes
+Les @import sont inlinés, les url() recalculées et la feuille Google Fonts intégrée au bundle
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import urllib.request
+from collections import Counter
+from html import escape
+from pathlib import Path
+
+from html_rewriter import collect_start_tags, line_span, local_path, newline_of, splice
+
+
+CSS_TOKEN_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL)
+URL_RE = re.compile(r'url\(\s*(["\']?)(.*?)\1\s*\)', re.DOTALL)
+IMPORT_RE = re.compile(
+    r'@import\s+(?:url\(\s*(["\']?)(.*?)\1\s*\)|(["\'])(.*?)\3)\s*([^;]*);', re.DOTALL)
+CHARSET_RE = re.compile(r'@charset\s+["\'][^"\']*["\']\s*;', re.IGNORECASE)
+GOOGLE_FONTS_HOST = "fonts.googleapis.com"
+# Google Fonts adapte la feuille au navigateur: un navigateur récent reçoit des polices woff2
+FONTS_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+
+def minify_css(css):
+    """Minifier une feuille: commentaires et espaces superflus retirés, chaînes intactes"""
+    parts = []
+    position = 0
+    for match in CSS_TOKEN_RE.finditer(css):
+        parts.append(_minify_code(css[position:match.start()]))
+        # Les chaînes sont conservées telles quelles, les commentaires supprimés
+        if match.group(1):
+            parts.append(match.group(1))
+        position = match.end()
+    parts.append(_minify_code(css[position:]))
+    return ''.join(parts).strip()
+
+
+def _minify_code(code):
+    """Minifier un morceau de CSS sans chaîne ni commentaire"""
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+    code = re.sub(r':\s+', ':', code)
+    return code.replace(';}', '}')
+
+
+class CSSBundler:
+    """Regroupe et minifie les feuilles de style de chaque page"""
+
+    BUNDLE_DIR = "style/bundles"
+    HASH_LENGTH = 8
+
+    def __init__(self, logger, cache_dir=None, inline_fonts=True, timeout=5):
+        self.logger = logger
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".rout_art_cms" / "css_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.inline_fonts = inline_fonts
+        self.timeout = timeout
+        # URLs externes injoignables: pas de nouvel essai pendant la même session
+        self._unreachable = set()
+
+    # ======= Lecture des feuilles =======
+
+    def page_stylesheets(self, content, page_path, repo_path):
+        """Balises <link rel="stylesheet"> d'une page: [(balise, chemin local ou URL externe)]"""
+        repo_path = Path(repo_path).resolve()
+        stylesheets = []
+        for tag in collect_start_tags(content, ("link",)):
+            rel = tag["attrs"].get("rel", "").lower().split()
+            if "stylesheet" not in rel or "alternate" in rel or "disabled" in tag["attrs"]:
+                continue
+            href = tag["attrs"].get("href", "")
+            path = local_path(href)
+            if path is None:
+                stylesheets.append((tag, href))
+                continue
+            base = repo_path if path.startswith("/") else Path(page_path).parent
+            stylesheets.append((tag, str((base / path.lstrip("/")).resolve())))
+        return stylesheets
+
+    def flatten(self, css_path, bundle_dir, media="", seen=None, missing=None):
+        """Feuilles chargées par `css_path` (imports inlinés), url() recalculées pour `bundle_dir`"""
+        seen = set() if seen is None else seen
+        missing = [] if missing is None else missing
+        css_path = Path(css_path)
+        if str(css_path) in seen:
+            # Import circulaire
+            return []
+        try:
+            with open(css_path, 'r', encoding='utf-8') as f:
+                css = f.read()
+        except OSError:
+            missing.append(str(css_path))
+            return []
+        seen = seen | {str(css_path)}
+
+        sheets = []
+        body = []
+        position = 0
+        for match in IMPORT_RE.finditer(css):
+            body.append(css[position:match.start()])
+            position = match.end()
+            target = match.group(2) if match.group(2) is not None else match.group(4)
+            import_media = self._combine_media(media, match.group(5).strip())
+            path = local_path(target)
+            if path is None:
+                # Import externe: conservé et remonté en tête du bundle
+                sheets.append((target, import_media, None))
+                continue
+            sheets.extend(self.flatten((css_path.parent / path).resolve(), bundle_dir,
+                                       import_media, seen, missing))
+        body.append(css[position:])
+        css = CHARSET_RE.sub('', ''.join(body))
+        sheets.append((str(css_path), media, self._rebase_urls(css, css_path.parent, bundle_dir)))
+        return sheets
+
+    def _combine_media(self, outer, inner):
+        """Media query d'un import imbriqué"""
+        if outer and inner:
+            return f"{outer} and {inner}"
+        return outer or inner
+
+    def _rebase_urls(self, css, css_dir, bundle_dir):
+        """Réécrire les url() relatives pour qu'elles restent valides depuis le dossier du bundle"""
+        def rebase(match):
+            quote, url = match.group(1), match.group(2).strip()
+            if url.startswith(("data:", "#", "/")) or local_path(url) is None:
+                return match.group(0)
+            target = os.path.normpath(os.path.join(css_dir, url))
+            relative = Path(os.path.relpath(target, bundle_dir)).as_posix()
+            return f"url({quote}{relative}{quote})"
+        return URL_RE.sub(rebase, css)
+
+    def fetch_external(self, url):
+        """Feuille externe (Google Fonts) téléchargée une fois puis lue depuis le cache disque"""
+        url = url if not url.startswith("//") else "https:" + url
+        cache_file = self.cache_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".css")
+        if cache_file.exists():
+            return cache_file.read_text(encoding="utf-8")
+        if url in self._unreachable:
+            return None
+        try:
+            request = urllib.request.Request(url, headers={"User-Agent": FONTS_USER_AGENT})
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                css = response.read().decode("utf-8")
+        except Exception as e:
+            self._unreachable.add(url)
+            self.logger.log(f"Feuille externe non intégrée ({url}): {e}")
+            return None
+        cache_file.write_text(css, encoding="utf-8")
+        return css
+
+    # ======= Construction des bundles =======
+
+    def page_sheets(self, content, page_path, repo_path):
+        """Feuilles d'une page dans l'ordre de la cascade, chaque fichier gardé à sa dernière position"""
+        # Le dossier de sortie reproduit l'arborescence du site: url() calculées depuis style/bundles
+        bundle_dir = Path(repo_path).resolve() / self.BUNDLE_DIR
+        sheets, missing, kept_links = [], [], []
+        for tag, target in self.page_stylesheets(content, page_path, repo_path):
+            media = tag["attrs"].get("media", "").strip()
+            if media == "all":
+                media = ""
+            if not os.path.isabs(target):
+                sheets.append((target, media, None))
+                continue
+            sheets.extend(self.flatten(target, bundle_dir, media, missing=missing))
+
+        resolved = []
+        for source, media, css in sheets:
+            if css is None:
+                # Feuille externe: intégrée si c'est Google Fonts, sinon laissée en <link>
+                css = self.fetch_external(source) if (
+                    self.inline_fonts and GOOGLE_FONTS_HOST in source) else None
+                if css is None:
+                    kept_links.append(source)
+                    continue
+            resolved.append((source, media, css))
+        # Une feuille importée plusieurs fois: seule la dernière occurrence compte dans la cascade
+        last = {(source, media): index for index, (source, media, _) in enumerate(resolved)}
+        ordered = [sheet for index, sheet in enumerate(resolved) if last[sheet[:2]] == index]
+        return ordered, missing, kept_links
+
+    def _bundle_css(self, sheets):
+        """Contenu minifié d'un bundle (feuilles conditionnelles enveloppées dans @media)"""
+        blocks = []
+        for _source, media, css in sheets:
+            css = minify_css(css)
+            blocks.append(f"@media {media}{{{css}}}" if media else css)
+        return "\n".join(blocks) + "\n"
+
+    def _write_bundle(self, output_dir, name, sheets):
+        """Écrire un bundle nommé d'après son contenu: index.3f9a1c2b.css"""
+        css = self._bundle_css(sheets).encode("utf-8")
+        digest = hashlib.sha1(css).hexdigest()[:self.HASH_LENGTH]
+        target = Path(output_dir) / self.BUNDLE_DIR / f"{name}.{digest}.css"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            target.write_bytes(css)
+        return target, len(css)
+
+    def sheet_keys(self, sheets):
+        """Identité des feuilles d'une page: (source, media)"""
+        return tuple((source, media) for source, media, _css in sheets)
+
+    def shared_prefix(self, page_keys, sheet_sizes):
+        """Feuilles communes en tête de plusieurs pages (celles qui économisent le plus d'octets)"""
+        counts = Counter()
+        for keys in page_keys.values():
+            for length in range(1, len(keys) + 1):
+                counts[tuple(keys[:length])] += 1
+
+        def saved(prefix):
+            return sum(sheet_sizes[key] for key in prefix) * (counts[prefix] - 1)
+
+        return max((prefix for prefix, count in counts.items() if count > 1), key=saved, default=())
+
+    def write_page_bundles(self, output_dir, name, sheets, shared):
+        """Bundles d'une page: le bundle commun si elle commence par les feuilles communes, puis le sien"""
+        bundles = []
+        if shared and self.sheet_keys(sheets[:len(shared)]) == tuple(shared):
+            bundles.append(self._write_bundle(output_dir, "shared", sheets[:len(shared)]))
+            sheets = sheets[len(shared):]
+        if sheets:
+            bundles.append(self._write_bundle(output_dir, name, sheets))
+        return bundles
+
+    def rewrite_page(self, content, page_path, repo_path, bundle_paths, kept_links):
+        """Remplacer les <link rel="stylesheet"> d'une page par ceux des bundles"""
+        page_dir = Path(page_path).parent.resolve()
+        stylesheets = self.page_stylesheets(content, page_path, repo_path)
+        if not stylesheets:
+            return content
+        hrefs = kept_links + [posixpath.relpath(Path(bundle).as_posix(), page_dir.as_posix())
+                              for bundle in bundle_paths]
+        links = [f'<link href="{escape(href, quote=True)}" rel="stylesheet"/>' for href in hrefs]
+        replacements = [line_span(content, tag["start"], tag["end"]) + ('',)
+                        for tag, _ in stylesheets[1:]]
+        # Les nouvelles balises reprennent l'indentation de la première
+        first = stylesheets[0][0]
+        indent = content[content.rfind('\n', 0, first["start"]) + 1:first["start"]]
+        separator = newline_of(content) + (indent if not indent.strip() else '')
+        replacements.append((first["start"], first["end"], separator.join(links)))
+        return splice(content, replacements)
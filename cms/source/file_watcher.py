@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Surveillance de Fichiers - Notifie les créations, modifications et suppressions de fichiers
+Utilise inotify sous Linux et un scan périodique (mtime) ailleurs, avec regroupement des événements
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+# Constantes inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Surveille des dossiers et appelle un callback avec les changements regroupés"""
+
+    BACKENDS = ("auto", "inotify", "polling")
+
+    def __init__(self, logger, debounce=0.3, poll_interval=1.0, backend="auto"):
+        self.logger = logger
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.requested_backend = backend if backend in self.BACKENDS else "auto"
+        self.backend = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake_pipe = None
+        self._pending = {}
+        self._last_event = 0.0
+
+    def is_running(self):
+        """Indique si la surveillance est active"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, directories, callback, suffixes=(".html",)):
+        """Surveiller les fichiers des dossiers donnés (non récursif) portant l'une des extensions"""
+        self.stop()
+        self._directories = [Path(directory).resolve() for directory in directories
+                             if Path(directory).is_dir()]
+        self._callback = callback
+        self._suffixes = tuple(suffixes)
+        self._pending = {}
+        self._stop_event = threading.Event()
+
+        inotify = None
+        if self.requested_backend in ("auto", "inotify"):
+            inotify = self._open_inotify()
+        if inotify is None and self.requested_backend == "inotify":
+            self.logger.log("inotify indisponible, surveillance par scan périodique")
+        if inotify is not None:
+            self.backend = "inotify"
+            self._wake_pipe = os.pipe()
+            target, args = self._run_inotify, inotify
+        else:
+            self.backend = "polling"
+            target, args = self._run_polling, None
+
+        self._thread = threading.Thread(target=target, args=(args,),
+                                        name="file-watcher", daemon=True)
+        self._thread.start()
+        self.logger.log(
+            f"Surveillance des fichiers ({self.backend}): {len(self._directories)} dossier(s)")
+        return {"success": True, "backend": self.backend}
+
+    def stop(self, timeout=2.0):
+        """Arrêter la surveillance"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        if self._wake_pipe:
+            try:
+                os.write(self._wake_pipe[1], b"x")
+            except OSError:
+                pass
+        self._thread.join(timeout)
+        self._thread = None
+        if self._wake_pipe:
+            for fd in self._wake_pipe:
+                os.close(fd)
+            self._wake_pipe = None
+
+    def _matches(self, name):
+        """Filtrer les fichiers surveillés (les fichiers temporaires cachés sont ignorés)"""
+        return not name.startswith(".") and name.endswith(self._suffixes)
+
+    # ======= Regroupement des événements =======
+
+    def _queue(self, path, kind):
+        """Mémoriser un événement en attendant la fin de la rafale"""
+        previous = self._pending.get(path)
+        # Un fichier créé puis modifié reste "créé"; créé puis supprimé s'annule
+        if previous == "created" and kind == "modified":
+            kind = "created"
+        elif previous == "created" and kind == "deleted":
+            kind = None
+        elif previous == "deleted" and kind == "created":
+            kind = "modified"
+        if kind is None:
+            self._pending.pop(path, None)
+        else:
+            self._pending[path] = kind
+        self._last_event = time.monotonic()
+
+    def _flush_if_quiet(self):
+        """Envoyer les événements regroupés si aucun n'est arrivé depuis le délai de debounce"""
+        if not self._pending or time.monotonic() - self._last_event < self.debounce:
+            return
+        pending, self._pending = self._pending, {}
+        changes = {"created": [], "modified": [], "deleted": []}
+        for path, kind in sorted(pending.items()):
+            changes[kind].append(path)
+        try:
+            self._callback(changes)
+        except Exception as e:
+            self.logger.log(f"Erreur dans le callback de surveillance: {e}")
+
+    def _timeout(self, idle_timeout):
+        """Délai d'attente du prochain événement"""
+        if not self._pending:
+            return idle_timeout
+        return max(0.0, self.debounce - (time.monotonic() - self._last_event))
+
+    # ======= Backend inotify =======
+
+    def _open_inotify(self):
+        """Initialiser inotify (Linux uniquement), None si indisponible"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            watches = {}
+            for directory in self._directories:
+                wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    os.close(fd)
+                    raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+                watches[wd] = directory
+            return fd, watches
+        except (OSError, AttributeError) as e:
+            self.logger.log(f"inotify indisponible ({e})")
+            return None
+
+    def _run_inotify(self, inotify):
+        """Boucle de lecture des événements inotify"""
+        fd, watches = inotify
+        wake_fd = self._wake_pipe[0]
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([fd, wake_fd], [], [], self._timeout(None))
+                if fd in readable:
+                    try:
+                        data = os.read(fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b""
+                    self._parse_inotify_events(data, watches)
+                self._flush_if_quiet()
+        finally:
+            os.close(fd)
+
+    def _parse_inotify_events(self, data, watches):
+        """Convertir les événements inotify bruts en événements created/modified/deleted"""
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # File pleine: on considère tous les fichiers surveillés comme modifiés
+                for directory in self._directories:
+                    for path in self._scan(directory):
+                        self._queue(path, "modified")
+                continue
+            directory = watches.get(wd)
+            if directory is None or mask & (IN_IGNORED | IN_ISDIR) or not self._matches(name):
+                continue
+            path = str(directory / name)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._queue(path, "created")
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._queue(path, "deleted")
+            else:
+                self._queue(path, "modified")
+
+    # ======= Backend scan périodique =======
+
+    def _scan(self, directory):
+        """Fichiers surveillés d'un dossier: chemin -> (mtime, taille)"""
+        snapshot = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if self._matches(entry.name) and entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+        return snapshot
+
+    def _run_polling(self, _unused):
+        """Boucle de scan périodique comparant mtime et taille"""
+        snapshot = {}
+        for directory in self._directories:
+            snapshot.update(self._scan(directory))
+        while not self._stop_event.wait(min(self.poll_interval, self._timeout(self.poll_interval))):
+            current = {}
+            for directory in self._directories:
+                current.update(self._scan(directory))
+            for path in current.keys() - snapshot.keys():
+                self._queue(path, "created")
+            for path in snapshot.keys() - current.keys():
+                self._queue(path, "deleted")
+            for path in current.keys() & snapshot.keys():
+                if current[path] != snapshot[path]:
+                    self._queue(path, "modified")
+            snapshot = current
+            self._flush_if_quiet()
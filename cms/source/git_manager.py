@@ -7,8 +7,11 @@ Gestionnaire Git - Opérations de synchronisation avec GitHub
 from git import Repo, GitCommandError
 from pathlib import Path
 import datetime
+import io
 import os
+import shutil
 import subprocess
+import tarfile
 
 
 class GitManager:
@@ -89,6 +92,56 @@ class GitManager:
             self.logger.log(f"Erreur: {error_msg}")
             return {"success": False, "message": error_msg}
 
+    def export_revision(self, repo_path, revision, target_dir, fetch=True):
+        """Extraire une révision (ex: origin/main) dans un dossier, sans toucher à la copie de travail"""
+        try:
+            self._ensure_git_config(repo_path)
+            repo = Repo(repo_path)
+            if fetch and revision.startswith("origin/"):
+                repo.remotes.origin.fetch()
+            commit = repo.commit(revision)
+
+            archive = io.BytesIO()
+            repo.archive(archive, treeish=commit.hexsha, format="tar")
+            archive.seek(0)
+            target_dir = Path(target_dir)
+            if target_dir.exists():
+                shutil.rmtree(target_dir)
+            target_dir.mkdir(parents=True)
+            with tarfile.open(fileobj=archive) as tar:
+                if hasattr(tarfile, "data_filter"):
+                    # Refuse les chemins absolus, les "../" et les liens qui sortent du dossier
+                    tar.extractall(target_dir, filter="data")
+                else:
+                    tar.extractall(target_dir, members=self._safe_members(tar, target_dir))
+
+            message = f"✓ {revision} ({commit.hexsha[:7]}) extrait dans {target_dir}"
+            self.logger.log(message)
+            return {"success": True, "message": message, "path": str(target_dir),
+                    "commit": commit.hexsha[:7]}
+        except GitCommandError as e:
+            error_msg = f"✗ Erreur Git: {str(e)}"
+            self.logger.log(f"Erreur Git: {error_msg}")
+            return {"success": False, "message": error_msg}
+        except Exception as e:
+            error_msg = f"✗ Erreur: {str(e)}"
+            self.logger.log(f"Erreur: {error_msg}")
+            return {"success": False, "message": error_msg}
+
+    def _safe_members(self, tar, target_dir):
+        """Entrées d'archive extraites dans `target_dir` (Python sans filtre d'extraction)"""
+        root = Path(target_dir).resolve()
+        members = []
+        for member in tar.getmembers():
+            destination = (root / member.name).resolve()
+            if destination != root and root not in destination.parents:
+                raise ValueError(f"Entrée d'archive hors du dossier cible: {member.name}")
+            if not (member.isfile() or member.isdir()):
+                # Liens et fichiers spéciaux ignorés: seul le contenu du site est utile à l'aperçu
+                continue
+            members.append(member)
+        return members
+
     def push(self, repo_path, commit_message):
         """Push les modifications vers le repository distant"""
         try:
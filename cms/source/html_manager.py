@@ -5,15 +5,222 @@ Gestionnaire HTML - Édition et manipulation des fichiers HTML
 """
 
 from bs4 import BeautifulSoup
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from html import escape, unescape
+from html.parser import HTMLParser
 from pathlib import Path
 import datetime
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from html_rewriter import process_map
+
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Éléments sans balise fermante (fermés immédiatement, comme le fait BeautifulSoup)
+VOID_ELEMENTS = {
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed',
+    'frame', 'hr', 'image', 'img', 'input', 'isindex', 'keygen', 'link',
+    'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+}
+
+# Éléments dont le texte est exclu de get_text() par BeautifulSoup
+NON_TEXT_ELEMENTS = {'script', 'style', 'template'}
+
+# Éléments où BeautifulSoup conserve les chaînes composées uniquement d'espaces
+PRESERVE_WHITESPACE_ELEMENTS = {'pre', 'textarea'}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+SRC_ATTRIBUTE_RE = re.compile(
+    r'(\ssrc\s*=\s*)("[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE)
+
+
+class EditableTokenizer(HTMLParser):
+    """Tokenizer léger: repère les éléments 'editable' et leurs positions dans la source"""
+
+    def __init__(self, content):
+        super().__init__(convert_charrefs=True)
+        self.content = content
+        self.spans = []
+        self._stack = []
+        self._open_spans = []
+        self._last_node = None
+        self._non_text_depth = 0
+        self._preserve_depth = 0
+        self._line_offsets = [0]
+        for line in content.split('\n')[:-1]:
+            self._line_offsets.append(self._line_offsets[-1] + len(line) + 1)
+        self.feed(content)
+        self.close()
+        self._end_node(len(content))
+        # Éléments jamais fermés: ils s'étendent jusqu'à la fin du document
+        self._close_until(0, len(content), len(content))
+
+    def _offset(self):
+        """Position absolue (en caractères) du token courant"""
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+    def _end_node(self, end=None):
+        """Le nœud texte précédent se termine où commence le token courant"""
+        if self._last_node:
+            self._last_node["end"] = self._offset() if end is None else end
+            self._last_node = None
+
+    def handle_starttag(self, tag, attrs):
+        self._end_node()
+        start = self._offset()
+        # Balise enfant: le contenu des éléments ouverts n'est plus du texte seul
+        for open_span in self._open_spans:
+            open_span["children"] = True
+        inner_start = start + len(self.get_starttag_text() or '')
+        attributes = {name: value if value is not None else '' for name, value in attrs}
+        span = None
+        if 'editable' in attributes.get('class', '').split():
+            span = {
+                "tag": tag,
+                "attrs": attributes,
+                "start": start,
+                "inner_start": inner_start,
+                "inner_end": None,
+                "end": None,
+                "text": [],
+                "nodes": [],
+                "children": False
+            }
+            self.spans.append(span)
+        if tag in VOID_ELEMENTS:
+            if span:
+                span["inner_end"] = span["end"] = inner_start
+            return
+        self._stack.append((tag, span))
+        if span:
+            self._open_spans.append(span)
+        if tag in NON_TEXT_ELEMENTS:
+            self._non_text_depth += 1
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_depth += 1
+
+    def handle_data(self, data):
+        self._end_node()
+        if self._open_spans and not self._non_text_depth:
+            text = data
+            if not self._preserve_depth and not data.strip(ASCII_SPACES):
+                # Comme BeautifulSoup: une chaîne d'espaces devient un seul saut de ligne ou espace
+                text = '\n' if '\n' in data else ' '
+            # Nœud texte avec sa plage dans la source (fin connue au token suivant)
+            node = {"start": self._offset(), "end": None, "data": data, "text": text,
+                    "owner": self._open_spans[-1]}
+            self._last_node = node
+            for span in self._open_spans:
+                span["text"].append(text)
+                span["nodes"].append(node)
+
+    def handle_comment(self, data):
+        self._end_node()
+
+    def handle_decl(self, decl):
+        self._end_node()
+
+    def handle_pi(self, data):
+        self._end_node()
+
+    def unknown_decl(self, data):
+        self._end_node()
+        if data.startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            end = self._offset() + len(self.get_starttag_text() or '')
+            self._close_until(len(self._stack) - 1, end, end)
+
+    def handle_endtag(self, tag):
+        self._end_node()
+        # Comme BeautifulSoup: fermer la balise ouverte la plus récente de ce nom
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                start = self._offset()
+                end = self.content.find('>', start)
+                end = len(self.content) if end == -1 else end + 1
+                self._close_until(position, start, end)
+                return
+
+    def _close_until(self, position, inner_end, end):
+        """Fermer les balises ouvertes à partir de la position donnée dans la pile"""
+        while len(self._stack) > position:
+            tag, span = self._stack.pop()
+            if tag in NON_TEXT_ELEMENTS:
+                self._non_text_depth -= 1
+            if tag in PRESERVE_WHITESPACE_ELEMENTS:
+                self._preserve_depth -= 1
+            if span:
+                self._open_spans.pop()
+                span["inner_end"] = inner_end
+                # Les balises fermées implicitement se terminent où commence la fermeture parente
+                span["end"] = end if len(self._stack) == position else inner_end
+
+
+class _SilentLogger:
+    """Logger sans sortie, utilisé dans les processus de travail"""
+
+    def log(self, message, level="INFO"):
+        pass
+
+
+def _replace_in_file(file_path, options):
+    """Rechercher/remplacer dans les éléments éditables d'un fichier (processus de travail)"""
+    manager = HTMLManager(_SilentLogger(), save_mode=options["save_mode"],
+                          parser_backend=options["parser_backend"])
+    flags = re.IGNORECASE if options["ignore_case"] else 0
+    search = options["search"] if options["use_regex"] else re.escape(options["search"])
+    pattern = re.compile(search, flags)
+    replacement = options["replacement"]
+    if not options["use_regex"]:
+        # Remplacement littéral: pas d'interprétation des \1 ou \g<nom>
+        literal = replacement
+        replacement = lambda match: literal  # noqa: E731
+    return manager.replace_in_file(file_path, pattern, replacement, dry_run=options["dry_run"],
+                                   expected_hash=options["expected_hashes"].get(str(file_path)))
 
 
 class HTMLManager:
     """Gère la lecture et modification des fichiers HTML"""
 
-    def __init__(self, logger):
+    # "splice": ne réécrire que les plages modifiées, "prettify": réécrire tout le document
+    SAVE_MODES = ("splice", "prettify")
+    # "auto": le backend le plus rapide dont le résultat est identique à html.parser sur toutes les pages
+    PARSER_BACKENDS = ("auto", "html.parser", "lxml", "stream")
+
+    def __init__(self, logger, save_mode="splice", parser_backend="auto", cache_size=64):
+        if save_mode not in self.SAVE_MODES:
+            raise ValueError(f"save_mode doit être l'un de {self.SAVE_MODES}")
+        if parser_backend not in self.PARSER_BACKENDS:
+            raise ValueError(
+                f"parser_backend doit être l'un de {self.PARSER_BACKENDS}")
+        if parser_backend == "lxml" and not LXML_AVAILABLE:
+            raise ValueError("Le backend lxml nécessite: pip install lxml")
         self.logger = logger
+        self.save_mode = save_mode
+        self.parser_backend = parser_backend
+        self._resolved_backend = None if parser_backend == "auto" else parser_backend
+        # Cache LRU des documents parsés: chemin -> mtime, taille, hash, arbre et éléments éditables
+        self.cache_size = cache_size
+        self._documents = OrderedDict()
+        self._documents_lock = threading.Lock()
+        self._prewarm_cancel = None
 
     def read_file(self, file_path):
         """Lire un fichier HTML"""
@@ -27,22 +234,133 @@ class HTMLManager:
             self.logger.log(error_msg)
             return {"success": False, "content": "", "error": error_msg}
 
-    def write_file(self, file_path, content):
-        """Écrire un fichier HTML"""
+    def write_file(self, file_path, content, newline=None):
+        """Écrire un fichier HTML (atomique: fichier temporaire puis remplacement)"""
+        temp_path = None
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
+            path = Path(file_path)
+            fd, temp_path = tempfile.mkstemp(
+                dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+            with open(fd, 'w', encoding='utf-8', newline=newline) as f:
                 f.write(content)
+            if path.exists():
+                shutil.copymode(path, temp_path)
+            os.replace(temp_path, path)
+            temp_path = None
             self.logger.log(f"Fichier écrit: {Path(file_path).name}")
             return {"success": True, "message": f"Fichier sauvegardé: {Path(file_path).name}"}
         except Exception as e:
             error_msg = f"Erreur lors de l'écriture: {str(e)}"
             self.logger.log(error_msg)
             return {"success": False, "error": error_msg}
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # ======= Backends de parsing =======
+
+    def available_backends(self):
+        """Lister les backends utilisables dans cet environnement"""
+        backends = ["html.parser", "stream"]
+        if LXML_AVAILABLE:
+            backends.insert(1, "lxml")
+        return backends
+
+    def get_backend(self):
+        """Backend effectivement utilisé pour l'extraction (None si pas encore choisi)"""
+        return self._resolved_backend
+
+    def _tree_builder(self):
+        """Tree builder BeautifulSoup pour les opérations sur l'arbre complet"""
+        return 'lxml' if self._resolved_backend == 'lxml' else 'html.parser'
+
+    def select_backend(self, samples):
+        """Choisir le backend le plus rapide dont l'extraction est identique à html.parser"""
+        try:
+            samples = list(samples)
+            timings = {}
+            outputs = {}
+            for backend in self.available_backends():
+                start = time.perf_counter()
+                outputs[backend] = [self.comparable_elements(
+                    self._parse_with_backend(sample, backend, with_spans=False)["elements"])
+                    for sample in samples]
+                timings[backend] = time.perf_counter() - start
+            identical = [backend for backend in timings
+                         if outputs[backend] == outputs["html.parser"]]
+            selected = min(identical, key=lambda backend: timings[backend])
+            self._resolved_backend = selected
+            self.logger.log(
+                f"Backend de parsing sélectionné: {selected} ({timings[selected] * 1000:.1f} ms)")
+            return {"success": True, "backend": selected, "timings": timings, "identical": identical}
+        except Exception as e:
+            self._resolved_backend = "html.parser"
+            return {"success": False, "backend": "html.parser", "error": str(e)}
+
+    def select_backend_for_files(self, file_paths):
+        """Choisir le backend sur toutes les pages: il doit être identique à html.parser sur chacune"""
+        samples = []
+        for file_path in file_paths:
+            try:
+                with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                    samples.append(f.read())
+            except OSError:
+                continue
+        return self.select_backend(samples)
+
+    def _active_backend(self):
+        """Backend à utiliser maintenant: html.parser (la référence) tant que toutes les pages n'ont pas été comparées"""
+        return self._resolved_backend or "html.parser"
+
+    def comparable_elements(self, elements):
+        """Éléments sans leur sérialisation HTML (qui dépend du backend)"""
+        return [{key: value for key, value in element.items() if key != "content"}
+                for element in elements]
+
+    def _parse_with_backend(self, raw_content, backend, with_spans=True):
+        """Parser un document et extraire ses éléments éditables avec le backend donné
+        (with_spans: plages des éléments dans la source, nécessaires à la sauvegarde "splice")"""
+        content = raw_content.replace('\r\n', '\n').replace('\r', '\n')
+        if backend == "stream":
+            spans = EditableTokenizer(raw_content).spans
+            return {"content": content, "soup": None, "nodes": None, "spans": spans,
+                    "elements": self._build_stream_elements_data(spans, raw_content)}
+        soup = BeautifulSoup(content, backend)
+        nodes = soup.find_all(class_='editable')
+        if not with_spans:
+            return {"content": content, "soup": soup, "nodes": nodes, "spans": None,
+                    "elements": self._build_elements_data(nodes)}
+        spans = EditableTokenizer(raw_content).spans
+        return {"content": content, "soup": soup, "nodes": nodes,
+                "spans": spans if self._spans_match(spans, nodes) else None,
+                "elements": self._build_elements_data(nodes)}
+
+    def _build_stream_elements_data(self, spans, raw_content):
+        """Construire la description des éléments à partir du tokenizer"""
+        elements_data = []
+        for index, span in enumerate(spans):
+            attributes = span["attrs"]
+            is_iframe = span["tag"] == 'iframe'
+            if is_iframe:
+                editable_value = attributes.get('src', '')
+            else:
+                editable_value = ''.join(span["text"]).replace(
+                    '\r\n', '\n').replace('\r', '\n').strip()
+            elements_data.append({
+                "index": index,
+                "id": attributes.get('id', None),
+                "tag": span["tag"],
+                "class": ' '.join(attributes.get('class', '').split()),
+                "content": raw_content[span["start"]:span["end"]].replace('\r\n', '\n'),
+                "is_iframe": is_iframe,
+                "editable_value": editable_value
+            })
+        return elements_data
 
     def parse_html(self, content):
         """Parser le contenu HTML"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self._tree_builder())
             return {"success": True, "soup": soup}
         except Exception as e:
             error_msg = f"Erreur lors du parsing: {str(e)}"
@@ -52,7 +370,7 @@ class HTMLManager:
     def find_element(self, content, selector):
         """Trouver un élément par sélecteur CSS"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self._tree_builder())
             element = soup.select_one(selector)
             if element:
                 return {"success": True, "element": str(element)}
@@ -64,11 +382,11 @@ class HTMLManager:
     def replace_element(self, content, selector, new_content):
         """Remplacer un élément"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self._tree_builder())
             element = soup.select_one(selector)
 
             if element:
-                element.replace_with(BeautifulSoup(new_content, 'html.parser'))
+                element.replace_with(BeautifulSoup(new_content, self._tree_builder()))
                 return {"success": True, "content": str(soup.prettify())}
             else:
                 return {"success": False, "error": f"Élément non trouvé: {selector}"}
@@ -78,7 +396,7 @@ class HTMLManager:
     def find_all_elements(self, content, selector):
         """Trouver tous les éléments correspondant au sélecteur"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self._tree_builder())
             elements = soup.select(selector)
             return {"success": True, "count": len(elements), "elements": [str(e) for e in elements]}
         except Exception as e:
@@ -87,7 +405,7 @@ class HTMLManager:
     def validate_html(self, content):
         """Valider la structure HTML"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self._tree_builder())
             issues = []
             if not soup.find('html'):
                 issues.append("Balise <html> manquante")
@@ -104,42 +422,448 @@ class HTMLManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def extract_editable_elements(self, content):
-        """Extraire uniquement les éléments avec la classe 'editable'"""
+    def extract_editable_elements(self, content, backend=None):
+        """Extraire uniquement les éléments avec la classe 'editable' (backend actif par défaut)"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
-            editable_elements = soup.find_all(class_='editable')
-            if not editable_elements:
+            elements_data = self._parse_with_backend(
+                content, backend or self._active_backend(), with_spans=False)["elements"]
+            if not elements_data:
                 return {"success": False, "error": "Aucun élément éditable trouvé (class='editable')", "elements": []}
-            elements_data = []
-            for index, elem in enumerate(editable_elements):
-                elem_id = elem.get('id', None)
-                elem_tag = elem.name
-                elem_class = ' '.join(elem.get('class', []))
-                elem_content = str(elem)
-                editable_value = None
-                is_iframe = elem_tag == 'iframe'
-                if is_iframe:
-                    editable_value = elem.get('src', '')
-                else:
-                    editable_value = elem.get_text().strip()
-                elements_data.append({
-                    "index": index,
-                    "id": elem_id,
-                    "tag": elem_tag,
-                    "class": elem_class,
-                    "content": elem_content,
-                    "is_iframe": is_iframe,
-                    "editable_value": editable_value
-                })
             return {"success": True, "count": len(elements_data), "elements": elements_data}
         except Exception as e:
             return {"success": False, "error": str(e), "elements": []}
-    
+
+    def _build_elements_data(self, editable_elements):
+        """Construire la description des éléments éditables (texte pré-calculé)"""
+        elements_data = []
+        for index, elem in enumerate(editable_elements):
+            elem_tag = elem.name
+            is_iframe = elem_tag == 'iframe'
+            if is_iframe:
+                editable_value = elem.get('src', '')
+            else:
+                editable_value = elem.get_text().strip()
+            elements_data.append({
+                "index": index,
+                "id": elem.get('id', None),
+                "tag": elem_tag,
+                "class": ' '.join(elem.get('class', [])),
+                "content": str(elem),
+                "is_iframe": is_iframe,
+                "editable_value": editable_value
+            })
+        return elements_data
+
+    # ======= Cache des documents =======
+
+    def load_document(self, file_path):
+        """Charger un document parsé depuis le cache (clé: chemin + mtime + hash)"""
+        try:
+            path = Path(file_path).resolve()
+            key = str(path)
+            stat = path.stat()
+            with self._documents_lock:
+                document = self._documents.get(key)
+                if document:
+                    self._documents.move_to_end(key)
+            if document and document["mtime"] == stat.st_mtime_ns and document["size"] == stat.st_size:
+                return {"success": True, "document": document, "cached": True}
+
+            # Lecture brute (fins de ligne conservées) pour pouvoir réécrire octet pour octet
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                raw_content = f.read()
+            content_hash = hashlib.sha1(raw_content.encode('utf-8')).hexdigest()
+            if document and document["hash"] == content_hash:
+                # Fichier touché mais contenu identique: pas de nouveau parsing
+                document["mtime"] = stat.st_mtime_ns
+                document["size"] = stat.st_size
+                return {"success": True, "document": document, "cached": True}
+
+            document = self._parse_with_backend(
+                raw_content, self._active_backend())
+            document.update({
+                "path": key,
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": content_hash,
+                "raw_content": raw_content,
+                "newline": '\r\n' if '\r\n' in raw_content else '\n'
+            })
+            with self._documents_lock:
+                self._documents[key] = document
+                self._documents.move_to_end(key)
+                while len(self._documents) > self.cache_size:
+                    self._documents.popitem(last=False)
+            return {"success": True, "document": document, "cached": False}
+        except Exception as e:
+            error_msg = f"Erreur lors du chargement: {str(e)}"
+            self.logger.log(error_msg)
+            return {"success": False, "error": error_msg}
+
+    def invalidate_document(self, file_path=None):
+        """Retirer un document du cache (tous si aucun chemin)"""
+        with self._documents_lock:
+            if file_path is None:
+                self._documents.clear()
+            else:
+                self._documents.pop(str(Path(file_path).resolve()), None)
+
+    def prewarm(self, file_paths, max_workers=2, callback=None):
+        """Parser des fichiers en arrière-plan pour remplir le cache (annule le pré-chargement précédent)"""
+        self.cancel_prewarm()
+        cancel_event = threading.Event()
+        self._prewarm_cancel = cancel_event
+        all_paths = list(file_paths)
+        file_paths = all_paths[:self.cache_size]
+
+        def load(file_path):
+            if cancel_event.is_set():
+                return False
+            return not self.load_document(file_path)["cached"]
+
+        def run():
+            if self._resolved_backend is None:
+                # Choix du backend une seule fois, sur toutes les pages du site
+                self.select_backend_for_files(all_paths)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prewarm") as executor:
+                parsed = sum(1 for was_parsed in executor.map(load, file_paths) if was_parsed)
+            elapsed = (time.perf_counter() - start) * 1000
+            if cancel_event.is_set():
+                self.logger.log("Pré-chargement des pages annulé")
+            elif parsed:
+                self.logger.log(
+                    f"Pré-chargement: {parsed}/{len(file_paths)} page(s) parsée(s) en {elapsed:.0f} ms")
+            if callback:
+                callback({"parsed": parsed, "total": len(file_paths),
+                          "cancelled": cancel_event.is_set()})
+
+        threading.Thread(target=run, daemon=True).start()
+        return cancel_event
+
+    def cancel_prewarm(self):
+        """Annuler le pré-chargement en cours"""
+        if self._prewarm_cancel:
+            self._prewarm_cancel.set()
+            self._prewarm_cancel = None
+
+    def get_editable_elements(self, file_path):
+        """Récupérer les éléments éditables d'un fichier via le cache"""
+        result = self.load_document(file_path)
+        if not result["success"]:
+            return {"success": False, "error": result["error"], "elements": []}
+        document = result["document"]
+        elements = document["elements"]
+        if not elements:
+            return {"success": False, "error": "Aucun élément éditable trouvé (class='editable')",
+                    "elements": [], "hash": document["hash"]}
+        return {"success": True, "count": len(elements), "elements": elements,
+                "hash": document["hash"], "cached": result["cached"]}
+
+    def save_editable_elements(self, file_path, values, expected_hash=None):
+        """Appliquer les nouvelles valeurs {index: valeur} et sauvegarder le fichier"""
+        result = self.load_document(file_path)
+        if not result["success"]:
+            return {"success": False, "error": result["error"]}
+        document = result["document"]
+        if expected_hash and document["hash"] != expected_hash:
+            return {"success": False,
+                    "error": f"Le fichier a été modifié sur le disque depuis son ouverture: {Path(file_path).name}"}
+
+        # Seuls les éléments dont la valeur diffère de celle extraite sont appliqués
+        elements = document["elements"]
+        changes = {
+            elem_index: new_value for elem_index, new_value in values.items()
+            if isinstance(elem_index, int) and 0 <= elem_index < len(elements)
+            and new_value != elements[elem_index]["editable_value"]
+        }
+        if not changes:
+            return {"success": True, "changed": False, "hash": document["hash"],
+                    "message": f"Aucune modification: {Path(file_path).name}"}
+        try:
+            if self.save_mode == "splice" and document["spans"] is not None:
+                updated_content, skipped = self._splice_editable_values(document, changes)
+            else:
+                updated_content, skipped = self._prettify_editable_values(document, changes)
+                updated_content = updated_content.replace('\n', document["newline"])
+            if len(skipped) == len(changes):
+                return {"success": False, "skipped": skipped,
+                        "error": "Modification impossible sans perdre les balises internes de: "
+                                 + self.element_labels(elements, skipped)}
+            write_result = self.write_file(file_path, updated_content, newline='')
+            if not write_result["success"]:
+                return write_result
+            write_result["hash"] = hashlib.sha1(
+                updated_content.encode('utf-8')).hexdigest()
+            write_result["changed"] = True
+            write_result["count"] = len(changes) - len(skipped)
+            write_result["skipped"] = skipped
+            return write_result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            # Le contenu a changé: le document sera re-parsé au prochain chargement
+            self.invalidate_document(file_path)
+
+    # ======= Remplacement par lot =======
+
+    def batch_replace(self, file_paths, search, replacement, use_regex=False, ignore_case=False,
+                      dry_run=True, expected_hashes=None, max_workers=None):
+        """Rechercher/remplacer dans les éléments éditables de plusieurs pages (en parallèle)"""
+        if not search:
+            return {"success": False, "error": "Le texte à rechercher est vide"}
+        if use_regex:
+            try:
+                re.compile(search)
+            except re.error as e:
+                return {"success": False, "error": f"Expression régulière invalide: {e}"}
+
+        file_paths = [str(Path(file_path).resolve()) for file_path in file_paths]
+        if self._resolved_backend is None:
+            self.select_backend_for_files(file_paths)
+        options = {
+            "search": search,
+            "replacement": replacement,
+            "use_regex": use_regex,
+            "ignore_case": ignore_case,
+            "dry_run": dry_run,
+            "expected_hashes": expected_hashes or {},
+            "save_mode": self.save_mode,
+            "parser_backend": self._active_backend()
+        }
+        files = process_map(self.logger, "Remplacement", _replace_in_file, file_paths,
+                            [options] * len(file_paths), max_workers=max_workers)
+
+        files = [file_result for file_result in files
+                 if file_result["matches"] or file_result.get("skipped") or "error" in file_result]
+        written = [file_result["file"] for file_result in files if file_result["written"]]
+        for file_path in written:
+            self.invalidate_document(file_path)
+        total = sum(file_result["count"] for file_result in files)
+        if not dry_run:
+            self.logger.log(
+                f"Remplacement par lot: {total} occurrence(s) dans {len(written)} fichier(s)")
+        return {"success": True, "dry_run": dry_run, "files": files, "total": total, "written": written}
+
+    def element_labels(self, elements, indices):
+        """Noms lisibles d'éléments éditables (#id ou [index])"""
+        return ", ".join(f"#{elements[index]['id']}" if elements[index]["id"] else f"[{index}]"
+                         for index in indices)
+
+    def replace_in_file(self, file_path, pattern, replacement, dry_run=True, expected_hash=None):
+        """Remplacer dans les nœuds texte des éléments éditables d'un fichier (les balises ne sont jamais touchées)"""
+        file_result = {"file": str(file_path), "matches": [], "skipped": [], "count": 0, "written": False}
+        loaded = self.load_document(file_path)
+        if not loaded["success"]:
+            file_result["error"] = loaded["error"]
+            return file_result
+        document = loaded["document"]
+        file_result["hash"] = document["hash"]
+        if document["spans"] is None:
+            file_result["error"] = "Structure HTML ambiguë: positions des éléments éditables introuvables"
+            return file_result
+
+        raw_content = document["raw_content"]
+        elements = document["elements"]
+        edits, replaced = [], {}
+        counts = [0] * len(elements)
+        unsafe = set()
+        # Chaque nœud texte appartient à l'élément éditable le plus proche: remplacé une seule fois
+        for element, span in zip(elements, document["spans"]):
+            if span["tag"] == 'iframe':
+                new_value, count = pattern.subn(replacement, element["editable_value"])
+                if count and new_value != element["editable_value"]:
+                    start_tag = raw_content[span["start"]:span["inner_start"]]
+                    edits.append((span["start"], span["inner_start"],
+                                  self._replace_src_attribute(start_tag, new_value)))
+                    replaced[id(span)] = new_value
+                    counts[element["index"]] = count
+                continue
+            for node in span["nodes"]:
+                if node["owner"] is not span or node["text"] != node["data"]:
+                    continue
+                new_data, count = pattern.subn(replacement, node["data"])
+                if not count or new_data == node["data"]:
+                    continue
+                if not self._is_plain_text_node(raw_content, node):
+                    unsafe.add(element["index"])
+                    continue
+                edits.append((node["start"], node["end"], escape(new_data, quote=False)))
+                replaced[id(node)] = new_data
+                counts[element["index"]] += count
+
+        for element, span in zip(elements, document["spans"]):
+            index = element["index"]
+            if span["tag"] == 'iframe':
+                after = replaced.get(id(span))
+                nested = counts[index]
+            else:
+                texts = [replaced.get(id(node), node["text"]) for node in span["nodes"]]
+                after = ''.join(texts).replace('\r\n', '\n').replace('\r', '\n').strip()
+                nested = sum(counts[other["index"]] for other in elements
+                             if span["start"] <= document["spans"][other["index"]]["start"] < span["end"])
+            label = {"index": index, "id": element["id"], "tag": element["tag"]}
+            if index in unsafe:
+                file_result["skipped"].append(dict(label, reason="texte non modifiable sans réécrire la source"))
+            elif len(pattern.findall(element["editable_value"])) > nested:
+                # Occurrence qui commence dans un nœud texte et finit dans un autre (<strong>, lien...)
+                file_result["skipped"].append(dict(label, reason="occurrence à cheval sur une balise interne"))
+            if counts[index]:
+                file_result["count"] += counts[index]
+                file_result["matches"].append(dict(label, before=element["editable_value"], after=after,
+                                                   count=counts[index]))
+
+        if edits and not dry_run:
+            if expected_hash and document["hash"] != expected_hash:
+                file_result["error"] = f"Le fichier a été modifié sur le disque depuis l'aperçu: {Path(file_path).name}"
+                return file_result
+            parts = []
+            position = 0
+            for start, end, text in sorted(edits):
+                parts.append(raw_content[position:start])
+                parts.append(text)
+                position = end
+            parts.append(raw_content[position:])
+            updated_content = ''.join(parts)
+            written = self.write_file(file_path, updated_content, newline='')
+            self.invalidate_document(file_path)
+            if not written["success"]:
+                file_result["error"] = written["error"]
+                return file_result
+            file_result["written"] = True
+            file_result["hash"] = hashlib.sha1(updated_content.encode('utf-8')).hexdigest()
+        return file_result
+
+    def _spans_match(self, spans, nodes):
+        """Vérifier que le tokenizer a trouvé les mêmes éléments que BeautifulSoup"""
+        return len(spans) == len(nodes) and all(
+            span["tag"] == node.name and span["inner_end"] is not None
+            for span, node in zip(spans, nodes))
+
+    def _prettify_editable_values(self, document, values):
+        """Appliquer les valeurs sur l'arbre et re-sérialiser tout le document"""
+        if document["soup"] is None:
+            # Backend "stream": l'arbre n'est construit que pour ce mode de sauvegarde
+            document["soup"] = BeautifulSoup(document["content"], 'html.parser')
+            document["nodes"] = document["soup"].find_all(class_='editable')
+        nodes = document["nodes"]
+        if len(nodes) != len(document["elements"]):
+            raise ValueError("Les éléments éditables ne correspondent pas à l'arbre HTML")
+        skipped = []
+        for elem_index, new_value in sorted(values.items()):
+            element = nodes[elem_index]
+            if element.name == 'iframe':
+                element['src'] = new_value
+                self.logger.log(
+                    f"iframe [{elem_index}] src mis à jour: {new_value}")
+            elif element.find(True) is not None:
+                # Remplacer le contenu effacerait les balises enfants (liens, <strong>, <li>...)
+                skipped.append(elem_index)
+            else:
+                element.clear()
+                element.string = new_value
+                self.logger.log(f"Élément [{elem_index}] mis à jour")
+        return str(document["soup"].prettify()), skipped
+
+    def _splice_editable_values(self, document, values):
+        """Remplacer uniquement les plages modifiées dans la source (retourne le contenu et les éléments refusés)"""
+        raw_content = document["raw_content"]
+        spans = document["spans"]
+        elements = document["elements"]
+        edits = []
+        skipped = []
+        for elem_index, new_value in sorted(values.items()):
+            span = spans[elem_index]
+            if span["tag"] == 'iframe':
+                start_tag = raw_content[span["start"]:span["inner_start"]]
+                edits.append((span["start"], span["inner_start"],
+                              self._replace_src_attribute(start_tag, new_value), elem_index))
+                continue
+            text_edits = self._text_edits(document, span, elements[elem_index]["editable_value"], new_value)
+            if text_edits is None:
+                skipped.append(elem_index)
+                continue
+            edits.extend(edit + (elem_index,) for edit in text_edits)
+
+        # Assembler le nouveau contenu; deux modifications sur la même plage (élément imbriqué
+        # dans un autre) ne peuvent pas être appliquées ensemble: la seconde est refusée
+        parts = []
+        position = 0
+        for start, end, replacement, elem_index in sorted(edits):
+            if start < position:
+                skipped.append(elem_index)
+                continue
+            parts.append(raw_content[position:start])
+            parts.append(replacement)
+            position = end
+            if spans[elem_index]["tag"] == 'iframe':
+                self.logger.log(f"iframe [{elem_index}] src mis à jour: {values[elem_index]}")
+            else:
+                self.logger.log(f"Élément [{elem_index}] mis à jour")
+        parts.append(raw_content[position:])
+        for elem_index in skipped:
+            self.logger.log(f"Élément [{elem_index}] non modifié: balises internes ou élément imbriqué déjà modifié")
+        return ''.join(parts), sorted(skipped)
+
+    def _text_edits(self, document, span, old_value, new_value):
+        """Plages de la source qui font passer le texte d'un élément de old_value à new_value
+        (None si la modification effacerait des balises enfants)"""
+        raw_content = document["raw_content"]
+        newline = document["newline"]
+        if not span["children"]:
+            text = escape(new_value, quote=False)
+            if newline != '\n':
+                text = text.replace('\n', newline)
+            # Conserver l'indentation autour du texte (la valeur extraite est sans espaces de bord)
+            inner = raw_content[span["inner_start"]:span["inner_end"]]
+            leading = inner[:len(inner) - len(inner.lstrip())]
+            trailing = inner[len(inner.rstrip()):] if inner.strip() else ''
+            return [(span["inner_start"], span["inner_end"], leading + text + trailing)]
+
+        # Élément avec balises enfants: la modification doit tenir dans un seul nœud texte
+        pieces = [node["text"].replace('\r\n', '\n').replace('\r', '\n') for node in span["nodes"]]
+        full = ''.join(pieces)
+        if full.strip() != old_value:
+            return None
+        limit = min(len(old_value), len(new_value))
+        prefix = 0
+        while prefix < limit and old_value[prefix] == new_value[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_value[-1 - suffix] == new_value[-1 - suffix]:
+            suffix += 1
+        offset = len(full) - len(full.lstrip())
+        start, end = offset + prefix, offset + len(old_value) - suffix
+        inserted = new_value[prefix:len(new_value) - suffix]
+        position = 0
+        for node, piece in zip(span["nodes"], pieces):
+            node_end = position + len(piece)
+            if position <= start and end <= node_end and self._is_plain_text_node(raw_content, node):
+                new_text = piece[:start - position] + inserted + piece[end - position:]
+                text = escape(new_text, quote=False)
+                if newline != '\n':
+                    text = text.replace('\n', newline)
+                return [(node["start"], node["end"], text)]
+            position = node_end
+        return None
+
+    def _is_plain_text_node(self, raw_content, node):
+        """Le nœud correspond-il exactement à sa plage dans la source (ni espaces réduits, ni CDATA) ?"""
+        return (node["text"] == node["data"] and node["end"] is not None
+                and unescape(raw_content[node["start"]:node["end"]]) == node["data"])
+
+    def _replace_src_attribute(self, start_tag, new_src):
+        """Remplacer (ou ajouter) l'attribut src d'une balise ouvrante"""
+        quoted = '"' + escape(new_src, quote=True) + '"'
+        if SRC_ATTRIBUTE_RE.search(start_tag):
+            return SRC_ATTRIBUTE_RE.sub(lambda m: m.group(1) + quoted, start_tag, count=1)
+        closing = '/>' if start_tag.endswith('/>') else '>'
+        return start_tag[:-len(closing)].rstrip() + f' src={quoted}' + closing
+
     def update_editable_element(self, content, element_id, new_content):
         """Mettre à jour un élément éditable spécifique"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self._tree_builder())
             element = soup.find(id=element_id, class_='editable')
             if not element:
                 return {"success": False, "error": f"Élément éditable non trouvé: {element_id}"}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Réécriture HTML - Repère les balises ouvrantes et leur position exacte dans la source
+Permet de remplacer une balise (img, link, script...) sans re-sérialiser le reste du document
+Regroupe aussi les parcours du site (pages, fichiers) et le pool de processus partagés par les outils de construction
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+
+class StartTagCollector(HTMLParser):
+    """Balises ouvrantes d'un document avec leurs attributs et leur plage [start, end[ dans la source"""
+
+    def __init__(self, content, tags=None):
+        super().__init__(convert_charrefs=True)
+        self.wanted = set(tags) if tags else None
+        self.tags = []
+        self._line_offsets = [0]
+        for line in content.split('\n')[:-1]:
+            self._line_offsets.append(self._line_offsets[-1] + len(line) + 1)
+        self.feed(content)
+        self.close()
+
+    def _offset(self):
+        """Position absolue (en caractères) du token courant"""
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if self.wanted is not None and tag not in self.wanted:
+            return
+        start = self._offset()
+        text = self.get_starttag_text() or ''
+        self.tags.append({
+            "tag": tag,
+            "attrs": {name: value if value is not None else '' for name, value in attrs},
+            "start": start,
+            "end": start + len(text),
+            "text": text
+        })
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+
+def collect_start_tags(content, tags=None):
+    """Balises ouvrantes du document (toutes, ou seulement celles de `tags`)"""
+    return StartTagCollector(content, tags).tags
+
+
+def splice(content, replacements):
+    """Appliquer des remplacements (start, end, texte) sans chevauchement"""
+    parts = []
+    position = 0
+    for start, end, text in sorted(replacements, key=lambda replacement: replacement[0]):
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts)
+
+
+def line_span(content, start, end):
+    """Étendre [start, end[ à ses lignes entières si la balise est seule sur sa ligne (retrait propre)"""
+    line_start = content.rfind('\n', 0, start) + 1
+    line_end = content.find('\n', end)
+    line_end = len(content) if line_end == -1 else line_end + 1
+    if content[line_start:start].strip() or content[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+
+def newline_of(content):
+    """Fin de ligne utilisée par le document (CRLF ou LF)"""
+    return '\r\n' if '\r\n' in content else '\n'
+
+
+def set_attribute(tag_text, name, value):
+    """Remplacer (ou ajouter) un attribut dans le texte d'une balise ouvrante"""
+    quoted = f'"{escape(value, quote=True)}"'
+    pattern = re.compile(
+        rf'(\s{re.escape(name)}\s*=\s*)("[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE)
+    if pattern.search(tag_text):
+        return pattern.sub(lambda match: match.group(1) + quoted, tag_text, count=1)
+    closing = '/>' if tag_text.endswith('/>') else '>'
+    return f'{tag_text[:-len(closing)].rstrip()} {name}={quoted}{closing}'
+
+
+def local_path(url):
+    """Chemin local d'une URL relative du site (None pour les URLs externes, ancres et data:)"""
+    parts = urlsplit(url.strip())
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    return unquote(parts.path)
+
+
+def page_paths(repo_path):
+    """Pages du site (chemins relatifs): index.html et page/*.html"""
+    repo_path = Path(repo_path)
+    pages = ["index.html"] if (repo_path / "index.html").exists() else []
+    pages += sorted(f"page/{path.name}" for path in (repo_path / "page").glob("*.html"))
+    return pages
+
+
+def walk_files(folder, prefix=""):
+    """Fichiers d'une arborescence en un parcours os.scandir: (chemin relatif, DirEntry)
+    (fichiers et dossiers cachés, __pycache__ ignorés)"""
+    pending = [(folder, prefix)]
+    while pending:
+        folder, prefix = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name == "__pycache__":
+                        continue
+                    if entry.is_dir():
+                        pending.append((entry.path, prefix + entry.name + "/"))
+                    elif entry.is_file():
+                        yield prefix + entry.name, entry
+        except OSError:
+            continue
+
+
+def process_map(logger, action, function, *iterables, max_workers=None):
+    """executor.map sur un pool de processus, dans le processus courant si le pool est indisponible"""
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(function, *iterables))
+    except Exception as e:
+        # Pool de processus indisponible: traitement dans le processus courant
+        logger.log(f"{action} en parallèle impossible ({e}), traitement séquentiel")
+        return [function(*args) for args in zip(*iterables)]
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optimisation des Images - Variantes redimensionnées WebP/PNG/JPEG et balises <picture> responsives
+Les variantes sont mises en cache par hash du contenu source: une image inchangée n'est jamais retraitée
+"""
+
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+from html import escape
+from pathlib import Path
+from urllib.parse import quote
+
+from bs4 import BeautifulSoup
+
+from css_bundler import minify_css
+from html_rewriter import collect_start_tags, local_path, process_map, set_attribute, splice
+
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = ImageOps = None
+    PIL_AVAILABLE = False
+
+OPTIMIZABLE_SUFFIXES = (".png", ".jpg", ".jpeg")
+MANIFEST_NAME = "variants.json"
+WIDTH_DECLARATION_RE = re.compile(r'(?:^|;)\s*(max-width|width)\s*:\s*([^;!]+)', re.IGNORECASE)
+CUSTOM_PROPERTY_RE = re.compile(r'(?:^|;)\s*(--[\w-]+)\s*:\s*([^;]+)')
+VAR_RE = re.compile(r'var\(\s*(--[\w-]+)\s*(?:,\s*(.*))?\)')
+PX_RE = re.compile(r'(\d+(?:\.\d+)?)px')
+
+
+def _cache_key(digest, options):
+    """Clé de cache: hash du contenu source + hash des réglages (largeurs, qualités)"""
+    settings = json.dumps([options["widths"], options["webp_quality"], options["jpeg_quality"]])
+    settings_hash = hashlib.sha1(settings.encode("utf-8")).hexdigest()[:8]
+    return f"{digest}-{settings_hash}"
+
+
+def _has_transparency(image):
+    """L'image utilise-t-elle vraiment la transparence ?"""
+    if image.mode == "P":
+        return "transparency" in image.info
+    if image.mode not in ("RGBA", "LA"):
+        return False
+    return image.getchannel("A").getextrema()[0] < 255
+
+
+def _css_rules(css):
+    """Règles d'une feuille minifiée hors @media: [(sélecteur, déclarations)]"""
+    rules = []
+    depth, position, prelude = 0, 0, ""
+    for match in re.finditer(r"[{}]", css):
+        if match.group() == "{":
+            if depth == 0:
+                prelude = css[position:match.start()].strip()
+                position = match.end()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                # Les blocs @media sont des ajustements pour petits écrans: la règle de base suffit
+                if not prelude.startswith("@"):
+                    rules.append((prelude, css[position:match.start()]))
+                position = match.end()
+    return rules
+
+
+def _css_px(value, variables):
+    """Valeur CSS en pixels (var() résolues), None si elle n'est pas fixe (%, vw, auto...)"""
+    value = value.strip()
+    match = VAR_RE.fullmatch(value)
+    if match:
+        value = variables.get(match.group(1), match.group(2) or "").strip()
+    match = PX_RE.fullmatch(value)
+    return round(float(match.group(1))) if match else None
+
+
+def _optimize_image(source_path, entry_dir, options):
+    """Produire les variantes d'une image dans `entry_dir` (processus de travail)"""
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    transparent = _has_transparency(image)
+    image = image.convert("RGBA" if transparent else "RGB")
+    # Photo sans transparence: la variante de repli est un JPEG, sinon un PNG
+    fallback_format = "png" if transparent else "jpeg"
+    source_suffix = Path(source_path).suffix.lower()
+    source_format = "jpeg" if source_suffix in (".jpg", ".jpeg") else "png"
+
+    widths = sorted({width for width in options["widths"] if width < image.width}
+                    | {min(image.width, max(options["widths"]))})
+    temp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=Path(entry_dir).parent))
+    variants = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for image_format in ("webp", fallback_format):
+            buffer = io.BytesIO()
+            if image_format == "webp":
+                resized.save(buffer, "WEBP", quality=options["webp_quality"], method=4)
+            elif image_format == "jpeg":
+                resized.save(buffer, "JPEG", quality=options["jpeg_quality"], optimize=True,
+                             progressive=True)
+            else:
+                resized.save(buffer, "PNG", optimize=True)
+            # À pleine taille, une variante de repli plus lourde que l'original est inutile
+            if (image_format == fallback_format == source_format and width == image.width
+                    and buffer.tell() >= len(data)):
+                variants.append({"width": width, "height": height, "format": image_format,
+                                 "file": None, "bytes": len(data)})
+                continue
+            name = f"{width}.{'jpg' if image_format == 'jpeg' else image_format}"
+            (temp_dir / name).write_bytes(buffer.getvalue())
+            variants.append({"width": width, "height": height, "format": image_format,
+                             "file": name, "bytes": buffer.tell()})
+
+    manifest = {"width": image.width, "height": image.height, "bytes": len(data),
+                "variants": variants}
+    (temp_dir / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+    try:
+        # Renommage atomique: un dossier de cache présent est toujours complet
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        # Déjà produit par un autre processus
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return str(source_path), manifest
+
+
+class ImageOptimizer:
+    """Produit et met en cache les variantes responsives des images référencées par les pages"""
+
+    DEFAULT_WIDTHS = (480, 960, 1600)
+    # Le logo sert aussi de favicon: une version 64 px suffit à l'onglet du navigateur
+    FAVICON_WIDTH = 64
+    # Les petites images (icônes) ne gagnent rien à être déclinées
+    MIN_BYTES = 16 * 1024
+    HASH_LENGTH = 8
+
+    def __init__(self, logger, cache_dir=None, widths=DEFAULT_WIDTHS, webp_quality=80,
+                 jpeg_quality=82, sizes="100vw"):
+        self.logger = logger
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".rout_art_cms" / "image_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.options = {"widths": sorted(widths), "webp_quality": webp_quality,
+                        "jpeg_quality": jpeg_quality}
+        self.sizes = sizes
+
+    def is_available(self):
+        """Pillow est-il installé ?"""
+        return PIL_AVAILABLE
+
+    def is_optimizable(self, file_path):
+        """L'image peut-elle être déclinée en variantes (PNG/JPEG assez lourd) ?"""
+        file_path = Path(file_path)
+        return (file_path.suffix.lower() in OPTIMIZABLE_SUFFIXES and file_path.is_file()
+                and file_path.stat().st_size >= self.MIN_BYTES)
+
+    def optimize_all(self, image_paths, max_workers=None, options=None):
+        """Variantes de plusieurs images: le cache est consulté ici, seules les nouvelles vont au pool"""
+        options = options or self.options
+        results = {}
+        pending = []
+        cached = 0
+        digests = {}
+        for image_path in dict.fromkeys(str(Path(path).resolve()) for path in image_paths):
+            with open(image_path, 'rb') as f:
+                digests[image_path] = hashlib.sha1(f.read()).hexdigest()
+            entry_dir = self.cache_dir / _cache_key(digests[image_path], options)
+            manifest_path = entry_dir / MANIFEST_NAME
+            if manifest_path.exists():
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                results[image_path] = dict(manifest, cache_dir=str(entry_dir), hash=digests[image_path])
+                cached += 1
+            else:
+                pending.append((image_path, str(entry_dir)))
+
+        if pending:
+            sources = [source for source, _ in pending]
+            entry_dirs = [entry_dir for _, entry_dir in pending]
+            processed = process_map(self.logger, "Optimisation", _optimize_image, sources, entry_dirs,
+                                    [options] * len(pending), max_workers=max_workers)
+            for (source, manifest), entry_dir in zip(processed, entry_dirs):
+                results[source] = dict(manifest, cache_dir=entry_dir, hash=digests[source])
+        return {"results": results, "processed": len(pending), "cached": cached}
+
+    def variant_name(self, image_name, variant, digest):
+        """Nom publié d'une variante: hero-car-road.png -> hero-car-road-960w.3f9a1c2b.webp
+        (hash de l'image source: une image modifiée change d'URL)"""
+        stem = Path(image_name).stem
+        extension = "jpg" if variant["format"] == "jpeg" else variant["format"]
+        return f"{stem}-{variant['width']}w.{digest[:self.HASH_LENGTH]}.{extension}"
+
+    def page_images(self, content, page_path, repo_path):
+        """Images optimisables d'une page: ([(balise, chemin)] des <img>, [(balise, chemin)] des favicons)"""
+        repo_path = Path(repo_path).resolve()
+        images, favicons = [], []
+        for tag in collect_start_tags(content, ("img", "link")):
+            attrs = tag["attrs"]
+            is_favicon = tag["tag"] == "link" and "icon" in attrs.get("rel", "").lower().split()
+            # Images déjà responsives ou externes: inchangées
+            if (tag["tag"] == "link" and not is_favicon) or "srcset" in attrs:
+                continue
+            path = local_path(attrs.get("href" if is_favicon else "src", ""))
+            if path is None:
+                continue
+            base = repo_path if path.startswith("/") else Path(page_path).parent
+            image_path = (base / path.lstrip("/")).resolve()
+            if image_path.is_relative_to(repo_path) and self.is_optimizable(image_path):
+                (favicons if is_favicon else images).append((tag, str(image_path)))
+        return images, favicons
+
+    def rendered_widths(self, content, sheets):
+        """Largeurs CSS des <img> d'une page: position de la balise -> {"width"/"max-width": valeur}
+        (feuilles (source, media, css) dans l'ordre de la cascade: la dernière règle qui s'applique gagne)"""
+        rules, variables = [], {}
+        for _source, media, css in sheets:
+            if media:
+                continue
+            for selector, declarations in _css_rules(minify_css(css)):
+                if selector == ":root":
+                    variables.update(CUSTOM_PROPERTY_RE.findall(declarations))
+                widths = {name.lower(): value for name, value in WIDTH_DECLARATION_RE.findall(declarations)}
+                if widths:
+                    rules.append((selector, widths))
+        if not rules:
+            return {}
+
+        line_offsets = [0]
+        for line in content.split('\n')[:-1]:
+            line_offsets.append(line_offsets[-1] + len(line) + 1)
+        soup = BeautifulSoup(content, "html.parser")
+        found = {}
+        for selector, widths in rules:
+            try:
+                elements = soup.select(selector)
+            except Exception:
+                # Pseudo-classes dynamiques (:hover) et pseudo-éléments: sans effet sur la largeur de base
+                continue
+            for element in elements:
+                if element.name == "img" and element.sourceline is not None:
+                    start = line_offsets[element.sourceline - 1] + element.sourcepos
+                    found.setdefault(start, {}).update(widths)
+        return {start: {name: _css_px(value, variables) for name, value in widths.items()}
+                for start, widths in found.items()}
+
+    def _sizes(self, attrs, css_widths):
+        """Attribut sizes d'après la largeur affichée (style, feuilles, attribut width), None si inconnue"""
+        # Priorité: style en ligne, puis feuilles de style, puis attribut width
+        widths = {"width": int(attrs["width"])} if attrs.get("width", "").isdigit() else {}
+        widths.update(css_widths)
+        widths.update({name.lower(): _css_px(value, {})
+                       for name, value in WIDTH_DECLARATION_RE.findall(attrs.get("style", ""))})
+        width, max_width = widths.get("width"), widths.get("max-width")
+        if width is not None:
+            return f"{min(width, max_width) if max_width is not None else width}px"
+        if max_width is not None:
+            return f"(max-width: {max_width}px) 100vw, {max_width}px"
+        return None
+
+    def rewrite_page(self, content, page_path, repo_path, manifests, favicon_manifests=None, sheets=None):
+        """Remplacer les <img> optimisées par des <picture> avec srcset, et les favicons par leur version 64 px
+        (les feuilles de la page donnent la largeur affichée des images, donc leur attribut sizes)"""
+        images, favicons = self.page_images(content, page_path, repo_path)
+        css_widths = self.rendered_widths(content, sheets) if sheets and images else {}
+        replacements = []
+        for tag, image_path in images:
+            manifest = manifests.get(image_path)
+            if manifest is not None:
+                replacements.append((tag["start"], tag["end"], self._picture(
+                    tag, tag["attrs"]["src"], manifest, css_widths.get(tag["start"], {}))))
+        for tag, image_path in favicons:
+            manifest = (favicon_manifests or {}).get(image_path)
+            if manifest is None:
+                continue
+            variant = [variant for variant in manifest["variants"] if variant["format"] != "webp"][-1]
+            href = tag["attrs"]["href"]
+            text = set_attribute(tag["text"], "href", self._variant_url(href, variant, manifest["hash"]))
+            text = set_attribute(text, "type", f"image/{variant['format']}")
+            replacements.append((tag["start"], tag["end"], text))
+        return splice(content, replacements), len(replacements)
+
+    def _variant_url(self, src, variant, digest):
+        """URL d'une variante, dans le même dossier que l'image d'origine"""
+        if variant["file"] is None:
+            return src
+        path = src.split("?")[0].split("#")[0]
+        folder = posixpath.dirname(path)
+        name = quote(self.variant_name(posixpath.basename(path), variant, digest))
+        return f"{folder}/{name}" if folder else name
+
+    def _picture(self, tag, src, manifest, css_widths=None):
+        """Balise <picture>: source WebP et <img> de repli, chacune avec son srcset"""
+        attrs = tag["attrs"]
+        fallback = [variant for variant in manifest["variants"] if variant["format"] != "webp"]
+        sizes = attrs.get("sizes") or self._sizes(attrs, css_widths or {})
+        if sizes is None and len(fallback) == 1:
+            # Petite image de largeur d'affichage inconnue: une seule taille, sans srcset ni sizes
+            webp = [variant for variant in manifest["variants"] if variant["format"] == "webp"][0]
+            img_attrs = dict(attrs, src=self._variant_url(src, fallback[0], manifest["hash"]))
+            img = "<img " + " ".join(f'{name}="{escape(value, quote=True)}"'
+                                     for name, value in img_attrs.items()) + "/>"
+            webp_url = self._variant_url(src, webp, manifest["hash"])
+            return (f'<picture><source type="image/webp" srcset="{escape(webp_url, quote=True)}"/>'
+                    f'{img}</picture>')
+        sizes = sizes or self.sizes
+
+        def url(variant):
+            return self._variant_url(src, variant, manifest["hash"])
+
+        def srcset(image_format):
+            return ", ".join(f"{url(variant)} {variant['width']}w"
+                             for variant in manifest["variants"] if variant["format"] == image_format)
+
+        img_attrs = dict(attrs, src=url(fallback[-1]), srcset=srcset(fallback[-1]["format"]),
+                         sizes=sizes)
+        img = "<img " + " ".join(f'{name}="{escape(value, quote=True)}"'
+                                 for name, value in img_attrs.items()) + "/>"
+        return (f'<picture><source type="image/webp" srcset="{escape(srcset("webp"), quote=True)}" '
+                f'sizes="{escape(sizes, quote=True)}"/>{img}</picture>')
+
+    def published_variants(self, relative_path, manifest):
+        """Variantes publiées d'une image: chemin relatif dans le dossier de sortie -> variante"""
+        folder = posixpath.dirname(relative_path)
+        return {posixpath.join(folder, self.variant_name(posixpath.basename(relative_path), variant,
+                                                         manifest["hash"])): variant
+                for variant in manifest["variants"] if variant["file"] is not None}
+
+    def publish_variants(self, image_path, repo_path, output_dir, manifest):
+        """Copier les variantes d'une image dans le dossier de sortie, à côté de son emplacement"""
+        relative = Path(image_path).relative_to(Path(repo_path).resolve()).as_posix()
+        written = []
+        for published, variant in self.published_variants(relative, manifest).items():
+            target = Path(output_dir) / published
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(Path(manifest["cache_dir"]) / variant["file"], target)
+            written.append(target)
+        return written
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vérification des Liens - Repère les références cassées (feuilles, scripts, images, PDF, pages, #ancres)
+Les pages sont analysées en parallèle, et seulement si leur contenu a changé depuis la dernière vérification
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from asset_fingerprint import REFERENCE_ATTRIBUTES
+from html_rewriter import collect_start_tags, page_paths, process_map, walk_files
+
+
+def _scan_page(page_path):
+    """Références (attribut, url, ligne) et ids d'une page (exécuté dans un processus du pool)"""
+    with open(page_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    references, ids = [], []
+    for tag in collect_start_tags(content):
+        line = content.count('\n', 0, tag["start"]) + 1
+        for name, value in tag["attrs"].items():
+            if name in REFERENCE_ATTRIBUTES:
+                references.append([name, value.strip(), line])
+            elif name == "srcset":
+                for candidate in value.split(","):
+                    parts = candidate.split()
+                    if parts:
+                        references.append([name, parts[0], line])
+            elif name == "id" or (name == "name" and tag["tag"] == "a"):
+                ids.append(value)
+    return {"references": references, "ids": ids}
+
+
+class LinkChecker:
+    """Vérifie que chaque href/src des pages pointe vers un fichier (et une ancre) du repository"""
+
+    CACHE_VERSION = 1
+
+    def __init__(self, logger, cache_path=None):
+        self.logger = logger
+        self.cache_path = Path(cache_path) if cache_path else Path.home() / ".rout_art_cms" / "link_cache.json"
+
+    def load_cache(self, repo_path):
+        """Analyses de la vérification précédente: page -> mtime, taille, hash, références, ids"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cache.get("version") != self.CACHE_VERSION or cache.get("repo") != str(repo_path):
+            return {}
+        return cache.get("pages", {})
+
+    def save_cache(self, repo_path, pages):
+        """Écrire le cache des analyses"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.CACHE_VERSION, "repo": str(repo_path), "pages": pages}, f)
+        os.replace(temp_path, self.cache_path)
+
+    def scan_files(self, repo_path):
+        """Fichiers du repository (chemins relatifs), en un parcours os.scandir"""
+        return {relative for relative, _entry in walk_files(repo_path)}
+
+    def scan_pages(self, repo_path, pages, max_workers=None):
+        """Analyses des pages: le cache est consulté ici, seules les pages modifiées vont au pool"""
+        previous = self.load_cache(repo_path)
+        scans, pending = {}, []
+        for page in pages:
+            stat = (repo_path / page).stat()
+            entry = previous.get(page)
+            if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                scans[page] = entry
+                continue
+            with open(repo_path / page, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            if entry and entry["hash"] == digest:
+                # Fichier touché mais contenu identique: l'analyse reste valable
+                scans[page] = dict(entry, mtime=stat.st_mtime_ns, size=stat.st_size)
+                continue
+            scans[page] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest}
+            pending.append(page)
+
+        if pending:
+            results = process_map(self.logger, "Vérification", _scan_page,
+                                  [str(repo_path / page) for page in pending], max_workers=max_workers)
+            for page, result in zip(pending, results):
+                scans[page].update(result)
+        if pending or set(previous) != set(scans) or any(
+                previous.get(page) != scan for page, scan in scans.items()):
+            self.save_cache(repo_path, scans)
+        return scans, len(pending)
+
+    def resolve(self, url, page, files, scans):
+        """Raison pour laquelle `url` (dans `page`) est cassée, None si elle est valide ou externe"""
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or url.startswith("data:"):
+            return None
+        path = unquote(parts.path)
+        if not path:
+            target = page
+        else:
+            folder = posixpath.dirname(page)
+            target = posixpath.normpath(path.lstrip("/") if path.startswith("/") else posixpath.join(folder, path))
+            if target == ".." or target.startswith("../"):
+                return "en dehors du site"
+            if path.endswith("/") or target == ".":
+                target = "index.html" if target == "." else f"{target}/index.html"
+            if target not in files:
+                # GitHub Pages distingue les majuscules, contrairement à Windows
+                lowered = target.lower()
+                if any(name.lower() == lowered for name in files):
+                    return "fichier introuvable (majuscules/minuscules différentes)"
+                return "fichier introuvable"
+        anchor = unquote(parts.fragment)
+        if anchor and anchor != "top" and target in scans and anchor not in scans[target]["ids"]:
+            return f"ancre #{anchor} introuvable"
+        return None
+
+    def check(self, repo_path, max_workers=None):
+        """Vérifier toutes les pages du site et lister les références cassées"""
+        try:
+            start = time.perf_counter()
+            repo_path = Path(repo_path).resolve()
+            pages = page_paths(repo_path)
+            scans, parsed = self.scan_pages(repo_path, pages, max_workers=max_workers)
+            files = self.scan_files(repo_path)
+
+            broken = []
+            references = 0
+            for page in pages:
+                for attribute, url, line in scans[page]["references"]:
+                    references += 1
+                    reason = self.resolve(url, page, files, scans)
+                    if reason:
+                        broken.append({"page": page, "line": line, "attribute": attribute,
+                                       "url": url, "reason": reason})
+
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.logger.log(
+                f"Vérification des liens: {len(pages)} page(s), {references} référence(s), "
+                f"{len(broken)} cassée(s) ({parsed} page(s) analysée(s), {duration_ms:.0f} ms)")
+            return {"success": True, "pages": len(pages), "references": references, "broken": broken,
+                    "parsed": parsed, "cached": len(pages) - parsed, "duration_ms": duration_ms}
+        except Exception as e:
+            error_msg = f"Erreur lors de la vérification des liens: {str(e)}"
+            self.logger.log(error_msg)
+            return {"success": False, "error": error_msg}
+
+    def format_report(self, result):
+        """Rapport lisible pour l'onglet Git"""
+        if not result["success"]:
+            return f"✗ {result['error']}"
+        lines = [f"🔗 VÉRIFICATION DES LIENS",
+                 f"{'='*60}",
+                 f"{result['pages']} page(s), {result['references']} référence(s) "
+                 f"en {result['duration_ms']:.0f} ms"]
+        if not result["broken"]:
+            lines.append("✓ Aucune référence cassée")
+            return "\n".join(lines)
+        lines.append(f"⚠️  {len(result['broken'])} référence(s) cassée(s):")
+        for item in result["broken"]:
+            lines.append(f"  {item['page']}:{item['line']}  {item['attribute']}=\"{item['url']}\"  "
+                         f"→ {item['reason']}")
+        return "\n".join(lines)
@@ -12,16 +12,20 @@ from server_manager import ServerManager
 from config_manager import ConfigManager
 from logger import Logger
 from sitemap_generator import SitemapGenerator
+from content_index import ContentIndex
+from file_watcher import FileWatcher
+from site_builder import SiteBuilder
+from link_checker import LinkChecker
 import tkinter as tk
 from tkinter import messagebox, filedialog, scrolledtext
 from tkinter import ttk
 import customtkinter as ctk
 import threading
+import multiprocessing
 import json
 import os
 import sys
 from pathlib import Path
-from bs4 import BeautifulSoup
 
 # Ajouter le chemin correct pour les imports (important pour PyInstaller)
 # DOIT être fait AVANT les imports locaux
@@ -44,6 +48,10 @@ ctk.set_default_color_theme("blue")
 class RoutArtCMS:
     """Application principale du CMS Rout'Art"""
 
+    # Liste virtualisée des éléments éditables: hauteur d'une ligne (cadre + marges) et marge de lignes
+    FIELD_ROW_HEIGHT = 116
+    FIELD_ROW_BUFFER = 3
+
     def __init__(self, root):
         self.root = root
         self.root.title("🚗 Rout'Art - Gestionnaire de Contenu (CMS)")
@@ -55,8 +63,14 @@ class RoutArtCMS:
         self.logger = Logger()
         self.git_manager = GitManager(self.logger)
         self.html_manager = HTMLManager(self.logger)
-        self.server_manager = ServerManager(self.logger)
+        self.server_manager = ServerManager(
+            self.logger, max_workers=self.config_manager.get_server_workers())
         self.sitemap_generator = SitemapGenerator(self.logger)
+        self.content_index = ContentIndex(self.logger, self.html_manager)
+        self.file_watcher = FileWatcher(self.logger)
+        self.site_watcher = FileWatcher(self.logger)
+        self.site_builder = SiteBuilder(self.logger)
+        self.link_checker = LinkChecker(self.logger)
 
         # Charger la configuration sauvegardée AVANT _build_ui()
         self.config_manager.load_config()
@@ -65,13 +79,18 @@ class RoutArtCMS:
         self.repo_path = tk.StringVar(
             value=self.config_manager.get_repo_path())
         self.current_file = None
-        self.current_file_content = None
-        self.server_thread = None
+        self.current_file_hash = None
+        self.link_report = None
+        self.pending_focus_index = None
+        self.highlighted_field_index = None
         self.server_running = False
 
         # Construire l'interface
         self._build_ui()
 
+        # Arrêt propre des serveurs et de la surveillance à la fermeture de la fenêtre
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
         # Vérifier si le repo existe au démarrage
         self._on_startup()
 
@@ -177,6 +196,22 @@ class RoutArtCMS:
         ctk.CTkButton(file_frame, text="🔄 Actualiser",
                       command=self._refresh_files, width=120).pack(side=tk.LEFT, padx=5)
 
+        # Recherche dans toutes les pages
+        search_frame = ctk.CTkFrame(file_section)
+        search_frame.pack(fill=tk.X, pady=5)
+
+        self.search_entry = ctk.CTkEntry(
+            search_frame, placeholder_text="🔍 Rechercher dans toutes les pages (ex: Lunéville, 70€, téléphone)", height=35)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.search_entry.bind("<KeyRelease>", self._on_search)
+        self.search_entry.bind("<Return>", self._on_search)
+
+        self.search_results = tk.Listbox(
+            file_section, height=5, bg="#2b2b2b", fg="#FFFFFF", selectbackground="#1f6aa5",
+            highlightthickness=0, borderwidth=0, font=("Montserrat", 11))
+        self.search_results.bind("<<ListboxSelect>>", self._on_search_result_selected)
+        self.search_matches = []
+
         # Contenu éditable - Zone scrollable pour les éléments éditables
         content_section = ctk.CTkFrame(editor_frame)
         content_section.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
@@ -188,47 +223,35 @@ class RoutArtCMS:
         scroll_container = ctk.CTkFrame(content_section)
         scroll_container.pack(fill=tk.BOTH, expand=True)
 
-        # Cadre scrollable pour afficher les éléments éditables
+        # Canvas virtualisé: seules les lignes visibles (+ une marge) ont des widgets
         self.editable_canvas = tk.Canvas(
             scroll_container, bg="#2b2b2b", highlightthickness=0)
-        v_scrollbar = ttk.Scrollbar(
+        self.editable_v_scrollbar = ttk.Scrollbar(
             scroll_container, orient="vertical", command=self.editable_canvas.yview)
         h_scrollbar = ttk.Scrollbar(
             scroll_container, orient="horizontal", command=self.editable_canvas.xview)
 
-        self.editable_scrollframe = ctk.CTkFrame(
-            self.editable_canvas, fg_color="#2b2b2b")
-
-        self.editable_scrollframe.bind(
-            "<Configure>",
-            lambda e: self.editable_canvas.configure(
-                scrollregion=self.editable_canvas.bbox("all"))
-        )
-
-        self.editable_canvas.create_window(
-            (0, 0), window=self.editable_scrollframe, anchor="nw")
         self.editable_canvas.configure(
-            yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+            yscrollcommand=self._on_editable_scroll, xscrollcommand=h_scrollbar.set)
+        self.editable_canvas.bind("<Configure>", self._on_editable_canvas_configure)
 
         # Bind mouse wheel scrolling
         self.editable_canvas.bind("<MouseWheel>", self._on_mousewheel)
         self.editable_canvas.bind("<Button-4>", self._on_mousewheel)
         self.editable_canvas.bind("<Button-5>", self._on_mousewheel)
 
-        # Bind pour les éléments enfants aussi
-        self.editable_scrollframe.bind("<MouseWheel>", self._on_mousewheel)
-        self.editable_scrollframe.bind("<Button-4>", self._on_mousewheel)
-        self.editable_scrollframe.bind("<Button-5>", self._on_mousewheel)
-
         self.editable_canvas.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.editable_v_scrollbar.grid(row=0, column=1, sticky="ns")
         h_scrollbar.grid(row=1, column=0, sticky="ew")
 
         scroll_container.grid_rowconfigure(0, weight=1)
         scroll_container.grid_columnconfigure(0, weight=1)
 
-        # Dictionnaire pour stocker les widgets des éléments éditables
-        self.editable_fields = {}
+        # Modèle des éléments éditables (valeurs éditées) et lignes de widgets recyclées
+        self.editable_model = []
+        self.field_rows = []
+        self.editable_message_item = None
+        self._rows_update_pending = False
 
         # Boutons d'action
         button_frame = ctk.CTkFrame(editor_frame)
@@ -238,6 +261,8 @@ class RoutArtCMS:
                       width=150, height=35).pack(side=tk.LEFT, padx=5)
         ctk.CTkButton(button_frame, text="↻ Recharger", command=self._reload_file,
                       width=150, height=35).pack(side=tk.LEFT, padx=5)
+        ctk.CTkButton(button_frame, text="🔁 Remplacer dans toutes les pages",
+                      command=self._open_batch_replace_dialog, width=220, height=35).pack(side=tk.LEFT, padx=5)
 
     def _create_preview_tab(self):
         """Onglet pour la prévisualisation locale"""
@@ -275,6 +300,15 @@ class RoutArtCMS:
                                                command=self._toggle_server, width=150, height=35)
         self.server_toggle_btn.pack(side=tk.LEFT, padx=5)
 
+        self.gzip_var = tk.BooleanVar(value=self.server_manager.compression)
+        ctk.CTkCheckBox(server_frame, text="Compression gzip", variable=self.gzip_var,
+                        command=self._toggle_compression).pack(side=tk.LEFT, padx=10)
+        ctk.CTkButton(server_frame, text="📊 Tailles transférées",
+                      command=self._show_transfer_sizes, width=160, height=35).pack(side=tk.LEFT, padx=5)
+        self.build_site_btn = ctk.CTkButton(server_frame, text="🏗️ Construire le site",
+                                            command=self._build_site, width=160, height=35)
+        self.build_site_btn.pack(side=tk.LEFT, padx=5)
+
         # URL d'accès
         url_section = ctk.CTkFrame(preview_frame)
         url_section.pack(fill=tk.X, padx=15, pady=15)
@@ -291,6 +325,9 @@ class RoutArtCMS:
 
         ctk.CTkButton(url_frame, text="🌐 Ouvrir dans le navigateur",
                       command=self._open_preview, width=180).pack(side=tk.LEFT, padx=5)
+        self.main_preview_btn = ctk.CTkButton(url_frame, text="🌿 Prévisualiser origin/main",
+                                              command=self._toggle_main_preview, width=200)
+        self.main_preview_btn.pack(side=tk.LEFT, padx=5)
 
         # Instructions
         info_section = ctk.CTkFrame(preview_frame)
@@ -322,6 +359,23 @@ class RoutArtCMS:
             logs_section, height=100, state="disabled")
         self.server_logs.pack(fill=tk.BOTH, expand=True)
 
+        # Statistiques des requêtes (latences par chemin, mises à jour en direct)
+        stats_section = ctk.CTkFrame(preview_frame)
+        stats_section.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 15))
+
+        stats_header = ctk.CTkFrame(stats_section)
+        stats_header.pack(fill=tk.X)
+        ctk.CTkLabel(stats_header, text="Statistiques des requêtes (les plus lentes en premier):",
+                     font=("Montserrat", 11)).pack(side=tk.LEFT, pady=5)
+        ctk.CTkButton(stats_header, text="🗑️  Réinitialiser", width=120,
+                      command=self._clear_access_stats).pack(side=tk.RIGHT, padx=5)
+
+        self.access_stats_display = ctk.CTkTextbox(
+            stats_section, height=140, state="disabled", font=("Courier New", 11))
+        self.access_stats_display.pack(fill=tk.BOTH, expand=True)
+        self.access_stats_version = None
+        self._refresh_access_stats()
+
     def _create_settings_tab(self):
         """Onglet pour les paramètres"""
         settings_frame = ttk.Frame(self.notebook)
@@ -392,6 +446,7 @@ class RoutArtCMS:
         if path:
             self.repo_path.set(path)
             self.config_manager.set_repo_path(path)
+            self._start_file_watcher()
 
     def _verify_repo(self):
         """Vérifier que le repo existe et est valide"""
@@ -427,6 +482,8 @@ class RoutArtCMS:
                 "Erreur Pull", str(e)))
         finally:
             self.root.after(0, self._update_git_status)
+            # Les pages modifiées par le pull sont ré-indexées et re-parsées (mtime différent)
+            self.root.after(0, self._refresh_content_index, None, True)
 
     def _git_push(self):
         """Push du repository"""
@@ -443,6 +500,36 @@ class RoutArtCMS:
                 "Erreur", "Veuillez entrer un message de commit")
             return
 
+        # Les liens sont vérifiés avant l'envoi, le push attend le résultat
+        thread = threading.Thread(
+            target=self._check_links_thread, args=(path, message))
+        thread.daemon = True
+        thread.start()
+
+    def _check_links_thread(self, path, message):
+        """Thread pour la vérification des liens avant le push"""
+        result = self.link_checker.check(path)
+        self.link_report = self.link_checker.format_report(result)
+        self.root.after(0, self._confirm_push, path, message, result)
+
+    def _confirm_push(self, path, message, result):
+        """Afficher les références cassées et ne pousser qu'après confirmation"""
+        self._update_git_status()
+        if not result["success"]:
+            question = f"{result['error']}\n\nPousser quand même ?"
+        elif result["broken"]:
+            lines = [f"{item['page']}:{item['line']}  {item['url']} → {item['reason']}"
+                     for item in result["broken"][:10]]
+            if len(result["broken"]) > 10:
+                lines.append(f"... et {len(result['broken']) - 10} autre(s) (voir l'onglet Git)")
+            question = (f"{len(result['broken'])} référence(s) cassée(s):\n" + "\n".join(lines)
+                        + "\n\nPousser quand même ?")
+        else:
+            question = None
+        if question and not messagebox.askyesno("Liens cassés", question):
+            self.logger.log("Push annulé: références cassées")
+            return
+
         thread = threading.Thread(
             target=self._git_push_thread, args=(path, message))
         thread.daemon = True
@@ -480,7 +567,11 @@ class RoutArtCMS:
         """Afficher le statut dans le textbox"""
         self.git_status_display.configure(state="normal")
         self.git_status_display.delete("1.0", tk.END)
-        self.git_status_display.insert("1.0", status["output"])
+        output = status["output"]
+        # Rapport de la vérification des liens faite avant le dernier push
+        if self.link_report:
+            output += "\n\n" + self.link_report
+        self.git_status_display.insert("1.0", output)
         self.git_status_display.configure(state="disabled")
 
     def _git_add_untracked(self):
@@ -556,24 +647,117 @@ class RoutArtCMS:
 
         return files
 
+    def _get_page_path(self, choice):
+        """Chemin complet d'un fichier de la liste (index.html à la racine, sinon dans page/)"""
+        repo_path = Path(self.repo_path.get())
+        if choice == "index.html":
+            return repo_path / "index.html"
+        return repo_path / "page" / choice
+
     def _refresh_files(self):
         """Rafraîchir la liste des fichiers"""
         files = self._get_page_files()
         self.file_combo.configure(values=files)
+        self._refresh_content_index(files)
         messagebox.showinfo("Succès", f"{len(files)} fichiers trouvés")
 
+    def _refresh_content_index(self, files=None, prewarm=False):
+        """Mettre à jour l'index du contenu en arrière-plan (seuls les fichiers modifiés sont parsés)"""
+        if files is None:
+            files = self._get_page_files()
+        repo_path = self.repo_path.get()
+        file_paths = [self._get_page_path(choice) for choice in files]
+        if prewarm:
+            self.html_manager.cancel_prewarm()
+
+        def refresh():
+            self.content_index.refresh(repo_path, file_paths)
+            if prewarm:
+                # Les pages non re-indexées sont parsées à leur tour pour que l'ouverture soit instantanée
+                self.html_manager.prewarm(file_paths)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    # ======= Surveillance des fichiers =======
+
+    def _start_file_watcher(self):
+        """Surveiller index.html et page/ pour garder la liste, les caches et l'éditeur à jour"""
+        if not self.config_manager.get_auto_refresh():
+            self.file_watcher.stop()
+            return
+        repo_path = Path(self.repo_path.get())
+        self.file_watcher.start([repo_path, repo_path / "page"], self._on_files_changed)
+
+    def _on_files_changed(self, changes):
+        """Appliquer les changements détectés (thread de surveillance)"""
+        repo_path = Path(self.repo_path.get()).resolve()
+        page_paths = {str(path) for path in (repo_path / "index.html", repo_path / "page")}
+        for kind in changes:
+            # À la racine, seul index.html fait partie des pages éditables
+            changes[kind] = [path for path in changes[kind]
+                             if path in page_paths or str(Path(path).parent) in page_paths]
+        if not any(changes.values()):
+            return
+
+        for path in changes["deleted"]:
+            self.html_manager.invalidate_document(path)
+            self.content_index.remove_file(path)
+        for path in changes["created"] + changes["modified"]:
+            self.html_manager.invalidate_document(path)
+            try:
+                self.content_index.refresh_file(path)
+            except Exception as e:
+                self.logger.log(f"Erreur d'indexation de {Path(path).name}: {e}")
+
+        # La page ouverte n'est signalée que si son contenu diffère de la version éditée
+        open_page_state = None
+        if self.current_file:
+            current = str(Path(self.current_file).resolve())
+            if current in changes["deleted"]:
+                open_page_state = "deleted"
+            elif current in changes["created"] + changes["modified"]:
+                result = self.html_manager.load_document(current)
+                if result["success"] and result["document"]["hash"] != self.current_file_hash:
+                    open_page_state = "modified"
+
+        summary = ", ".join(f"{len(paths)} {label}" for label, paths in (
+            ("créé(s)", changes["created"]), ("modifié(s)", changes["modified"]),
+            ("supprimé(s)", changes["deleted"])) if paths)
+        self.logger.log(f"Changements détectés sur le disque: {summary}")
+        self.root.after(0, self._apply_file_changes, changes, open_page_state)
+
+    def _apply_file_changes(self, changes, open_page_state):
+        """Mettre à jour la liste des fichiers et proposer de recharger la page ouverte"""
+        if changes["created"] or changes["deleted"]:
+            files = set(self.file_combo.cget("values") or [])
+            files.update(Path(path).name for path in changes["created"])
+            files.difference_update(Path(path).name for path in changes["deleted"])
+            # index.html reste en tête, comme dans _get_page_files
+            ordered = sorted(files - {"index.html"})
+            if "index.html" in files:
+                ordered.insert(0, "index.html")
+            self.file_combo.configure(values=ordered)
+
+        if open_page_state == "deleted":
+            messagebox.showwarning(
+                "Fichier supprimé",
+                f"{self.current_file.name} a été supprimé ou renommé sur le disque.")
+        elif open_page_state == "modified":
+            for row in self.field_rows:
+                self._store_row_value(row)
+            unsaved = any(field["value"] != field["original"] for field in self.editable_model)
+            message = f"{self.current_file.name} a été modifié en dehors de l'éditeur.\nRecharger la page ?"
+            if unsaved:
+                message += "\n\n⚠️ Les modifications non sauvegardées seront perdues."
+            if messagebox.askyesno("Fichier modifié", message):
+                self._reload_file()
+
     def _on_file_selected(self, choice):
         """Charger le fichier sélectionné et afficher les éléments éditables"""
         if not choice:
             return
 
-        repo_path = Path(self.repo_path.get())
-
-        # Vérifier si c'est index.html (à la racine) ou un fichier du dossier page/
-        if choice == "index.html":
-            file_path = repo_path / "index.html"
-        else:
-            file_path = repo_path / "page" / choice
+        file_path = self._get_page_path(choice)
 
         if file_path.exists():
             try:
@@ -589,14 +773,13 @@ class RoutArtCMS:
     def _load_file_async(self, file_path, choice):
         """Charger le fichier de manière asynchrone"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Lire les éléments éditables depuis l'index (re-parsé seulement si le fichier a changé)
+            result = self.content_index.get_editable_elements(file_path)
+            if "hash" not in result:
+                raise Exception(result["error"])
 
             self.current_file = file_path
-            self.current_file_content = content
-
-            # Extraire les éléments éditables
-            result = self.html_manager.extract_editable_elements(content)
+            self.current_file_hash = result["hash"]
 
             # Planifier l'update dans le thread principal
             self.root.after(0, self._display_editable_elements, result, choice)
@@ -608,57 +791,53 @@ class RoutArtCMS:
 
     def _display_editable_elements(self, result, choice):
         """Afficher les éléments éditables (exécuté dans le thread principal)"""
-        # Nettoyer les champs précédents
-        for widget in self.editable_scrollframe.winfo_children():
-            widget.destroy()
-        self.editable_fields = {}
+        # Les lignes sont recyclées: on les détache de l'ancien modèle sans les détruire
+        for row in self.field_rows:
+            row["index"] = None
+            self.editable_canvas.itemconfigure(row["item"], state="hidden")
+        if self.editable_message_item is not None:
+            self.editable_canvas.delete(self.editable_message_item)
+            self.editable_message_item = None
+        self.highlighted_field_index = None
+
+        # Modèle simple: les valeurs éditées vivent ici, pas dans les widgets
+        self.editable_model = [{
+            "index": elem.get("index", 0),
+            "id": elem.get("id"),
+            "tag": elem.get("tag", "unknown"),
+            "is_iframe": elem.get("is_iframe", False),
+            "original": elem.get("editable_value", ""),
+            "value": elem.get("editable_value", "")
+        } for elem in result["elements"]]
+        self._update_editable_scrollregion()
+        self.editable_canvas.yview_moveto(0)
 
         if result["success"]:
-            # Afficher les éléments progressivement par batch
-            elements = result["elements"]
-            batch_size = 10  # Afficher 10 éléments par batch
-
-            def display_batch(batch_index):
-                start_idx = batch_index * batch_size
-                end_idx = min(start_idx + batch_size, len(elements))
-
-                for elem in elements[start_idx:end_idx]:
-                    self._create_editable_field(elem)
-
-                # Si il y a d'autres éléments, planifier le batch suivant
-                if end_idx < len(elements):
-                    self.root.after(50, display_batch, batch_index + 1)
-                else:
-                    # Tous les éléments sont affichés
-                    self.logger.log(
-                        f"Fichier ouvert: {choice} ({result['count']} éléments éditables)")
-                    messagebox.showinfo(
-                        "Succès", f"Fichier chargé: {result['count']} éléments éditables")
-
-            display_batch(0)
+            self._update_visible_rows()
+            self.logger.log(
+                f"Fichier ouvert: {choice} ({result['count']} éléments éditables)")
+            if self.pending_focus_index is not None:
+                self._scroll_to_field(self.pending_focus_index)
+                self.pending_focus_index = None
+            messagebox.showinfo(
+                "Succès", f"Fichier chargé: {result['count']} éléments éditables")
         else:
             error_label = ctk.CTkLabel(
-                self.editable_scrollframe,
+                self.editable_canvas,
                 text=f"⚠️ {result['error']}",
                 text_color="orange",
                 font=("Montserrat", 11)
             )
-            error_label.pack(pady=10, padx=10)
+            self.editable_message_item = self.editable_canvas.create_window(
+                22, 10, window=error_label, anchor="nw")
             self.logger.log(f"Aucun élément éditable trouvé dans: {choice}")
 
-    def _create_editable_field(self, elem_info):
-        """Créer un champ pour un élément éditable (optimisé)"""
-        elem_index = elem_info.get("index", 0)
-        elem_id = elem_info.get("id")
-        elem_tag = elem_info.get("tag", "unknown")
-        is_iframe = elem_info.get("is_iframe", False)
-        editable_value = elem_info.get("editable_value", "")
-
+    def _create_field_row(self):
+        """Créer une ligne de widgets réutilisable pour afficher un élément éditable"""
         # Conteneur principal
         field_frame = ctk.CTkFrame(
-            self.editable_scrollframe, fg_color="#1e1e1e", corner_radius=10,
-            border_width=2, border_color="#404040", width=1600, height=100)
-        field_frame.pack(fill=tk.X, padx=12, pady=8)
+            self.editable_canvas, fg_color="#1e1e1e", corner_radius=10,
+            border_width=2, border_color="#404040", height=100)
         field_frame.pack_propagate(False)
 
         # Info à gauche
@@ -668,24 +847,22 @@ class RoutArtCMS:
         info_frame.pack_propagate(False)
 
         # Tag
-        tag_label = f"<{elem_tag.upper()}>"
-        if is_iframe:
-            tag_label += " [SRC]"
-        ctk.CTkLabel(
+        tag_label = ctk.CTkLabel(
             info_frame,
-            text=tag_label,
+            text="",
             text_color="#00D4FF",
             font=("Montserrat", 12, "bold")
-        ).pack(anchor="w", padx=8, pady=(8, 2))
+        )
+        tag_label.pack(anchor="w", padx=8, pady=(8, 2))
 
         # ID ou index
-        id_display = elem_id if elem_id else f"[{elem_index}]"
-        ctk.CTkLabel(
+        id_label = ctk.CTkLabel(
             info_frame,
-            text=f"#{id_display}",
+            text="",
             text_color="#90EE90",
             font=("Montserrat", 10)
-        ).pack(anchor="w", padx=8, pady=(2, 8))
+        )
+        id_label.pack(anchor="w", padx=8, pady=(2, 8))
 
         # Champ de texte à droite
         text_frame = ctk.CTkFrame(field_frame, fg_color="#1e1e1e")
@@ -702,24 +879,153 @@ class RoutArtCMS:
         )
         text_widget.pack(fill=tk.BOTH, expand=True)
 
-        # Extraire et insérer le contenu
-        if is_iframe:
-            # Pour les iframes, afficher l'URL du src
-            text_widget.insert("1.0", editable_value)
-        else:
-            # Pour les autres éléments, extraire le texte
-            content_html = elem_info.get("content", "")
-            soup = BeautifulSoup(content_html, 'html.parser')
-            text_content = soup.get_text().strip()
-            text_widget.insert("1.0", text_content)
-
-        # Stocker la référence
-        self.editable_fields[elem_index] = {
+        for widget in (field_frame, info_frame, tag_label, id_label):
+            widget.bind("<MouseWheel>", self._on_mousewheel)
+            widget.bind("<Button-4>", self._on_mousewheel)
+            widget.bind("<Button-5>", self._on_mousewheel)
+
+        item = self.editable_canvas.create_window(
+            12, 0, window=field_frame, anchor="nw", state="hidden",
+            width=self._field_row_width(), height=self.FIELD_ROW_HEIGHT - 16)
+        row = {
+            "item": item,
+            "frame": field_frame,
+            "tag_label": tag_label,
+            "id_label": id_label,
             "widget": text_widget,
-            "tag": elem_tag,
-            "index": elem_index,
-            "is_iframe": is_iframe
+            "index": None
         }
+        text_widget.bind("<KeyRelease>", lambda e: self._store_row_value(row))
+        text_widget.bind("<FocusOut>", lambda e: self._store_row_value(row))
+        return row
+
+    def _bind_field_row(self, row, elem_index):
+        """Associer une ligne recyclée à un élément du modèle"""
+        self._store_row_value(row)
+        elem = self.editable_model[elem_index]
+        tag_label = f"<{elem['tag'].upper()}>"
+        if elem["is_iframe"]:
+            tag_label += " [SRC]"
+        id_display = elem["id"] if elem["id"] else f"[{elem['index']}]"
+        row["tag_label"].configure(text=tag_label)
+        row["id_label"].configure(text=f"#{id_display}")
+        row["widget"].delete("1.0", tk.END)
+        row["widget"].insert("1.0", elem["value"])
+        row["frame"].configure(
+            border_color="#00D4FF" if elem_index == self.highlighted_field_index else "#404040")
+        self.editable_canvas.coords(
+            row["item"], 12, elem_index * self.FIELD_ROW_HEIGHT + 8)
+        self.editable_canvas.itemconfigure(row["item"], state="normal")
+        row["index"] = elem_index
+
+    def _store_row_value(self, row):
+        """Recopier le texte d'une ligne dans le modèle"""
+        if row["index"] is not None and row["index"] < len(self.editable_model):
+            self.editable_model[row["index"]]["value"] = row["widget"].get(
+                "1.0", "end-1c")
+
+    def _update_visible_rows(self):
+        """Créer/recycler les lignes pour les éléments visibles du canvas"""
+        self._rows_update_pending = False
+        count = len(self.editable_model)
+        top = self.editable_canvas.canvasy(0)
+        height = max(self.editable_canvas.winfo_height(), self.FIELD_ROW_HEIGHT)
+        first = max(int(top // self.FIELD_ROW_HEIGHT) - self.FIELD_ROW_BUFFER, 0)
+        last = min(int((top + height) // self.FIELD_ROW_HEIGHT) + self.FIELD_ROW_BUFFER + 1, count)
+        visible = range(first, last)
+
+        while len(self.field_rows) < len(visible):
+            self.field_rows.append(self._create_field_row())
+
+        bound = {row["index"] for row in self.field_rows if row["index"] in visible}
+        free_rows = [row for row in self.field_rows if row["index"] not in bound]
+        for elem_index in visible:
+            if elem_index not in bound:
+                self._bind_field_row(free_rows.pop(), elem_index)
+        for row in free_rows:
+            self._store_row_value(row)
+            row["index"] = None
+            self.editable_canvas.itemconfigure(row["item"], state="hidden")
+
+    def _schedule_visible_rows_update(self):
+        """Regrouper les mises à jour des lignes (défilement rapide)"""
+        if not self._rows_update_pending:
+            self._rows_update_pending = True
+            self.root.after_idle(self._update_visible_rows)
+
+    def _on_editable_scroll(self, first, last):
+        """Synchroniser la scrollbar et les lignes visibles"""
+        self.editable_v_scrollbar.set(first, last)
+        self._schedule_visible_rows_update()
+
+    def _field_row_width(self):
+        """Largeur d'une ligne (largeur du canvas moins les marges)"""
+        return max(self.editable_canvas.winfo_width() - 24, 600)
+
+    def _on_editable_canvas_configure(self, event=None):
+        """Adapter la largeur des lignes et la zone de défilement au redimensionnement"""
+        width = self._field_row_width()
+        for row in self.field_rows:
+            self.editable_canvas.itemconfigure(row["item"], width=width)
+        self._update_editable_scrollregion()
+        self._schedule_visible_rows_update()
+
+    def _update_editable_scrollregion(self):
+        """Hauteur virtuelle = nombre d'éléments x hauteur d'une ligne"""
+        self.editable_canvas.configure(scrollregion=(
+            0, 0, self._field_row_width() + 24,
+            len(self.editable_model) * self.FIELD_ROW_HEIGHT + 8))
+
+    def _on_search(self, event=None):
+        """Rechercher dans l'index du contenu pendant la frappe"""
+        query = self.search_entry.get().strip()
+        self.search_results.delete(0, tk.END)
+        if not query:
+            self.search_matches = []
+            self.search_results.pack_forget()
+            return
+        result = self.content_index.search(query, limit=50, repo_path=self.repo_path.get())
+        self.search_matches = result["matches"]
+        for match in self.search_matches:
+            label = match["id"] if match["id"] else f"[{match['index']}]"
+            text = " ".join(match["text"].split())
+            self.search_results.insert(
+                tk.END, f"{Path(match['file']).name}  #{label}  {text[:90]}")
+        if not self.search_matches:
+            self.search_results.insert(tk.END, "Aucun résultat")
+        self.search_results.pack(fill=tk.X, padx=5, pady=5)
+
+    def _on_search_result_selected(self, event=None):
+        """Ouvrir le fichier du résultat et faire défiler jusqu'au champ"""
+        selection = self.search_results.curselection()
+        if not selection or selection[0] >= len(self.search_matches):
+            return
+        match = self.search_matches[selection[0]]
+        file_path = Path(match["file"])
+        if self.current_file and Path(self.current_file).resolve() == file_path:
+            self._scroll_to_field(match["index"])
+            return
+        self.pending_focus_index = match["index"]
+        self.file_combo.set(file_path.name)
+        self._on_file_selected(file_path.name)
+
+    def _scroll_to_field(self, elem_index):
+        """Faire défiler le canvas jusqu'au champ éditable et le mettre en évidence"""
+        if not 0 <= elem_index < len(self.editable_model):
+            return
+        total_height = len(self.editable_model) * self.FIELD_ROW_HEIGHT + 8
+        self.editable_canvas.yview_moveto(
+            elem_index * self.FIELD_ROW_HEIGHT / total_height)
+        self.highlighted_field_index = elem_index
+        self._update_visible_rows()
+        for row in self.field_rows:
+            if row["index"] is None:
+                continue
+            is_target = row["index"] == elem_index
+            row["frame"].configure(
+                border_color="#00D4FF" if is_target else "#404040")
+            if is_target:
+                row["widget"].focus_set()
 
     def _save_editable_file(self):
         """Sauvegarder les modifications des éléments éditables"""
@@ -727,51 +1033,213 @@ class RoutArtCMS:
             messagebox.showerror("Erreur", "Aucun fichier sélectionné")
             return
 
+        # Récupérer le texte des lignes affichées puis ne garder que les champs modifiés
+        for row in self.field_rows:
+            self._store_row_value(row)
+        values = {elem["index"]: elem["value"] for elem in self.editable_model
+                  if elem["value"] != elem["original"]}
+        if not values:
+            self.logger.log(f"Aucune modification à sauvegarder: {self.current_file.name}")
+            messagebox.showinfo("Information", "Aucune modification à sauvegarder")
+            return
+
         # Sauvegarder de manière asynchrone
-        threading.Thread(target=self._save_file_async, daemon=True).start()
+        threading.Thread(target=self._save_file_async,
+                         args=(values,), daemon=True).start()
 
-    def _save_file_async(self):
+    def _save_file_async(self, values):
         """Sauvegarder le fichier de manière asynchrone"""
         try:
-            content = self.current_file_content
-            soup = BeautifulSoup(content, 'html.parser')
-            editable_elements = soup.find_all(class_='editable')
-            for elem_index, field_info in self.editable_fields.items():
-                text_widget = field_info["widget"]
-                new_content = text_widget.get("1.0", "end-1c")
-                is_iframe = field_info.get("is_iframe", False)
-                if isinstance(elem_index, int) and elem_index < len(editable_elements):
-                    element = editable_elements[elem_index]
-                    if is_iframe:
-                        element['src'] = new_content
-                        self.logger.log(
-                            f"iframe [{elem_index}] src mis à jour: {new_content}")
-                    else:
-                        element.clear()
-                        element.string = new_content
-                        self.logger.log(f"Élément [{elem_index}] mis à jour")
-            updated_content = str(soup.prettify())
-            with open(self.current_file, 'w', encoding='utf-8') as f:
-                f.write(updated_content)
-
-            self.logger.log(f"Fichier sauvegardé: {self.current_file.name}")
-
-            # Générer automatiquement le sitemap après la sauvegarde
+            result = self.html_manager.save_editable_elements(
+                self.current_file, values, expected_hash=self.current_file_hash)
+            if not result["success"]:
+                raise Exception(result["error"])
+            self.current_file_hash = result["hash"]
+            # Les champs refusés restent marqués comme modifiés
+            skipped = result.get("skipped", [])
+            saved_values = {index: value for index, value in values.items() if index not in skipped}
+            self.root.after(0, self._mark_fields_saved, self.current_file, saved_values)
+            if not result["changed"]:
+                self.logger.log(result["message"])
+                self.root.after(0, lambda: messagebox.showinfo(
+                    "Information", "Aucune modification à sauvegarder"))
+                return
+            self.content_index.refresh_file(self.current_file)
+            # Recharger les navigateurs qui affichent cette page dans la prévisualisation
+            self.server_manager.notify_change(self.current_file)
+
+            self.logger.log(
+                f"Fichier sauvegardé: {self.current_file.name} ({result['count']} champ(s) modifié(s))")
+
+            # Mettre à jour le sitemap seulement si la date lastmod de la page change
             repo_path = self.repo_path.get()
-            sitemap_result = self.sitemap_generator.update_sitemap(repo_path)
-            if sitemap_result['success']:
-                self.logger.log("Sitemap mis à jour automatiquement")
+            sitemap_result = self.sitemap_generator.update_sitemap(
+                repo_path, changed_files=[self.current_file])
+            if sitemap_result.get('skipped'):
+                sitemap_message = "Sitemap déjà à jour"
+            elif sitemap_result['success']:
+                sitemap_message = "Sitemap mis à jour automatiquement"
             else:
-                self.logger.log(f"Attention: {sitemap_result['error']}")
-
+                sitemap_message = f"Attention: {sitemap_result['error']}"
+            self.logger.log(sitemap_message)
+            # Site construit: seules la page sauvegardée et le sitemap (lastmod) sont reconstruits
+            if self.site_builder.is_built(repo_path):
+                self.site_builder.build(
+                    repo_path, changed_files=[self.current_file, Path(repo_path) / "sitemap.xml"])
+
+            if skipped:
+                elements = self.html_manager.get_editable_elements(self.current_file)["elements"]
+                skipped_message = ("Non modifié(s), le changement effacerait des balises internes "
+                                   f"(liens, gras, listes): {self.html_manager.element_labels(elements, skipped)}")
+                self.logger.log(skipped_message)
+                self.root.after(0, lambda: messagebox.showwarning(
+                    "Sauvegarde partielle",
+                    f"Fichier sauvegardé: {self.current_file.name}\n{skipped_message}\n{sitemap_message}"))
+                return
             self.root.after(0, lambda: messagebox.showinfo(
-                "Succès", f"Fichier sauvegardé: {self.current_file.name}\nSitemap mis à jour automatiquement"))
+                "Succès", f"Fichier sauvegardé: {self.current_file.name}\n{sitemap_message}"))
 
         except Exception as e:
             self.logger.log(f"Erreur sauvegarde: {e}")
             self.root.after(0, lambda: messagebox.showerror(
                 "Erreur", f"Impossible de sauvegarder: {e}"))
 
+    def _mark_fields_saved(self, file_path, values):
+        """Les valeurs sauvegardées deviennent la nouvelle référence des champs"""
+        if self.current_file != file_path:
+            return
+        for elem_index, value in values.items():
+            if elem_index < len(self.editable_model):
+                self.editable_model[elem_index]["original"] = value
+
+    # ======= Remplacement par lot =======
+
+    def _open_batch_replace_dialog(self):
+        """Ouvrir la fenêtre de rechercher/remplacer dans toutes les pages"""
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("🔁 Remplacer dans toutes les pages")
+        dialog.geometry("900x600")
+        dialog.transient(self.root)
+
+        form = ctk.CTkFrame(dialog)
+        form.pack(fill=tk.X, padx=15, pady=15)
+
+        ctk.CTkLabel(form, text="Rechercher:", font=("Montserrat", 11)).grid(
+            row=0, column=0, sticky="w", padx=5, pady=5)
+        search_entry = ctk.CTkEntry(form, height=35, placeholder_text="Exemple: 2025")
+        search_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
+
+        ctk.CTkLabel(form, text="Remplacer par:", font=("Montserrat", 11)).grid(
+            row=1, column=0, sticky="w", padx=5, pady=5)
+        replace_entry = ctk.CTkEntry(form, height=35, placeholder_text="Exemple: 2026")
+        replace_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=5)
+        form.grid_columnconfigure(1, weight=1)
+
+        regex_var = tk.BooleanVar(value=False)
+        ignore_case_var = tk.BooleanVar(value=False)
+        options_frame = ctk.CTkFrame(form)
+        options_frame.grid(row=2, column=0, columnspan=2, sticky="w", pady=5)
+        ctk.CTkCheckBox(options_frame, text="Expression régulière",
+                        variable=regex_var).pack(side=tk.LEFT, padx=5)
+        ctk.CTkCheckBox(options_frame, text="Ignorer la casse",
+                        variable=ignore_case_var).pack(side=tk.LEFT, padx=5)
+
+        preview_display = ctk.CTkTextbox(dialog, state="disabled", font=("Montserrat", 12))
+        preview_display.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 15))
+
+        # Dernier aperçu: les hash permettent de refuser les fichiers modifiés depuis
+        last_preview = {"params": None, "hashes": {}}
+
+        def read_params():
+            return (search_entry.get(), replace_entry.get(),
+                    regex_var.get(), ignore_case_var.get())
+
+        def run(dry_run):
+            params = read_params()
+            if not params[0]:
+                messagebox.showerror("Erreur", "Veuillez entrer le texte à rechercher", parent=dialog)
+                return
+            if not dry_run:
+                if last_preview["params"] != params:
+                    messagebox.showerror(
+                        "Erreur", "Lancez d'abord l'aperçu pour ces paramètres", parent=dialog)
+                    return
+                if self.current_file and str(Path(self.current_file).resolve()) in last_preview["hashes"] \
+                        and any(elem["value"] != elem["original"] for elem in self.editable_model):
+                    if not messagebox.askyesno(
+                            "Modifications non sauvegardées",
+                            "Le fichier ouvert contient des modifications non sauvegardées qui seront perdues.\nContinuer ?",
+                            parent=dialog):
+                        return
+            file_paths = [self._get_page_path(choice) for choice in self._get_page_files()]
+            expected_hashes = {} if dry_run else last_preview["hashes"]
+            threading.Thread(target=self._batch_replace_thread,
+                             args=(dialog, preview_display, last_preview, params,
+                                   file_paths, dry_run, expected_hashes),
+                             daemon=True).start()
+
+        buttons_frame = ctk.CTkFrame(form)
+        buttons_frame.grid(row=3, column=0, columnspan=2, sticky="w", pady=5)
+        ctk.CTkButton(buttons_frame, text="👁️  Aperçu", command=lambda: run(True),
+                      width=150, height=35).pack(side=tk.LEFT, padx=5)
+        ctk.CTkButton(buttons_frame, text="✓ Appliquer", command=lambda: run(False),
+                      width=150, height=35).pack(side=tk.LEFT, padx=5)
+
+    def _batch_replace_thread(self, dialog, preview_display, last_preview, params,
+                              file_paths, dry_run, expected_hashes):
+        """Thread pour le remplacement par lot (aperçu ou application)"""
+        search, replacement, use_regex, ignore_case = params
+        result = self.html_manager.batch_replace(
+            file_paths, search, replacement, use_regex=use_regex, ignore_case=ignore_case,
+            dry_run=dry_run, expected_hashes=expected_hashes)
+        if result["success"] and dry_run:
+            last_preview["params"] = params
+            last_preview["hashes"] = {file_result["file"]: file_result["hash"]
+                                      for file_result in result["files"] if "hash" in file_result}
+        if result["success"] and not dry_run:
+            last_preview["params"] = None
+            for file_path in result["written"]:
+                self.content_index.refresh_file(file_path)
+        self.root.after(0, self._display_batch_replace_result,
+                        dialog, preview_display, result)
+
+    def _display_batch_replace_result(self, dialog, preview_display, result):
+        """Afficher l'aperçu ou le bilan du remplacement par lot"""
+        if not result["success"]:
+            messagebox.showerror("Erreur", result["error"], parent=dialog)
+            return
+        lines = []
+        for file_result in result["files"]:
+            name = Path(file_result["file"]).name
+            if "error" in file_result:
+                lines.append(f"❌ {name}: {file_result['error']}")
+                continue
+            status = "✓ écrit" if file_result["written"] else "aperçu"
+            lines.append(f"📄 {name} ({file_result['count']} occurrence(s), {status})")
+            for match in file_result["matches"]:
+                label = match["id"] if match["id"] else f"[{match['index']}]"
+                before = " ".join(match["before"].split())[:80]
+                after = " ".join(match["after"].split())[:80]
+                lines.append(f"    #{label}: {before}")
+                lines.append(f"    {' ' * len(label)}  → {after}")
+            for skipped in file_result.get("skipped", []):
+                label = skipped["id"] if skipped["id"] else f"[{skipped['index']}]"
+                lines.append(f"    ⚠️  #{label} ignoré: {skipped['reason']}")
+            lines.append("")
+        if not lines:
+            lines.append("Aucune occurrence trouvée dans les éléments éditables")
+        mode = "Aperçu" if result["dry_run"] else "Remplacement effectué"
+        lines.insert(0, f"{mode}: {result['total']} occurrence(s) dans {len(result['files'])} fichier(s)\n")
+
+        preview_display.configure(state="normal")
+        preview_display.delete("1.0", tk.END)
+        preview_display.insert("1.0", "\n".join(lines))
+        preview_display.configure(state="disabled")
+
+        # Recharger la page ouverte si elle a été modifiée par le lot
+        if self.current_file and str(Path(self.current_file).resolve()) in result["written"]:
+            self._reload_file()
+
     def _reload_file(self):
         """Recharger le fichier"""
         if self.file_combo.get():
@@ -800,7 +1268,7 @@ class RoutArtCMS:
 
     def _toggle_server(self):
         """Démarrer/arrêter le serveur local"""
-        if self.server_running:
+        if self.server_manager.is_running():
             self._stop_server()
         else:
             self._start_server()
@@ -840,21 +1308,27 @@ class RoutArtCMS:
                     "Erreur", "Le chemin du repository n'existe pas")
                 return
 
-            # Démarrer le serveur en thread
-            self.server_thread = threading.Thread(
-                target=self.server_manager.start,
-                args=(repo_path, port, self._on_server_log)
-            )
-            self.server_thread.daemon = False  # NOT daemon - on veut l'arrêter proprement
-            self.server_thread.start()
-
-            self.server_running = True
-            self.server_toggle_btn.configure(text="⏹️  Arrêter Serveur")
-            self.server_status_label.configure(
-                text=f"🟢 Actif (Port {port})", text_color="green")
+            # Démarrer le serveur (non bloquant: il tourne dans son propre thread)
+            result = self.server_manager.start_server(
+                repo_path, port, callback=self._on_server_log)
+            if not result["success"]:
+                messagebox.showerror("Erreur", result["error"])
+                return
+            # Le port suivant est utilisé si celui demandé est occupé
+            port = result["port"]
+
+            # Les modifications faites sur le disque rechargent aussi la prévisualisation
+            # et mettent à jour la table des routes du serveur
+            repo = Path(repo_path)
+            self.site_watcher.start(
+                [repo, repo / "page", repo / "style", repo / "script", repo / "images", repo / "files"],
+                self._on_site_files_changed,
+                suffixes=(".html", ".css", ".js", ".png", ".jpg", ".jpeg", ".webp", ".gif", ".svg",
+                          ".ico", ".pdf"))
+
+            self._update_server_controls()
             self.url_label.configure(text=f"http://localhost:{port}")
 
-            self.logger.log(f"Serveur démarré sur le port {port}")
             messagebox.showinfo(
                 "Succès", f"Serveur local démarré sur http://localhost:{port}")
 
@@ -863,17 +1337,129 @@ class RoutArtCMS:
                 "Erreur", f"Impossible de démarrer le serveur: {e}")
 
     def _stop_server(self):
-        """Arrêter le serveur local"""
-        try:
-            self.server_manager.stop()
-            self.server_running = False
-            self.server_toggle_btn.configure(text="▶️  Démarrer Serveur")
+        """Arrêter le serveur local (les requêtes en cours se terminent en arrière-plan)"""
+        self.site_watcher.stop()
+        self.server_toggle_btn.configure(text="⏳ Arrêt en cours...", state="disabled")
+        self.server_status_label.configure(text="🟠 Arrêt en cours", text_color="orange")
+
+        def stop():
+            result = self.server_manager.stop_server()
+            self.root.after(0, self._on_server_stopped, result)
+
+        threading.Thread(target=stop, daemon=True).start()
+
+    def _on_server_stopped(self, result):
+        """Afficher l'état réel du serveur une fois l'arrêt terminé"""
+        self._update_server_controls()
+        if result["success"]:
+            messagebox.showinfo("Succès", result["message"])
+        else:
+            messagebox.showerror("Erreur", result.get("error", "Le serveur ne s'est pas arrêté"))
+
+    def _update_server_controls(self):
+        """Aligner le bouton et le statut sur l'état réel du serveur principal"""
+        server = self.server_manager.get_server()
+        self.server_running = server is not None and server.is_running()
+        if self.server_running:
+            self.server_toggle_btn.configure(text="⏹️  Arrêter Serveur", state="normal")
             self.server_status_label.configure(
-                text="⚫ Arrêté", text_color="red")
-            self.logger.log("Serveur arrêté")
-            messagebox.showinfo("Succès", "Serveur arrêté")
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de l'arrêt: {e}")
+                text=f"🟢 Actif (Port {server.port})", text_color="green")
+        else:
+            self.server_toggle_btn.configure(text="▶️  Démarrer Serveur", state="normal")
+            self.server_status_label.configure(text="⚫ Arrêté", text_color="red")
+
+    def _toggle_compression(self):
+        """Activer/désactiver gzip dans le serveur de prévisualisation"""
+        self.server_manager.set_compression(self.gzip_var.get())
+
+    def _show_transfer_sizes(self):
+        """Afficher le poids de chaque page (HTML + ressources) sans et avec gzip"""
+        repo_path = self.repo_path.get()
+
+        def compute():
+            result = self.server_manager.transfer_sizes(repo_path)
+            self.root.after(0, self._display_transfer_sizes, result)
+
+        threading.Thread(target=compute, daemon=True).start()
+
+    def _display_transfer_sizes(self, result):
+        """Écrire le tableau des tailles transférées dans les logs du serveur"""
+        if not result["success"]:
+            messagebox.showerror("Erreur", result["error"])
+            return
+        lines = [f"{'Page':<36}{'Fichiers':>9}{'Brut (Ko)':>12}{'gzip (Ko)':>12}{'Gain':>8}"]
+        for page in result["pages"] + [{"page": "Total", "files": "", "raw": result["total_raw"],
+                                         "gzip": result["total_gzip"]}]:
+            saved = 100 * (1 - page["gzip"] / page["raw"]) if page["raw"] else 0
+            lines.append(f"{page['page']:<36}{page['files']:>9}{page['raw'] / 1024:>12.1f}"
+                         f"{page['gzip'] / 1024:>12.1f}{saved:>7.1f}%")
+        self._append_server_log("\n".join(lines))
+
+    def _build_site(self):
+        """Construire la version publiable du site (seules les pages modifiées sont refaites)"""
+        repo_path = self.repo_path.get()
+        self.build_site_btn.configure(state="disabled")
+
+        def build():
+            result = self.site_builder.build(repo_path)
+            self.root.after(0, self._display_build_result, result)
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def _display_build_result(self, result):
+        """Écrire le résultat de la construction dans les logs du serveur"""
+        self.build_site_btn.configure(state="normal")
+        if not result["success"]:
+            messagebox.showerror("Erreur", result["error"])
+            return
+        self._append_server_log(
+            f"🏗️ Site construit dans {result['output_dir']}: {len(result['changed'])} fichier(s) modifié(s), "
+            f"{len(result['pages'])} page(s) reconstruite(s) en {result['duration_ms']:.0f} ms")
+        images = result["images"]
+        if images["count"]:
+            self._append_server_log(
+                f"   Images: {images['count']} optimisée(s), {images['original_bytes'] / 1024:.0f} Ko -> "
+                f"{images['webp_bytes'] / 1024:.0f} Ko en WebP pleine largeur")
+        if result["css"]:
+            lines = [f"{'Page CSS':<36}{'Requêtes':>10}{'Avant (Ko)':>12}{'Après (Ko)':>12}{'Économisé':>11}"]
+            for page in result["css"]:
+                lines.append(f"{page['page']:<36}{page['requests_before']:>5} -> {page['requests_after']:<2}"
+                             f"{page['bytes_before'] / 1024:>12.1f}{page['bytes_after'] / 1024:>12.1f}"
+                             f"{page['saved'] / 1024:>10.1f}K")
+            total_saved = sum(page["saved"] for page in result["css"])
+            lines.append(f"{'Total':<36}{'':>10}{'':>12}{'':>12}{total_saved / 1024:>10.1f}K")
+            self._append_server_log("\n".join(lines))
+
+    def _refresh_access_stats(self):
+        """Rafraîchir le tableau des latences par chemin (toutes les secondes)"""
+        access_log = self.server_manager.access_log
+        if access_log.version != self.access_stats_version:
+            self.access_stats_version = access_log.version
+            lines = [f"{'Chemin':<44}{'Req.':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                     f"{'Ko':>10}{'Cache':>8}{'Err.':>6}"]
+            for row in access_log.summary(limit=20):
+                path = row["path"] if len(row["path"]) <= 43 else "…" + row["path"][-42:]
+                hit_ratio = f"{row['hit_ratio'] * 100:.0f}%" if row["hit_ratio"] is not None else "-"
+                lines.append(f"{path:<44}{row['count']:>6}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+                             f"{row['p99_ms']:>9.1f}{row['bytes'] / 1024:>10.1f}{hit_ratio:>8}{row['errors']:>6}")
+            self.access_stats_display.configure(state="normal")
+            self.access_stats_display.delete("1.0", tk.END)
+            self.access_stats_display.insert("1.0", "\n".join(lines))
+            self.access_stats_display.configure(state="disabled")
+        # Le bouton suit l'état réel, même si le serveur s'est arrêté de lui-même
+        if self.server_running != self.server_manager.is_running() \
+                and self.server_toggle_btn.cget("state") == "normal":
+            self._update_server_controls()
+        self.root.after(1000, self._refresh_access_stats)
+
+    def _clear_access_stats(self):
+        """Remettre à zéro les statistiques des requêtes"""
+        self.server_manager.access_log.clear()
+
+    def _on_site_files_changed(self, changes):
+        """Notifier les navigateurs de la prévisualisation (thread de surveillance)"""
+        for path in changes["created"] + changes["modified"] + changes["deleted"]:
+            self.server_manager.notify_change(path)
 
     def _on_server_log(self, message):
         """Ajouter un log du serveur"""
@@ -893,9 +1479,45 @@ class RoutArtCMS:
             return
 
         import webbrowser
-        port = self.port_entry.get()
-        url = f"http://localhost:{port}"
-        webbrowser.open(url)
+        webbrowser.open(self.server_manager.get_server().url)
+
+    def _toggle_main_preview(self):
+        """Démarrer/arrêter un second serveur sur origin/main, à côté de la copie de travail"""
+        if self.server_manager.is_running("origin/main"):
+            self.server_manager.stop_server("origin/main")
+            self.main_preview_btn.configure(text="🌿 Prévisualiser origin/main")
+            return
+        self.main_preview_btn.configure(state="disabled")
+        threading.Thread(target=self._start_main_preview_thread,
+                         args=(self.repo_path.get(),), daemon=True).start()
+
+    def _start_main_preview_thread(self, repo_path):
+        """Extraire origin/main dans un dossier à part puis le servir (thread)"""
+        target_dir = Path.home() / ".rout_art_cms" / "preview" / "origin-main"
+        result = self.git_manager.export_revision(repo_path, "origin/main", target_dir)
+        if not result["success"]:
+            self.root.after(0, self._on_main_preview_started, False, result["message"])
+            return
+        default = self.server_manager.get_server()
+        port = default.port + 1 if default else self.config_manager.get_default_port() + 1
+        server = self.server_manager.start_server(
+            target_dir, port, name="origin/main", callback=self._on_server_log)
+        if not server["success"]:
+            self.root.after(0, self._on_main_preview_started, False, server["error"])
+            return
+        self.root.after(0, self._on_main_preview_started, True,
+                        f"origin/main ({result['commit']}) servi sur {server['url']}")
+
+    def _on_main_preview_started(self, success, message):
+        """Mettre à jour le bouton origin/main (thread principal)"""
+        self.main_preview_btn.configure(state="normal")
+        if not success:
+            messagebox.showerror("Erreur", message)
+            return
+        self.main_preview_btn.configure(text="⏹️  Arrêter origin/main")
+        self._append_server_log(f"🌿 {message}")
+        import webbrowser
+        webbrowser.open(self.server_manager.get_server("origin/main").url)
 
     # ======= Méthodes Paramètres =======
 
@@ -906,6 +1528,7 @@ class RoutArtCMS:
             self.config_manager.set_auto_pull(self.auto_pull_var.get())
             self.config_manager.set_auto_refresh(self.auto_refresh_var.get())
             self.config_manager.save_config()
+            self._start_file_watcher()
             messagebox.showinfo("Succès", "Paramètres sauvegardés")
         except Exception as e:
             messagebox.showerror(
@@ -969,10 +1592,21 @@ class RoutArtCMS:
 
     def _on_startup(self):
         """Actions au démarrage"""
+        # Indexer puis pré-charger toutes les pages en arrière-plan
+        self._refresh_content_index(prewarm=True)
+        self._start_file_watcher()
         if self.config_manager.get_auto_pull():
             self.logger.log("Pull automatique au démarrage...")
             self._git_pull()
 
+    def _on_close(self):
+        """Fermeture de l'application: arrêter la surveillance et les serveurs avant de quitter"""
+        self.html_manager.cancel_prewarm()
+        self.file_watcher.stop()
+        self.site_watcher.stop()
+        self.server_manager.stop_all(deadline=1.0)
+        self.root.destroy()
+
 
 def main():
     """Point d'entrée principal"""
@@ -992,4 +1626,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Nécessaire pour les pools de processus dans l'exécutable PyInstaller
+    multiprocessing.freeze_support()
     main()
@@ -23,6 +23,15 @@ a = Analysis(
         'socketserver',
         'git_manager',
         'html_manager',
+        'content_index',
+        'file_watcher',
+        'html_rewriter',
+        'image_optimizer',
+        'css_bundler',
+        'asset_fingerprint',
+        'site_builder',
+        'link_checker',
+        'sqlite3',
         'server_manager',
         'config_manager',
         'logger',
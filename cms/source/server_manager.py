@@ -4,13 +4,432 @@
 Gestionnaire de Serveur HTTP - Serveur local pour prévisualisation
 """
 
+import email.utils
+import errno
+import gzip
 import http.server
-import socketserver
+import mimetypes
 import os
+import re
+import socket
+import socketserver
+import sys
 import threading
+import time
 import webbrowser
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
-from urllib.parse import unquote
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from asset_fingerprint import FINGERPRINT_RE
+from html_rewriter import page_paths
+
+
+# Script injecté dans les pages HTML servies: rechargement de la page ou des feuilles de style
+LIVE_RELOAD_SCRIPT = b"""(function () {
+  var page = decodeURIComponent(location.pathname);
+  if (page.slice(-1) === '/') { page += 'index.html'; }
+  var source = new EventSource('/__livereload?page=' + encodeURIComponent(page));
+  function pathOf(value) { return decodeURIComponent(new URL(value, location.href).pathname); }
+  source.addEventListener('reload', function () { location.reload(); });
+  function importsOf(sheet, found) {
+    var rules;
+    try { rules = sheet.cssRules; } catch (e) { return found; }
+    Array.prototype.forEach.call(rules || [], function (rule) {
+      if (rule.styleSheet && rule.styleSheet.href) {
+        found.push(pathOf(rule.styleSheet.href));
+        importsOf(rule.styleSheet, found);
+      }
+    });
+    return found;
+  }
+  source.addEventListener('css', function (event) {
+    var swapped = false;
+    document.querySelectorAll('link[rel="stylesheet"]').forEach(function (link) {
+      if (pathOf(link.href) === event.data) {
+        var url = new URL(link.href);
+        url.searchParams.set('livereload', Date.now());
+        link.href = url.toString();
+        swapped = true;
+      }
+    });
+    if (swapped) { return; }
+    // Feuille chargee par @import: le navigateur garde l'import en cache, rechargement complet
+    var imported = Array.prototype.reduce.call(document.styleSheets, function (found, sheet) {
+      return importsOf(sheet, found);
+    }, []);
+    if (imported.indexOf(event.data) !== -1) { location.reload(); }
+  });
+  source.addEventListener('asset', function (event) {
+    var used = Array.prototype.some.call(document.querySelectorAll('[src], [href]'), function (el) {
+      return pathOf(el.getAttribute('src') || el.getAttribute('href')) === event.data;
+    });
+    if (used) { location.reload(); }
+  });
+})();
+"""
+LIVE_RELOAD_TAG = b'<script src="/__livereload.js"></script>'
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Compression gzip: types texte uniquement (les images et PDF sont déjà compressés)
+COMPRESSIBLE_TYPES = {"application/javascript", "text/javascript", "application/json",
+                      "application/xml", "image/svg+xml"}
+GZIP_MIN_SIZE = 256
+GZIP_LEVEL = 6
+
+
+def is_compressible(content_type):
+    """Le type de contenu gagne-t-il à être compressé ?"""
+    content_type = content_type.split(";")[0].strip()
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+def gzip_bytes(data):
+    """Compresser en gzip de manière déterministe (mtime fixe)"""
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class LiveReloadHub:
+    """Connexions Server-Sent Events des navigateurs, notifiées quand une page ou une ressource change"""
+
+    PING_INTERVAL = 15
+
+    def __init__(self):
+        self._clients = {}
+        self._last_notified = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._ping_thread = None
+
+    def attach(self, sock, page):
+        """Garder la connexion ouverte d'un navigateur affichant `page` (chemin d'URL)"""
+        sock.settimeout(2)
+        with self._lock:
+            self._clients[sock] = page
+            if self._ping_thread is None:
+                self._closed.clear()
+                self._ping_thread = threading.Thread(target=self._ping_loop, daemon=True)
+                self._ping_thread.start()
+
+    def client_count(self):
+        """Nombre de navigateurs connectés"""
+        with self._lock:
+            return len(self._clients)
+
+    def notify(self, url_path, mtime=None):
+        """Prévenir les navigateurs concernés: rechargement de la page, hot-swap CSS ou ressource"""
+        with self._lock:
+            # Une même version n'est notifiée qu'une fois (sauvegarde + surveillance du disque)
+            if mtime is not None:
+                if self._last_notified.get(url_path) == mtime:
+                    return 0
+                self._last_notified[url_path] = mtime
+            if url_path.endswith(".html"):
+                targets = [sock for sock, page in self._clients.items() if page == url_path]
+                event = "reload"
+            else:
+                targets = list(self._clients)
+                event = "css" if url_path.endswith(".css") else "asset"
+        message = f"event: {event}\ndata: {url_path}\n\n".encode("utf-8")
+        for sock in targets:
+            self._send(sock, message)
+        return len(targets)
+
+    def _send(self, sock, message):
+        """Envoyer un message SSE; la connexion est fermée si le navigateur est parti"""
+        try:
+            sock.sendall(message)
+        except OSError:
+            self._drop(sock)
+
+    def _drop(self, sock):
+        """Oublier une connexion et la fermer"""
+        with self._lock:
+            self._clients.pop(sock, None)
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _ping_loop(self):
+        """Commentaire SSE périodique pour détecter les onglets fermés"""
+        while not self._closed.wait(self.PING_INTERVAL):
+            with self._lock:
+                clients = list(self._clients)
+            for sock in clients:
+                self._send(sock, b": ping\n\n")
+
+    def close(self):
+        """Fermer toutes les connexions (arrêt du serveur)"""
+        self._closed.set()
+        with self._lock:
+            clients = list(self._clients)
+            self._ping_thread = None
+        for sock in clients:
+            self._drop(sock)
+
+
+class AssetCache:
+    """Cache LRU du contenu des fichiers servis, validé par mtime et taille à chaque requête"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path, route=None):
+        """Retourner (entrée, hit) pour un fichier; le contenu est relu si le fichier a changé"""
+        if route is None:
+            stat = os.stat(file_path)
+            route = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "last_modified": stat.st_mtime}
+        # Avec une route de la table, mtime et taille sont déjà connus: pas d'os.stat par requête
+        mtime, size = route["mtime"], route["size"]
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry and entry["mtime"] == mtime and entry["size"] == size:
+                self._entries.move_to_end(file_path)
+                self.hits += 1
+                return entry, True
+
+        entry = {
+            "mtime": mtime,
+            "size": size,
+            "last_modified": route["last_modified"],
+            "etag": f'"{mtime:x}-{size:x}"',
+            "body": None,
+            "variants": {}
+        }
+        # Les gros fichiers (PDF, grandes images) sont envoyés depuis le disque avec sendfile
+        if size <= self.max_entry_bytes:
+            with open(file_path, 'rb') as f:
+                entry["body"] = f.read()
+            entry["size"] = len(entry["body"])
+
+        with self._lock:
+            self.misses += 1
+            previous = self._entries.pop(file_path, None)
+            if previous:
+                self.current_bytes -= self._entry_bytes(previous)
+            self._entries[file_path] = entry
+            self.current_bytes += self._entry_bytes(entry)
+            self._evict()
+        return entry, False
+
+    def compressed(self, file_path, entry, body, variant="gzip"):
+        """Version gzip d'un contenu, compressée une seule fois par chemin + mtime"""
+        with self._lock:
+            compressed = entry["variants"].get(variant)
+        if compressed is not None:
+            return compressed, True
+        compressed = gzip_bytes(body)
+        with self._lock:
+            entry["variants"][variant] = compressed
+            # L'entrée a pu être remplacée (fichier modifié) ou évincée entre-temps
+            if self._entries.get(file_path) is entry:
+                self.current_bytes += len(compressed)
+                self._evict()
+        return compressed, False
+
+    def _entry_bytes(self, entry):
+        """Octets occupés par une entrée (contenu + variantes compressées)"""
+        size = len(entry["body"]) if entry["body"] is not None else 0
+        return size + sum(len(variant) for variant in entry["variants"].values())
+
+    def _evict(self):
+        """Retirer les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= self._entry_bytes(evicted)
+
+    def clear(self):
+        """Vider le cache"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Statistiques du cache"""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.current_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class RouteTable:
+    """Table des routes d'un site (URL -> fichier, taille, mtime, type MIME) construite en un parcours"""
+
+    # Délai minimal entre deux parcours déclenchés par une URL inconnue
+    MISS_RESCAN_INTERVAL = 1.0
+    INDEX = "index.html"
+    NOT_FOUND = "404.html"
+
+    def __init__(self, directory, miss_rescan_interval=MISS_RESCAN_INTERVAL):
+        self.directory = str(directory)
+        self.miss_rescan_interval = miss_rescan_interval
+        self.routes = {}
+        self.redirects = {}
+        self.not_found = None
+        self.scanned_at = 0.0
+        self.scan_ms = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.routes)
+
+    def scan(self):
+        """Reconstruire la table avec os.scandir (un stat par fichier) puis la remplacer d'un coup"""
+        with self._lock:
+            start = time.perf_counter()
+            files = {}
+            directories = []
+            pending = [("", self.directory)]
+            while pending:
+                prefix, folder = pending.pop()
+                directories.append(prefix)
+                try:
+                    with os.scandir(folder) as entries:
+                        for entry in entries:
+                            # Fichiers et dossiers cachés (.git, .nojekyll) non publiés
+                            if entry.name.startswith("."):
+                                continue
+                            url = f"{prefix}/{entry.name}"
+                            try:
+                                if entry.is_dir():
+                                    pending.append((url, entry.path))
+                                elif entry.is_file():
+                                    files[url] = self._route(entry, url)
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+
+            # Règles GitHub Pages: /dossier/ sert son index.html, /dossier redirige vers /dossier/
+            routes = dict(files)
+            redirects = {}
+            for prefix in directories:
+                index = files.get(f"{prefix}/{self.INDEX}")
+                if index is None:
+                    continue
+                routes[prefix + "/"] = index
+                if prefix:
+                    redirects[prefix] = prefix + "/"
+            # URLs sans extension: /page/contact sert /page/contact.html
+            for url, route in files.items():
+                if url.endswith(".html") and url[:-5] not in redirects:
+                    routes.setdefault(url[:-5], route)
+
+            self.routes = routes
+            self.redirects = redirects
+            self.not_found = files.get("/" + self.NOT_FOUND)
+            self.scanned_at = time.monotonic()
+            self.scan_ms = (time.perf_counter() - start) * 1000
+        return len(routes)
+
+    def _route(self, entry, url):
+        """Route d'un fichier à partir de son DirEntry"""
+        stat = entry.stat()
+        return {
+            "url": url,
+            "path": entry.path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "last_modified": stat.st_mtime,
+            "content_type": mimetypes.guess_type(entry.name)[0] or "application/octet-stream",
+            # Nom empreint (general.3f9a1c2b.css): son contenu ne changera jamais
+            "immutable": bool(FINGERPRINT_RE.search(entry.name))
+        }
+
+    def resolve(self, url_path):
+        """Résoudre une URL en une recherche dans un dict: (200, route), (301, URL de redirection)
+        ou (404, page 404 ou None); la table est reconstruite par notify_change"""
+        status, route = self._lookup(url_path)
+        if status == 404 and time.monotonic() - self.scanned_at >= self.miss_rescan_interval:
+            # Fichier créé hors des dossiers surveillés: un nouveau parcours, au plus un par intervalle
+            self.scan()
+            status, route = self._lookup(url_path)
+        return status, route
+
+    def _lookup(self, url_path):
+        """Chercher une URL dans la table courante"""
+        route = self.routes.get(url_path)
+        if route is not None:
+            return 200, route
+        target = self.redirects.get(url_path)
+        if target is not None:
+            return 301, target
+        return 404, self.not_found
+
+
+class AccessLog:
+    """Journal structuré des requêtes et percentiles de latence glissants par chemin"""
+
+    WINDOW = 256
+
+    def __init__(self, logger, callback=None):
+        self.logger = logger
+        self.callback = callback
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Remettre les statistiques à zéro"""
+        with self._lock:
+            self._durations = defaultdict(lambda: deque(maxlen=self.WINDOW))
+            self._stats = defaultdict(lambda: {"count": 0, "bytes": 0, "errors": 0, "hits": 0, "misses": 0})
+            self.version = 0
+
+    def record(self, event):
+        """Enregistrer une requête: chemin, statut, octets, durée, cache hit/miss"""
+        with self._lock:
+            self._durations[event["path"]].append(event["duration_ms"])
+            stats = self._stats[event["path"]]
+            stats["count"] += 1
+            stats["bytes"] += event["bytes"]
+            if event["status"] >= 400:
+                stats["errors"] += 1
+            if event["cache"] == "hit":
+                stats["hits"] += 1
+            elif event["cache"] == "miss":
+                stats["misses"] += 1
+            self.version += 1
+        message = (f"{event['status']} {event['method']} {event['path']} {event['bytes']} o "
+                   f"{event['duration_ms']:.1f} ms cache={event['cache'] or '-'}")
+        self.logger.log(message, "ACCESS")
+        if self.callback:
+            self.callback(message)
+
+    def summary(self, limit=None):
+        """Statistiques par chemin triées par latence p95 décroissante"""
+        with self._lock:
+            rows = []
+            for path, durations in self._durations.items():
+                ordered = sorted(durations)
+                stats = self._stats[path]
+                cached = stats["hits"] + stats["misses"]
+                rows.append({
+                    "path": path,
+                    "count": stats["count"],
+                    "bytes": stats["bytes"],
+                    "errors": stats["errors"],
+                    "p50_ms": self._percentile(ordered, 0.50),
+                    "p95_ms": self._percentile(ordered, 0.95),
+                    "p99_ms": self._percentile(ordered, 0.99),
+                    "hit_ratio": stats["hits"] / cached if cached else None
+                })
+        rows.sort(key=lambda row: (-row["p95_ms"], row["path"]))
+        return rows[:limit] if limit else rows
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        """Percentile par rang le plus proche d'une liste triée"""
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
 
 
 class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
@@ -18,130 +437,644 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
     def __init__(self, *args, directory=None, **kwargs):
         self.base_directory = directory
+        self.cache_status = None
+        self.detached = False
+        self.status_code = None
+        self.content_length = 0
         super().__init__(*args, directory=directory, **kwargs)
 
+    def handle_one_request(self):
+        """Traiter une requête et l'enregistrer dans le journal d'accès"""
+        start = time.perf_counter()
+        self.status_code = None
+        self.content_length = 0
+        super().handle_one_request()
+        access_log = getattr(self.server, "access_log", None)
+        if access_log is None or self.status_code is None:
+            return
+        has_body = self.command != "HEAD" and self.status_code not in (204, 304)
+        access_log.record({
+            "time": time.time(),
+            "client": self.client_address[0],
+            "method": self.command,
+            "path": self._access_log_path(),
+            "status": self.status_code,
+            "bytes": self.content_length if has_body else 0,
+            "duration_ms": (time.perf_counter() - start) * 1000,
+            "cache": self.cache_status if self.cache_status in ("hit", "miss") else None
+        })
+
+    def _access_log_path(self):
+        """Chemin enregistré dans le journal d'accès (préfixé par le nom du site s'il y en a plusieurs)"""
+        path = urlsplit(self.path).path
+        site_label = getattr(self.server, "site_label", None)
+        return f"[{site_label}] {path}" if site_label else path
+
+    def send_response(self, code, message=None):
+        """Mémoriser le statut pour le journal d'accès"""
+        self.status_code = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        """Mémoriser la taille du corps pour le journal d'accès"""
+        if keyword.lower() == "content-length":
+            self.content_length = int(value)
+        super().send_header(keyword, value)
+
     def do_GET(self):
         """Traiter les requêtes GET"""
-        path = unquote(self.path)
-        if path == '/' or path == '':
-            path = '/index.html'
-        self.path = path
-        return super().do_GET()
+        self.path = unquote(self.path)
+        live_reload = getattr(self.server, "live_reload", None)
+        if live_reload is not None and self.path.startswith("/__livereload"):
+            return self._serve_live_reload(live_reload)
+        return self._serve_route(head_only=False)
 
-    def log_message(self, format, *args):
-        """Logger les messages du serveur"""
-        message = format % args
-        timestamp = self._get_timestamp()
-        print(f"[{timestamp}] {self.client_address[0]} - {message}")
+    def _serve_live_reload(self, live_reload):
+        """Script client et flux Server-Sent Events du rechargement automatique"""
+        url = urlsplit(self.path)
+        if url.path == "/__livereload.js":
+            self.cache_status = "live-reload"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/javascript; charset=utf-8")
+            self.send_header("Content-Length", str(len(LIVE_RELOAD_SCRIPT)))
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(LIVE_RELOAD_SCRIPT)
+            return
+        page = parse_qs(url.query).get("page", ["/index.html"])[0]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.cache_status = "live-reload"
+        self.end_headers()
+        self.wfile.write(b"retry: 1000\n\n")
+        self.wfile.flush()
+        # La connexion est confiée au hub: le thread du pool est libéré tout de suite
+        self.detached = True
+        self.close_connection = True
+        live_reload.attach(self.connection, page)
+
+    def do_HEAD(self):
+        """Traiter les requêtes HEAD"""
+        self.path = unquote(self.path)
+        return self._serve_route(head_only=True)
+
+    def _serve_route(self, head_only):
+        """Trouver le fichier dans la table des routes (une recherche dans un dict) et le servir"""
+        routes = getattr(self.server, "routes", None)
+        if routes is None or getattr(self.server, "asset_cache", None) is None:
+            return super().do_HEAD() if head_only else super().do_GET()
+        url = urlsplit(self.path)
+        status, route = routes.resolve(url.path)
+        if status == 301:
+            self.send_response(301)
+            self.send_header("Location", quote(route) + (f"?{url.query}" if url.query else ""))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if route is None:
+            self.send_error(404, "File not found")
+            return
+        return self._serve_file(route, head_only, status)
+
+    def _serve_file(self, route, head_only, status=200):
+        """Servir un fichier depuis le cache avec ETag/Last-Modified (304 si inchangé)"""
+        file_path = route["path"]
+        try:
+            entry, hit = self.server.asset_cache.get(file_path, route)
+        except OSError:
+            # Fichier supprimé depuis le dernier parcours du site: la table est reconstruite
+            self.server.routes.scan()
+            self.send_error(404, "File not found")
+            return
+        self.cache_status = "hit" if hit else "miss"
+
+        content_type = route["content_type"]
+        body = entry["body"]
+        variant = "gzip"
+        if body is not None and file_path.endswith(".html") \
+                and getattr(self.server, "live_reload", None) is not None:
+            body = self._inject_live_reload(body)
+            variant = "gzip+livereload"
+        compressible = body is not None and is_compressible(content_type)
+        use_gzip = (compressible and getattr(self.server, "compression", False)
+                    and len(body) >= GZIP_MIN_SIZE and "Range" not in self.headers
+                    and self._accepts_gzip())
+        # Chaque représentation (brute ou gzip) a son propre ETag
+        etag = entry["etag"][:-1] + '-gzip"' if use_gzip else entry["etag"]
+
+        # La page 404.html est toujours envoyée en entier
+        if status == 200 and self._is_not_modified(entry, etag):
+            self.send_response(304)
+            self._send_validators(entry, etag, route["immutable"])
+            if compressible:
+                self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        if use_gzip:
+            body, _ = self.server.asset_cache.compressed(file_path, entry, body, variant)
+        size = entry["size"] if body is None else len(body)
 
-    def _get_timestamp(self):
-        """Obtenir le timestamp formaté"""
-        from datetime import datetime
-        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        byte_range = self._requested_range(entry, size) if status == 200 else None
+        if byte_range == "unsatisfiable":
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self._send_validators(entry, etag, route["immutable"])
+            self.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+
+        # Range: le lecteur PDF du navigateur ne télécharge que les morceaux consultés
+        self.send_response(206 if byte_range else status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self._send_validators(entry, etag, route["immutable"])
+        self.end_headers()
+        if head_only or not length:
+            return
+        if body is not None:
+            self.wfile.write(body[start:end + 1] if byte_range else body)
+        else:
+            # Envoi sans copie (os.sendfile) du fichier vers le socket
+            with open(file_path, 'rb') as f:
+                self.connection.sendfile(f, start, length)
+
+    def _requested_range(self, entry, size):
+        """Plage demandée (début, fin) par l'en-tête Range, None pour le fichier entier"""
+        range_header = self.headers.get("Range")
+        if not range_header or self.command != "GET":
+            return None
+        # If-Range: la plage n'est valable que si le fichier n'a pas changé entre-temps
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range.strip() not in (
+                entry["etag"], self.date_time_string(entry["last_modified"])):
+            return None
+        match = RANGE_RE.match(range_header.strip())
+        if not match or match.groups() == ("", ""):
+            # Plages multiples ou syntaxe inconnue: réponse complète
+            return None
+        first, last = match.groups()
+        if first == "":
+            # Suffixe: les N derniers octets
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return "unsatisfiable"
+        return start, end
+
+    def _inject_live_reload(self, body):
+        """Insérer le script de rechargement avant </body> (ou à la fin du document)"""
+        position = body.lower().rfind(b"</body>")
+        if position == -1:
+            return body + LIVE_RELOAD_TAG
+        return body[:position] + LIVE_RELOAD_TAG + body[position:]
+
+    def _accepts_gzip(self):
+        """Le client accepte-t-il gzip (Accept-Encoding, q > 0) ?"""
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.strip().partition(";")
+            if name.strip().lower() in ("gzip", "*"):
+                quality = params.strip().lower()
+                return not (quality.startswith("q=") and float(quality[2:] or 0) == 0)
+        return False
+
+    def _send_validators(self, entry, etag=None, immutable=False):
+        """En-têtes de revalidation: le navigateur garde le fichier mais redemande à chaque fois"""
+        self.send_header("ETag", etag or entry["etag"])
+        self.send_header("Last-Modified", self.date_time_string(entry["last_modified"]))
+        # Les fichiers empreints changent de nom quand leur contenu change: cache sans revalidation
+        self.send_header("Cache-Control",
+                         "public, max-age=31536000, immutable" if immutable else "no-cache")
+
+    def _is_not_modified(self, entry, etag=None):
+        """Vérifier les en-têtes If-None-Match / If-Modified-Since de la requête"""
+        etag = etag or entry["etag"]
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(entry["last_modified"]) <= since
+        return False
+
+    def log_request(self, code='-', size='-'):
+        """Les requêtes sont enregistrées avec leur durée dans handle_one_request"""
+
+    def log_message(self, format, *args):
+        """Logger les messages du serveur (erreurs, timeouts)"""
+        message = f"{self.client_address[0]} - {format % args}"
+        access_log = getattr(self.server, "access_log", None)
+        if access_log is None:
+            print(message)
+            return
+        access_log.logger.log(message, "WARNING")
+        if access_log.callback:
+            access_log.callback(message)
 
     def end_headers(self):
         """Ajouter les headers personnalisés"""
-        self.send_header(
-            'Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        # Les fichiers servis par le cache sont revalidés (ETag); le reste n'est jamais mis en cache
+        if self.cache_status is None:
+            self.send_header(
+                'Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
+            self.send_header('Pragma', 'no-cache')
+            self.send_header('Expires', '0')
         super().end_headers()
 
 
-class ServerManager:
-    """Gère le serveur HTTP local"""
+class PageAssetCollector(HTMLParser):
+    """Ressources chargées par une page: feuilles de style, scripts, images, icônes"""
 
-    def __init__(self, logger):
-        self.logger = logger
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "link" and attrs.get("href") and \
+                any(rel in (attrs.get("rel") or "").lower().split() for rel in ("stylesheet", "icon", "preload")):
+            self.urls.append(attrs["href"])
+        elif tag in ("script", "img", "iframe", "source", "video", "audio") and attrs.get("src"):
+            self.urls.append(attrs["src"])
+
+
+class ThreadPoolHTTPServer(http.server.HTTPServer):
+    """Serveur HTTP traitant les requêtes en parallèle dans un pool de threads borné"""
+
+    # Sous Windows, SO_REUSEADDR permettrait d'ouvrir un port déjà utilisé
+    allow_reuse_address = os.name != "nt"
+
+    def __init__(self, server_address, handler_class, max_workers=8):
+        # Créé avant le bind: server_close() est appelé si le port est occupé
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="preview-server")
+        # Connexions acceptées et pas encore terminées (en attente ou en cours de traitement)
+        self._active = set()
+        self._active_changed = threading.Condition()
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        """Ouvrir le socket sans résolution DNS du nom d'hôte (getfqdn peut prendre des secondes)"""
+        socketserver.TCPServer.server_bind(self)
+        host, port = self.server_address[:2]
+        self.server_name = host
+        self.server_port = port
+
+    def process_request(self, request, client_address):
+        """Confier la requête au pool au lieu de la traiter dans la boucle d'écoute"""
+        with self._active_changed:
+            self._active.add(request)
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        """Traiter une requête dans un thread du pool"""
+        detached = False
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+            # Les connexions Server-Sent Events restent ouvertes dans le hub de rechargement
+            detached = getattr(handler, "detached", False)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if not detached:
+                self.shutdown_request(request)
+            with self._active_changed:
+                self._active.discard(request)
+                self._active_changed.notify_all()
+
+    def handle_error(self, request, client_address):
+        """Ignorer les déconnexions (onglet fermé, arrêt du serveur), journaliser les autres erreurs"""
+        error = sys.exc_info()[1]
+        if isinstance(error, (ConnectionError, socket.timeout)):
+            return
+        access_log = getattr(self, "access_log", None)
+        if access_log is None:
+            return super().handle_error(request, client_address)
+        access_log.logger.log(f"Erreur lors du traitement d'une requête de {client_address[0]}: {error}",
+                              "ERROR")
+
+    def drain(self, timeout):
+        """Attendre la fin des requêtes en cours; celles qui dépassent le délai sont coupées"""
+        with self._active_changed:
+            drained = self._active_changed.wait_for(lambda: not self._active, timeout)
+            remaining = list(self._active)
+        for request in remaining:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return drained, len(remaining)
+
+    def server_close(self):
+        """Fermer le socket d'écoute et libérer le pool"""
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+class PreviewServer:
+    """Un serveur de prévisualisation lié à son propre dossier (sans os.chdir)"""
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, manager, name, directory):
+        self.manager = manager
+        self.name = name
+        self.directory = Path(directory).resolve()
+        self.live_reload = LiveReloadHub()
+        self.routes = RouteTable(self.directory)
         self.server = None
         self.thread = None
-        self.running = False
-        self.request_handler = None
-        self._stop_requested = False
+        self.port = None
+        self.ready = threading.Event()
+
+    @property
+    def url(self):
+        """URL de prévisualisation"""
+        return f"http://localhost:{self.port}"
+
+    def is_running(self):
+        """Vérifier si la boucle d'écoute tourne"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def bind(self, port, max_attempts):
+        """Ouvrir le socket d'écoute sur le premier port libre à partir de `port`"""
+        directory = str(self.directory)
+
+        def create_handler(*args, **kwargs):
+            return CustomHTTPRequestHandler(*args, directory=directory, **kwargs)
+
+        self.routes.scan()
+        last_error = None
+        for candidate in range(port, min(port + max_attempts, 65536)):
+            try:
+                server = ThreadPoolHTTPServer(
+                    ("localhost", candidate), create_handler, max_workers=self.manager.max_workers)
+            except OSError as e:
+                if e.errno not in (errno.EADDRINUSE, errno.EACCES):
+                    raise
+                last_error = e
+                continue
+            server.asset_cache = self.manager.asset_cache
+            server.access_log = self.manager.access_log
+            server.compression = self.manager.compression
+            server.live_reload = self.live_reload
+            server.routes = self.routes
+            server.site_label = None if self.name == ServerManager.DEFAULT_NAME else self.name
+            self.server = server
+            self.port = candidate
+            return candidate
+        raise OSError(errno.EADDRINUSE,
+                      f"Aucun port libre entre {port} et {port + max_attempts - 1}") from last_error
+
+    def serve(self):
+        """Démarrer la boucle d'écoute dans un thread dédié"""
+        self.thread = threading.Thread(
+            target=self._serve_forever, name=f"preview-{self.name}", daemon=True)
+        self.thread.start()
+
+    def _serve_forever(self):
+        """Boucle d'écoute: chaque connexion est traitée par un thread du pool"""
+        try:
+            # Le socket écoute depuis bind(): les connexions arrivées entre-temps attendent dans la file
+            self.ready.set()
+            self.server.serve_forever(poll_interval=self.POLL_INTERVAL)
+        except Exception as e:
+            self.manager.logger.log(f"Erreur serveur ({self.name}): {e}")
+        finally:
+            self.ready.clear()
+            self.live_reload.close()
+            self.server.server_close()
+
+    def stop(self, deadline=2.0):
+        """Arrêt ordonné: plus de nouvelles connexions, requêtes en cours terminées avant `deadline` (s)"""
+        start = time.perf_counter()
+        if self.is_running():
+            # serve_forever() rend la main au plus tard après POLL_INTERVAL, puis le socket est fermé
+            self.server.shutdown()
+            self.thread.join(deadline)
+        remaining = max(0.0, deadline - (time.perf_counter() - start))
+        drained, aborted = self.server.drain(remaining)
+        return {
+            "drained": drained,
+            "aborted": aborted,
+            "stopped": not self.is_running(),
+            "duration_ms": (time.perf_counter() - start) * 1000
+        }
+
+
+class ServerManager:
+    """Gère les serveurs HTTP locaux (un par dossier servi)"""
+
+    DEFAULT_WORKERS = 8
+    DEFAULT_NAME = "default"
+    MAX_PORT_ATTEMPTS = 20
+
+    def __init__(self, logger, max_workers=DEFAULT_WORKERS, cache_bytes=64 * 1024 * 1024,
+                 shutdown_deadline=2.0):
+        self.logger = logger
+        self.max_workers = max(1, int(max_workers))
+        self.shutdown_deadline = shutdown_deadline
+        # Le cache survit aux redémarrages du serveur: il est revalidé par mtime
+        self.asset_cache = AssetCache(max_bytes=cache_bytes)
+        self.access_log = AccessLog(logger)
+        self.compression = True
+        self.servers = {}
+        self._servers_lock = threading.Lock()
+
+    def start_server(self, directory, port=8000, name=DEFAULT_NAME, callback=None):
+        """Démarrer un serveur pour `directory` sans bloquer (port suivant si occupé)"""
+        def report(message):
+            if callback:
+                callback(message)
+            self.logger.log(message)
 
-    def start(self, repo_path, port=8000, callback=None):
-        """Démarrer le serveur HTTP"""
         try:
             # Valider et corriger le port
             if not isinstance(port, int) or port < 1 or port > 65535:
-                message = f"⚠️  Port invalide: {port}. Utilisation du port par défaut: 8000"
-                if callback:
-                    callback(message)
-                self.logger.log(message)
+                report(f"⚠️  Port invalide: {port}. Utilisation du port par défaut: 8000")
                 port = 8000
 
-            repo_path = Path(repo_path)
-            if not repo_path.exists():
-                message = f"❌ Le chemin n'existe pas: {repo_path}"
-                if callback:
-                    callback(message)
-                self.logger.log(message)
-                return False
-            os.chdir(repo_path)
-
-            def create_handler(*args, **kwargs):
-                return CustomHTTPRequestHandler(
-                    *args, directory=str(repo_path), **kwargs
-                )
-            socketserver.TCPServer.allow_reuse_address = True
-            self.server = socketserver.TCPServer(
-                ("localhost", port), create_handler)
-
-            # Timeout court pour permettre l'arrêt
-            self.server.timeout = 0.5
-            self.running = True
-            self._stop_requested = False
-
-            message = f"✓ Serveur démarré sur http://localhost:{port}"
+            directory = Path(directory)
+            if not directory.is_dir():
+                message = f"❌ Le chemin n'existe pas: {directory}"
+                report(message)
+                return {"success": False, "error": message}
+
+            self.stop_server(name)
             if callback:
-                callback(message)
-            self.logger.log(message)
-            while self.running and not self._stop_requested:
-                try:
-                    self.server.handle_request()
-                except Exception as e:
-                    if self.running and not self._stop_requested:
-                        self.logger.log(f"Erreur serveur: {e}")
+                self.access_log.callback = callback
+            preview = PreviewServer(self, name, directory)
+            bound_port = preview.bind(port, self.MAX_PORT_ATTEMPTS)
+            with self._servers_lock:
+                self.servers[name] = preview
+            preview.serve()
+            preview.ready.wait(1.0)
+
+            if bound_port != port:
+                report(f"⚠️  Port {port} déjà utilisé, port {bound_port} utilisé à la place")
+            label = "" if name == self.DEFAULT_NAME else f" [{name}]"
+            message = (f"✓ Serveur démarré sur {preview.url}{label} ({self.max_workers} workers, "
+                       f"{len(preview.routes)} routes en {preview.routes.scan_ms:.0f} ms)")
+            report(message)
+            return {"success": True, "name": name, "port": bound_port, "url": preview.url,
+                    "routes": len(preview.routes),
+                    "directory": str(preview.directory), "message": message}
         except OSError as e:
-            if "Address already in use" in str(e):
-                message = f"❌ Le port {port} est déjà utilisé. Essayez un autre port."
-            else:
-                message = f"❌ Erreur OS: {str(e)}"
-            if callback:
-                callback(message)
-            self.logger.log(message)
-            self.running = False
+            message = f"❌ Erreur OS: {str(e)}"
+            report(message)
+            return {"success": False, "error": message}
         except Exception as e:
             message = f"❌ Erreur serveur: {str(e)}"
-            if callback:
-                callback(message)
-            self.logger.log(message)
-            self.running = False
-        finally:
-            self.running = False
-            if self.server:
-                try:
-                    self.server.server_close()
-                except:
-                    pass
+            report(message)
+            return {"success": False, "error": message}
 
-    def stop(self):
-        """Arrêter le serveur HTTP"""
+    def stop_server(self, name=DEFAULT_NAME, deadline=None):
+        """Arrêter un serveur en laissant `deadline` secondes aux requêtes en cours"""
+        with self._servers_lock:
+            preview = self.servers.pop(name, None)
+        if preview is None:
+            return {"success": True, "stopped": True, "message": "Serveur déjà arrêté"}
         try:
-            self._stop_requested = True
-            self.running = False
-            if self.server:
-                try:
-                    self.server.server_close()
-                except:
-                    pass
-            self.logger.log("Serveur arrêté")
-            return True
+            result = preview.stop(self.shutdown_deadline if deadline is None else deadline)
+            label = "" if name == self.DEFAULT_NAME else f" [{name}]"
+            message = f"Serveur arrêté{label} (port {preview.port}) en {result['duration_ms']:.0f} ms"
+            if result["aborted"]:
+                message += f", {result['aborted']} requête(s) interrompue(s)"
+            self.logger.log(message)
+            return dict(result, success=result["stopped"], message=message)
         except Exception as e:
             error_msg = f"Erreur lors de l'arrêt: {str(e)}"
             self.logger.log(error_msg)
+            return {"success": False, "stopped": not preview.is_running(), "error": error_msg}
+
+    def stop_all(self, deadline=None):
+        """Arrêter tous les serveurs"""
+        with self._servers_lock:
+            names = list(self.servers)
+        return [self.stop_server(name, deadline) for name in names]
+
+    def list_servers(self):
+        """Serveurs actifs: nom, dossier, port et URL"""
+        with self._servers_lock:
+            servers = list(self.servers.values())
+        return [{"name": preview.name, "directory": str(preview.directory), "port": preview.port,
+                 "url": preview.url, "running": preview.is_running()} for preview in servers]
+
+    def get_server(self, name=DEFAULT_NAME):
+        """Serveur de prévisualisation par nom (None s'il n'existe pas)"""
+        with self._servers_lock:
+            return self.servers.get(name)
+
+    def start(self, repo_path, port=8000, callback=None):
+        """Démarrer le serveur principal et bloquer jusqu'à son arrêt"""
+        result = self.start_server(repo_path, port, callback=callback)
+        if not result["success"]:
             return False
+        preview = self.get_server()
+        if preview:
+            preview.thread.join()
+        return True
 
-    def is_running(self):
+    def set_compression(self, enabled):
+        """Activer ou désactiver la compression gzip (pris en compte immédiatement)"""
+        self.compression = bool(enabled)
+        with self._servers_lock:
+            for preview in self.servers.values():
+                preview.server.compression = self.compression
+        self.logger.log(f"Compression gzip {'activée' if self.compression else 'désactivée'}")
+
+    def transfer_sizes(self, repo_path):
+        """Comparer, page par page, le poids transféré sans et avec compression gzip"""
+        try:
+            repo_path = Path(repo_path).resolve()
+            pages = [repo_path / page for page in page_paths(repo_path)]
+            results = []
+            for page in pages:
+                collector = PageAssetCollector()
+                with open(page, 'r', encoding='utf-8') as f:
+                    collector.feed(f.read())
+                files = [page]
+                for url in collector.urls:
+                    parts = urlsplit(url)
+                    if parts.scheme or parts.netloc or not parts.path:
+                        continue
+                    base = repo_path if parts.path.startswith("/") else page.parent
+                    file_path = (base / unquote(parts.path).lstrip("/")).resolve()
+                    if file_path.is_file() and file_path not in files:
+                        files.append(file_path)
+
+                raw_total = gzip_total = 0
+                for file_path in files:
+                    raw, compressed = self._file_transfer_size(file_path)
+                    raw_total += raw
+                    gzip_total += compressed
+                results.append({"page": page.relative_to(repo_path).as_posix(), "files": len(files),
+                                "raw": raw_total, "gzip": gzip_total})
+            return {
+                "success": True,
+                "pages": results,
+                "total_raw": sum(result["raw"] for result in results),
+                "total_gzip": sum(result["gzip"] for result in results)
+            }
+        except Exception as e:
+            error_msg = f"Erreur lors du calcul des tailles: {str(e)}"
+            self.logger.log(error_msg)
+            return {"success": False, "error": error_msg}
+
+    def _file_transfer_size(self, file_path):
+        """Taille brute et taille transférée avec gzip d'un fichier (variante gzip mise en cache)"""
+        content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        entry, _ = self.asset_cache.get(str(file_path))
+        if not is_compressible(content_type) or entry["size"] < GZIP_MIN_SIZE:
+            return entry["size"], entry["size"]
+        if entry["body"] is None:
+            with open(file_path, 'rb') as f:
+                return entry["size"], len(gzip_bytes(f.read()))
+        compressed, _ = self.asset_cache.compressed(str(file_path), entry, entry["body"])
+        return entry["size"], len(compressed)
+
+    def notify_change(self, file_path):
+        """Prévenir les navigateurs qu'un fichier d'un site a changé (rechargement ou hot-swap CSS)"""
+        path = Path(file_path).resolve()
+        mtime = path.stat().st_mtime_ns if path.exists() else None
+        notified = 0
+        with self._servers_lock:
+            servers = list(self.servers.values())
+        for preview in servers:
+            try:
+                url_path = "/" + path.relative_to(preview.directory).as_posix()
+            except ValueError:
+                # Fichier hors du site servi
+                continue
+            # Table des routes à jour avant que le navigateur ne recharge
+            preview.routes.scan()
+            notified += preview.live_reload.notify(url_path, mtime)
+        if notified:
+            self.logger.log(f"Rechargement automatique: {path.name} ({notified} navigateur(s))")
+        return notified
+
+    def stop(self):
+        """Arrêter le serveur HTTP principal"""
+        return self.stop_server(self.DEFAULT_NAME)["success"]
+
+    def is_running(self, name=DEFAULT_NAME):
         """Vérifier si le serveur est actif"""
-        return self.running
+        preview = self.get_server(name)
+        return preview is not None and preview.is_running()
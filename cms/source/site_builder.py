@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construction du Site - Version publiable (images optimisées, CSS regroupé, ressources empreintes)
+Un graphe page -> ressources et les hash des fichiers permettent de ne reconstruire que le nécessaire
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from asset_fingerprint import AssetFingerprinter, REFERENCE_ATTRIBUTES
+from css_bundler import CSSBundler
+from html_rewriter import collect_start_tags, local_path, page_paths, walk_files
+from image_optimizer import ImageOptimizer
+
+
+class SiteBuilder:
+    """Construit le site dans un dossier de sortie en ne retraitant que les pages touchées"""
+
+    STATE_NAME = "build-state.json"
+    STATE_VERSION = 4
+    # Fichiers publiés à la racine (le reste de la racine concerne le CMS et le développement)
+    ROOT_FILES = ("index.html", "robots.txt", "sitemap.xml")
+
+    def __init__(self, logger, output_dir=None):
+        self.logger = logger
+        self.output_dir = Path(output_dir) if output_dir else Path.home() / ".rout_art_cms" / "build" / "site"
+        self.image_optimizer = ImageOptimizer(logger)
+        self.css_bundler = CSSBundler(logger)
+        self.fingerprinter = AssetFingerprinter(logger)
+        # Une seule construction à la fois (bouton et sauvegarde peuvent se chevaucher)
+        self._lock = threading.Lock()
+
+    # ======= État de la construction =======
+
+    def load_state(self, repo_path):
+        """État de la construction précédente (vide si absent, illisible ou pour un autre repository)"""
+        try:
+            with open(self.output_dir / self.STATE_NAME, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != self.STATE_VERSION or state.get("repo") != str(repo_path) \
+                or state.get("images_enabled") != self.image_optimizer.is_available():
+            return None
+        return state
+
+    def save_state(self, state):
+        """Écrire l'état (graphe des dépendances et hash des fichiers)"""
+        state_path = self.output_dir / self.STATE_NAME
+        temp_path = state_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, state_path)
+
+    def is_built(self, repo_path):
+        """Une construction existe-t-elle déjà pour ce repository ?"""
+        return self.load_state(Path(repo_path).resolve()) is not None
+
+    def scan_sources(self, repo_path):
+        """Fichiers publiés du repository: chemin relatif -> (mtime, taille), en un parcours os.scandir"""
+        files = {}
+        for name in self.ROOT_FILES:
+            try:
+                stat = (repo_path / name).stat()
+                files[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        for folder in ("page",) + self.fingerprinter.ASSET_DIRS:
+            for relative, entry in walk_files(repo_path / folder, folder + "/"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files[relative] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _hash_file(self, file_path):
+        """Hash du contenu d'un fichier"""
+        with open(file_path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _detect_changes(self, repo_path, state, changed_files):
+        """Comparer les fichiers à l'état précédent: (fichiers, modifiés, supprimés)"""
+        previous = state["files"] if state else {}
+        if state and changed_files is not None:
+            # Changements connus (sauvegarde d'une page): seuls ces fichiers sont relus
+            current = {relative: (entry["mtime"], entry["size"]) for relative, entry in previous.items()}
+            for file_path in changed_files:
+                try:
+                    relative = Path(file_path).resolve().relative_to(repo_path).as_posix()
+                except ValueError:
+                    continue
+                try:
+                    stat = (repo_path / relative).stat()
+                    current[relative] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    current.pop(relative, None)
+        else:
+            current = self.scan_sources(repo_path)
+
+        files, changed = {}, set()
+        for relative, (mtime, size) in current.items():
+            entry = previous.get(relative)
+            if entry and entry["mtime"] == mtime and entry["size"] == size:
+                files[relative] = entry
+                continue
+            digest = self._hash_file(repo_path / relative)
+            files[relative] = {"mtime": mtime, "size": size, "hash": digest}
+            # mtime modifié mais contenu identique (checkout, copie): rien à reconstruire
+            if not entry or entry["hash"] != digest:
+                changed.add(relative)
+        deleted = set(previous) - set(files)
+        return files, changed, deleted
+
+    # ======= Graphe des dépendances =======
+
+    def page_dependencies(self, content, page, repo_path, sheets, images):
+        """Ressources dont dépend la sortie d'une page (références, feuilles importées, images)"""
+        folder = posixpath.dirname(page)
+        dependencies = set()
+        for tag in collect_start_tags(content):
+            for name, value in tag["attrs"].items():
+                if name in REFERENCE_ATTRIBUTES:
+                    urls = [value]
+                elif name == "srcset":
+                    urls = [candidate.strip().split(" ")[0] for candidate in value.split(",")]
+                else:
+                    continue
+                for url in urls:
+                    path = local_path(url)
+                    if not path:
+                        continue
+                    relative = posixpath.normpath(
+                        path.lstrip("/") if path.startswith("/") else posixpath.join(folder, path))
+                    # Les liens vers d'autres pages ne changent pas la sortie de celle-ci
+                    if relative.split("/", 1)[0] in self.fingerprinter.ASSET_DIRS:
+                        dependencies.add(relative)
+        for source, _media in sheets:
+            if os.path.isabs(source):
+                dependencies.add(Path(source).relative_to(repo_path).as_posix())
+        dependencies.update(images)
+        return sorted(dependencies)
+
+    # ======= Construction =======
+
+    def build(self, repo_path, changed_files=None, full=False):
+        """Construire le site: seules les pages dont la source ou une dépendance a changé sont refaites"""
+        with self._lock:
+            try:
+                return self._build(Path(repo_path).resolve(), changed_files, full)
+            except Exception as e:
+                error_msg = f"Erreur lors de la construction du site: {str(e)}"
+                self.logger.log(error_msg)
+                return {"success": False, "error": error_msg}
+
+    def _build(self, repo_path, changed_files, full):
+        start = time.perf_counter()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        state = None if full else self.load_state(repo_path)
+        files, changed, deleted = self._detect_changes(repo_path, state, changed_files)
+        pages = [page for page in page_paths(repo_path) if page in files]
+        page_states = dict(state["pages"]) if state else {}
+        image_manifests = dict(state["images"]) if state else {}
+        favicon_manifests = dict(state["favicons"]) if state else {}
+
+        # 1. Copie des fichiers modifiés (les pages sont écrites après réécriture)
+        for relative in sorted(changed):
+            if relative in pages:
+                continue
+            target = self.output_dir / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(repo_path / relative, target)
+        for relative in deleted:
+            (self.output_dir / relative).unlink(missing_ok=True)
+            page_states.pop(relative, None)
+            for manifests in (image_manifests, favicon_manifests):
+                if relative in manifests:
+                    self._remove_variants(relative, manifests.pop(relative), None)
+
+        # 2. Empreintes: refaites seulement si une ressource a changé
+        previous_mapping = {relative: entry["fingerprinted"] for relative, entry in
+                            self.fingerprinter.load_manifest(self.output_dir).items()}
+        assets_changed = any(relative.split("/", 1)[0] in self.fingerprinter.ASSET_DIRS
+                             for relative in changed | deleted)
+        if assets_changed or not state or not previous_mapping:
+            fingerprinted = self.fingerprinter.fingerprint(repo_path, self.output_dir)
+            mapping = {relative: entry["fingerprinted"] for relative, entry in fingerprinted["assets"].items()}
+            self.logger.log(f"Empreintes: {len(mapping)} ressource(s), {fingerprinted['copied']} copiée(s), "
+                            f"{fingerprinted['reused']} inchangée(s)")
+        else:
+            mapping = previous_mapping
+        renamed = {relative for relative in set(mapping) | set(previous_mapping)
+                   if mapping.get(relative) != previous_mapping.get(relative)}
+
+        # 3. Pages à reconstruire: modifiées, nouvelles, ou dépendant d'une ressource modifiée
+        touched = changed | deleted | renamed
+        dirty = {page for page in pages
+                 if page in changed or page not in page_states
+                 or touched.intersection(page_states[page]["dependencies"])
+                 or not (self.output_dir / page).exists()}
+
+        contents, sheets = {}, {}
+        for page in dirty:
+            contents[page] = self._read_page(repo_path, page)
+            sheets[page] = self.css_bundler.page_sheets(contents[page], repo_path / page, repo_path)
+
+        # 4. Feuilles communes: si le préfixe change, les pages qui l'utilisent changent aussi
+        page_keys = {page: tuple(tuple(key) for key in page_states[page]["sheets"])
+                     for page in pages if page not in dirty}
+        sheet_sizes = {tuple(key): size for page in page_keys
+                       for key, size in zip(page_states[page]["sheets"], page_states[page]["sheet_sizes"])}
+        for page in dirty:
+            page_keys[page] = self.css_bundler.sheet_keys(sheets[page][0])
+            sheet_sizes.update({(source, media): len(css) for source, media, css in sheets[page][0]})
+        shared = self.css_bundler.shared_prefix(page_keys, sheet_sizes)
+        previous_shared = tuple(tuple(key) for key in state["shared"]) if state else ()
+        if shared != previous_shared:
+            for page in pages:
+                if page in dirty:
+                    continue
+                keys = page_keys[page]
+                if keys[:len(shared)] == shared or keys[:len(previous_shared)] == previous_shared:
+                    dirty.add(page)
+                    contents[page] = self._read_page(repo_path, page)
+                    sheets[page] = self.css_bundler.page_sheets(contents[page], repo_path / page, repo_path)
+
+        # 5. Images des pages à reconstruire (les variantes déjà connues ne sont pas relues)
+        images_by_page = {}
+        if self.image_optimizer.is_available():
+            needed, needed_favicons = set(), set()
+            for page in dirty:
+                page_images, page_favicons = self.image_optimizer.page_images(
+                    contents[page], repo_path / page, repo_path)
+                images_by_page[page] = sorted(
+                    {Path(image).relative_to(repo_path).as_posix() for _, image in page_images + page_favicons})
+                needed.update(Path(image).relative_to(repo_path).as_posix() for _, image in page_images)
+                needed_favicons.update(Path(image).relative_to(repo_path).as_posix()
+                                       for _, image in page_favicons)
+            self._update_image_manifests(repo_path, needed, changed, image_manifests, None)
+            self._update_image_manifests(
+                repo_path, needed_favicons, changed, favicon_manifests,
+                dict(self.image_optimizer.options, widths=[self.image_optimizer.FAVICON_WIDTH]))
+        absolute_manifests = {str(repo_path / relative): manifest
+                              for relative, manifest in image_manifests.items()}
+        absolute_favicons = {str(repo_path / relative): manifest
+                             for relative, manifest in favicon_manifests.items()}
+
+        # 6. Réécriture des pages: images -> CSS -> empreintes
+        missing = set()
+        for page in sorted(dirty):
+            page_sheets, page_missing, kept = sheets[page]
+            missing.update(page_missing)
+            content = contents[page]
+            dependencies = self.page_dependencies(content, page, repo_path,
+                                                  self.css_bundler.sheet_keys(page_sheets),
+                                                  images_by_page.get(page, []))
+            if self.image_optimizer.is_available():
+                content, _ = self.image_optimizer.rewrite_page(
+                    content, repo_path / page, repo_path, absolute_manifests, absolute_favicons,
+                    page_sheets)
+            bundles = self.css_bundler.write_page_bundles(
+                self.output_dir, Path(page).stem, page_sheets, shared) if page_sheets else []
+            if bundles or kept:
+                content = self.css_bundler.rewrite_page(
+                    content, self.output_dir / page, repo_path, [bundle for bundle, _ in bundles], kept)
+            content, _ = self.fingerprinter.rewrite_page(content, page, mapping)
+            target = self.output_dir / page
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            page_states[page] = {
+                "dependencies": dependencies,
+                "sheets": [list(key) for key in self.css_bundler.sheet_keys(page_sheets)],
+                "sheet_sizes": [len(css) for _source, _media, css in page_sheets],
+                "bundles": [bundle.relative_to(self.output_dir).as_posix() for bundle, _ in bundles],
+                "css": self._css_report(page_sheets, kept, bundles)
+            }
+
+        for path in sorted(missing):
+            self.logger.log(f"⚠️  Feuille de style introuvable: {path}")
+        self._remove_unused_bundles(state, page_states)
+        self.save_state({
+            "version": self.STATE_VERSION,
+            "repo": str(repo_path),
+            "images_enabled": self.image_optimizer.is_available(),
+            "files": files,
+            "pages": page_states,
+            "images": image_manifests,
+            "favicons": favicon_manifests,
+            "shared": [list(key) for key in shared]
+        })
+
+        # Poids des images: original -> WebP pleine largeur
+        images_report = {"count": len(image_manifests),
+                         "original_bytes": sum(manifest["bytes"] for manifest in image_manifests.values()),
+                         "webp_bytes": sum([variant["bytes"] for variant in manifest["variants"]
+                                            if variant["format"] == "webp"][-1]
+                                           for manifest in image_manifests.values())}
+        css_report = [dict(page_states[page]["css"], page=page) for page in pages
+                      if page_states[page]["css"]["requests_before"]]
+        duration_ms = (time.perf_counter() - start) * 1000
+        rebuilt = sorted(dirty)
+        if changed or deleted or rebuilt:
+            self.logger.log(
+                f"Construction du site: {len(changed)} fichier(s) modifié(s), {len(deleted)} supprimé(s), "
+                f"{len(rebuilt)} page(s) reconstruite(s) en {duration_ms:.0f} ms")
+        return {"success": True, "output_dir": str(self.output_dir), "changed": sorted(changed),
+                "deleted": sorted(deleted), "pages": rebuilt, "images": images_report,
+                "css": css_report, "duration_ms": duration_ms}
+
+    def _read_page(self, repo_path, page):
+        """Lire une page en conservant ses fins de ligne"""
+        with open(repo_path / page, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def _css_report(self, sheets, kept, bundles):
+        """Requêtes et octets CSS d'une page avant et après regroupement"""
+        bytes_before = sum(len(css.encode("utf-8")) for _source, _media, css in sheets)
+        bytes_after = sum(size for _bundle, size in bundles)
+        return {"requests_before": len(sheets) + len(kept), "requests_after": len(bundles) + len(kept),
+                "bytes_before": bytes_before, "bytes_after": bytes_after,
+                "saved": bytes_before - bytes_after}
+
+    def _update_image_manifests(self, repo_path, needed, changed, manifests, options):
+        """Variantes des images nouvelles ou modifiées (les autres viennent de l'état précédent)"""
+        pending = sorted(relative for relative in needed
+                         if relative in changed or relative not in manifests)
+        if not pending:
+            return
+        results = self.image_optimizer.optimize_all(
+            [repo_path / relative for relative in pending], options=options)["results"]
+        for image_path, manifest in results.items():
+            relative = Path(image_path).relative_to(repo_path).as_posix()
+            self.image_optimizer.publish_variants(image_path, repo_path, self.output_dir, manifest)
+            if relative in manifests:
+                self._remove_variants(relative, manifests[relative], manifest)
+            manifests[relative] = manifest
+
+    def _remove_variants(self, relative, old_manifest, new_manifest):
+        """Supprimer les variantes publiées d'une ancienne version d'une image (nommées d'après son hash)"""
+        kept = self.image_optimizer.published_variants(relative, new_manifest) if new_manifest else {}
+        for published in self.image_optimizer.published_variants(relative, old_manifest):
+            if published not in kept:
+                (self.output_dir / published).unlink(missing_ok=True)
+
+    def _remove_unused_bundles(self, state, page_states):
+        """Supprimer les bundles CSS qui ne sont plus référencés par aucune page"""
+        if not state:
+            return
+        used = {bundle for page_state in page_states.values() for bundle in page_state["bundles"]}
+        for page_state in state["pages"].values():
+            for bundle in page_state["bundles"]:
+                if bundle not in used:
+                    (self.output_dir / bundle).unlink(missing_ok=True)
@@ -51,6 +51,41 @@ class SitemapGenerator:
                 f"Erreur lors de la lecture de la date du fichier {file_path}: {str(e)}")
             return datetime.now().strftime('%Y-%m-%d')
 
+    def get_page_url(self, relative_path):
+        """URL publique d'une page (chemin relatif au repository)"""
+        if relative_path == "index.html":
+            return self.base_url + "/"
+        return self.base_url + "/" + relative_path
+
+    def get_sitemap_lastmod(self, repo_path, relative_path):
+        """Lire la date lastmod d'une page dans le sitemap.xml existant (None si absente)"""
+        sitemap_path = Path(repo_path) / "sitemap.xml"
+        if not sitemap_path.exists():
+            return None
+        namespace = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+        page_url = self.get_page_url(relative_path)
+        for url in ET.parse(sitemap_path).getroot().findall('sm:url', namespace):
+            if url.findtext('sm:loc', namespaces=namespace) == page_url:
+                return url.findtext('sm:lastmod', namespaces=namespace)
+        return None
+
+    def needs_update(self, repo_path, changed_files):
+        """Vérifier si la date lastmod d'une des pages modifiées change dans le sitemap"""
+        try:
+            repo_path = Path(repo_path)
+            for file_path in changed_files:
+                relative_path = Path(file_path).resolve().relative_to(
+                    repo_path.resolve()).as_posix()
+                if relative_path not in self.pages_config:
+                    continue
+                lastmod = self.get_file_modification_date(repo_path / relative_path)
+                if self.get_sitemap_lastmod(repo_path, relative_path) != lastmod:
+                    return True
+            return False
+        except Exception as e:
+            self.logger.log(f"Vérification du sitemap impossible: {str(e)}")
+            return True
+
     def generate_sitemap(self, repo_path):
         """Générer le sitemap.xml en fonction des fichiers du projet"""
         try:
@@ -74,10 +109,7 @@ class SitemapGenerator:
                 url = ET.SubElement(urlset, 'url')
 
                 loc = ET.SubElement(url, 'loc')
-                if relative_path == "index.html":
-                    loc.text = self.base_url + "/"
-                else:
-                    loc.text = self.base_url + "/" + relative_path
+                loc.text = self.get_page_url(relative_path)
 
                 lastmod_elem = ET.SubElement(url, 'lastmod')
                 lastmod_elem.text = lastmod
@@ -115,9 +147,13 @@ class SitemapGenerator:
             self.logger.log(error_msg)
             return {"success": False, "error": error_msg}
 
-    def update_sitemap(self, repo_path):
+    def update_sitemap(self, repo_path, changed_files=None):
         """Générer et sauvegarder le sitemap en une seule opération"""
         try:
+            # Rien à faire si aucune date lastmod des pages modifiées ne change
+            if changed_files is not None and not self.needs_update(repo_path, changed_files):
+                return {"success": True, "skipped": True}
+
             result = self.generate_sitemap(repo_path)
             if not result['success']:
                 return result